@@ -0,0 +1,102 @@
+###############################################################################
+## Benchmark: dictionary-encoded author table
+## Compares, on a synthetic author_df (with each paper's authors repeated for
+## every gene linked to the paper) written to a temporary data/ directory:
+##   parse_out_emails: the regex over every row followed by two DataFrame.update
+##     calls (the old implementation, kept here) against one regex per
+##     distinct affiliation
+##   loading author_df and get_clean_authors: plain text columns and text
+##     pmids against categorical author columns and integer pmids
+##   build_author_table on each of the two loaded tables
+## and reports seconds and the memory of the loaded table, and checks both
+## sides give the same emails, clean authors and potential authors
+## Usage: python benchmarks/bench_author_encoding.py [--records 100000]
+###############################################################################
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import IdentifyAuthors
+from genewiki_prioritization import PrioritizeGenes
+from genewiki_prioritization.TableStorage import DatasetWriter, read_table
+import bench_author_rows
+
+
+#### the per-row implementation, kept here as the baseline
+def parse_out_emails_by_row(author_df):
+    author_df.reset_index(inplace=True)
+    author_df.drop(['index'],axis=1,inplace=True)
+    author_df['email'] = author_df['AuthorDetails'].str.extract(r'([^@|\s]+@[^@]+\.[^@|\s]+)')
+    author_emails = author_df.loc[author_df['email'].notnull()]
+    author_emails_dots = author_emails.loc[author_emails['email'].str[-1]=="."].copy()
+    author_emails_dots['email'] = author_emails_dots['email'].str[:-1]
+    author_emails.update(author_emails_dots)
+    author_df.update(author_emails)
+    return(author_df)
+
+def get_clean_authors_as_text(datapath):
+    less_details = read_table(datapath,'author_df',columns=['AU','FullName','pmid','email'])
+    author_sum = less_details.groupby('AU').size().reset_index(name='count')
+    no_single_authors = author_sum.loc[author_sum['count']>1].copy()
+    return(less_details.loc[less_details['AU'].isin(no_single_authors['AU'].tolist())])
+
+
+#### every paper is linked to 1-3 genes, as in PublicationDetailsDF
+def synthetic_gene_pmid(author_df,n_genes,seed=0):
+    rng = random.Random(seed)
+    pmids = author_df['pmid'].unique()
+    rows = [(rng.randint(1,n_genes),int(x)) for x in pmids for i in range(rng.randint(1,3))]
+    return(pd.DataFrame(rows,columns=['geneid','pmid']).drop_duplicates().reset_index(drop=True))
+
+
+def timed(function,*args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(result,time.perf_counter()-start)
+
+def megabytes(df):
+    return(df.memory_usage(deep=True).sum()/1e6)
+
+def canonical(author_by_gene):
+    table = author_by_gene[['geneid','AU','counts','FullName','email']].astype(str)
+    return(table.sort_values(list(table.columns)).reset_index(drop=True))
+
+
+#### author_df has the authors of a paper once for every gene linked to it
+def run(n_records,n_genes):
+    records = bench_author_rows.author_df_by_columns(bench_author_rows.synthetic_medline_records(n_records))
+    gene_pmid = synthetic_gene_pmid(records,n_genes)
+    author_df = gene_pmid[['pmid']].astype(str).merge(records,on='pmid',how='inner')[records.columns]
+    by_row, row_time = timed(parse_out_emails_by_row,author_df.copy())
+    by_affiliation, affiliation_time = timed(IdentifyAuthors.parse_out_emails,author_df.copy())
+    pd.testing.assert_series_equal(by_row['email'],by_affiliation['email'],check_dtype=False)
+    print('parse_out_emails\trows\tby_row_s\tby_affiliation_s')
+    print('\t%d\t%.3f\t%.3f' % (len(author_df),row_time,affiliation_time))
+
+    with tempfile.TemporaryDirectory() as datapath:
+        DatasetWriter(datapath,'author_df').write(by_affiliation)
+        as_text, text_time = timed(get_clean_authors_as_text,datapath)
+        encoded, encoded_time = timed(PrioritizeGenes.get_clean_authors,datapath)
+    pd.testing.assert_frame_equal(as_text.astype(str).reset_index(drop=True),encoded.astype(str).reset_index(drop=True))
+    print('get_clean_authors\trows\ttext_s\ttext_MB\tencoded_s\tencoded_MB')
+    print('\t%d\t%.3f\t%.1f\t%.3f\t%.1f' % (len(encoded),text_time,megabytes(as_text),encoded_time,megabytes(encoded)))
+
+    from_text, from_text_time = timed(PrioritizeGenes.build_author_table,gene_pmid,as_text)
+    from_encoded, from_encoded_time = timed(PrioritizeGenes.build_author_table,gene_pmid,encoded)
+    pd.testing.assert_frame_equal(canonical(from_text),canonical(from_encoded))
+    print('build_author_table\tresult_rows\ttext_s\tencoded_s')
+    print('\t%d\t%.3f\t%.3f' % (len(from_encoded),from_text_time,from_encoded_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='dictionary-encoded author table benchmark')
+    parser.add_argument('--records',type=int,default=100000)
+    parser.add_argument('--genes',type=int,default=9000)
+    args = parser.parse_args()
+    run(args.records,args.genes)
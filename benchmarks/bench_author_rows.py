@@ -0,0 +1,77 @@
+###############################################################################
+## Benchmark: building author_df from Medline records
+## Compares the old approach (a small DataFrame per PMID, pd.concat onto the
+## growing author_df) with the append-only column builders in IdentifyAuthors
+## Records are synthetic Medline dictionaries shaped like Medline.parse output
+## Usage: python benchmarks/bench_author_rows.py [--sizes 1000 2000 4000 8000]
+###############################################################################
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import IdentifyAuthors
+
+
+def synthetic_medline_records(n,seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        nauthors = rng.randint(1,15)
+        surnames = ['Author%d' % rng.randint(0,5000) for x in range(nauthors)]
+        record = {'PMID':str(10000000+i),'DP':'%d %s' % (rng.randint(1970,2022),rng.choice(['Jan','Jun','Dec']))}
+        if rng.random() > 0.02:
+            record['AU'] = [x+' A' for x in surnames]
+            record['FAU'] = [x+', Anne' for x in surnames]
+        if rng.random() > 0.3:
+            record['AD'] = ['Department %d, University %d, City. a%d@univ%d.edu.' % (rng.randint(0,50),rng.randint(0,500),i,x)
+                            for x in range(rng.randint(1,nauthors))]
+        records.append(record)
+    return(records)
+
+
+#### the pre-columnar implementation, kept here as the baseline
+def author_df_by_concat(records):
+    author_df = pd.DataFrame(columns = ["AU", "FullName","AuthorDetails","pmid","publish_date"])
+    for record in records:
+        PublicationDate = record.get("DP","?")
+        tmp_df = pd.DataFrame({'AU':pd.Series(record.get("AU","?")), "FullName":pd.Series(record.get("FAU","?")),'AuthorDetails': pd.Series(record.get("AD","?"))})
+        tmp_df['pmid']=record['PMID']
+        tmp_df['publish_date']=PublicationDate
+        author_df = pd.concat((author_df,tmp_df),ignore_index=True)
+    return(author_df)
+
+
+def author_df_by_columns(records):
+    author_columns = IdentifyAuthors.new_author_columns()
+    for record in records:
+        IdentifyAuthors.append_author_rows(author_columns,record.get("AU","?"),record.get("FAU","?"),record.get("AD","?"),
+                                           pmid=record['PMID'],publish_date=record.get("DP","?"))
+    return(IdentifyAuthors.build_author_df(author_columns))
+
+
+def run(sizes,skip_concat_above=20000):
+    print('records\trows\tconcat_s\tcolumns_s')
+    for n in sizes:
+        records = synthetic_medline_records(n)
+        start = time.perf_counter()
+        by_columns = author_df_by_columns(records)
+        columns_time = time.perf_counter()-start
+        concat_time = float('nan')
+        if n <= skip_concat_above:
+            start = time.perf_counter()
+            by_concat = author_df_by_concat(records)
+            concat_time = time.perf_counter()-start
+            pd.testing.assert_frame_equal(by_concat,by_columns,check_dtype=False)
+        print('%d\t%d\t%.3f\t%.3f' % (n,len(by_columns),concat_time,columns_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='author_df builder benchmark')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[1000,2000,4000,8000])
+    args = parser.parse_args()
+    run(args.sizes)
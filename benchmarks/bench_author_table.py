@@ -0,0 +1,86 @@
+###############################################################################
+## Benchmark: PrioritizeGenes.build_author_table
+## Compares the vectorized join/groupby with the old per-gene loop (isin scan,
+## groupby, merge and concat for every gene) on a synthetic author table.
+## tests/test_author_table.py checks that both produce the same potential authors
+## Usage: python benchmarks/bench_author_table.py [--genes 300] [--pmids 20000]
+##        [--large-genes 9000] [--large-pmids 300000]
+###############################################################################
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import PrioritizeGenes
+
+
+#### gene_pmid: every gene links to a random set of papers drawn from a shared pool
+#### clean_authors: every paper has 1-15 authors drawn from a pool with a skewed
+#### (zipf-like) popularity, so some authors show up on many papers per gene
+def synthetic_tables(n_genes,n_pmids,pmids_per_gene=100,n_authors=None,seed=0):
+    rng = np.random.default_rng(seed)
+    if n_authors is None:
+        n_authors = max(100,n_pmids//2)
+    geneids = rng.choice(np.arange(1,10*n_genes),size=n_genes,replace=False)
+    gene_counts = rng.integers(31,2*pmids_per_gene,size=n_genes)
+    gene_pmid = pd.DataFrame({'geneid':np.repeat(geneids,gene_counts),
+                              'pmid':rng.integers(0,n_pmids,size=gene_counts.sum())+10000000})
+    gene_pmid.drop_duplicates(keep='first',inplace=True)
+    authors_per_pmid = rng.integers(1,16,size=n_pmids)
+    author_ids = (rng.zipf(1.3,size=authors_per_pmid.sum()) % n_authors)
+    clean_authors = pd.DataFrame({'AU':['Author%d A' % x for x in author_ids],
+                                  'FullName':['Author%d, Anne' % x for x in author_ids],
+                                  'pmid':np.repeat(np.arange(n_pmids)+10000000,authors_per_pmid)})
+    has_email = rng.random(len(clean_authors)) < 0.1
+    clean_authors['email'] = np.where(has_email,['a%d@univ.edu' % x for x in author_ids],None)
+    return(gene_pmid.reset_index(drop=True),clean_authors)
+
+
+#### the pre-vectorized implementation, kept here as the baseline
+def author_table_by_gene_loop(gene_pmid,clean_authors):
+    author_by_gene = pd.DataFrame(columns=['geneid','AU','counts','FullName','email'])
+    for eachgene in gene_pmid['geneid'].unique().tolist():
+        pmids = gene_pmid['pmid'].loc[gene_pmid['geneid']==eachgene]
+        tmpauths = clean_authors.loc[clean_authors['pmid'].isin(pmids)]
+        cleanauths = tmpauths.drop_duplicates(subset=['AU','FullName','pmid'],keep='first')
+        authorlist = cleanauths.groupby(['AU']).size().reset_index(name='counts')
+        to_keep = authorlist.loc[authorlist['counts']>2].copy()
+        if len(to_keep)>0:
+            auth_deets = to_keep.merge(tmpauths,on='AU',how='inner')
+            auth_deets.drop('pmid',axis=1,inplace=True)
+            auth_deets.drop_duplicates(keep='first',inplace=True)
+            auth_deets['geneid']=eachgene
+            auth_deets.sort_values('counts',ascending=False,inplace=True)
+            author_by_gene = pd.concat((author_by_gene,auth_deets),ignore_index=True)
+    return(author_by_gene)
+
+
+def timed(function,*args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(result,time.perf_counter()-start)
+
+
+def run(n_genes,n_pmids,large_genes,large_pmids):
+    gene_pmid, clean_authors = synthetic_tables(n_genes,n_pmids)
+    vectorized, vectorized_time = timed(PrioritizeGenes.build_author_table,gene_pmid,clean_authors)
+    looped, loop_time = timed(author_table_by_gene_loop,gene_pmid,clean_authors)
+    print('genes\tauthor_rows\tresult_rows\tloop_s\tvectorized_s')
+    print('%d\t%d\t%d\t%.3f\t%.3f' % (n_genes,len(clean_authors),len(vectorized),loop_time,vectorized_time))
+    gene_pmid, clean_authors = synthetic_tables(large_genes,large_pmids)
+    vectorized, vectorized_time = timed(PrioritizeGenes.build_author_table,gene_pmid,clean_authors)
+    print('%d\t%d\t%d\t-\t%.3f' % (large_genes,len(clean_authors),len(vectorized),vectorized_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='potential author table benchmark')
+    parser.add_argument('--genes',type=int,default=300)
+    parser.add_argument('--pmids',type=int,default=20000)
+    parser.add_argument('--large-genes',type=int,default=9000)
+    parser.add_argument('--large-pmids',type=int,default=300000)
+    args = parser.parse_args()
+    run(args.genes,args.pmids,args.large_genes,args.large_pmids)
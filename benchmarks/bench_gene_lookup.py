@@ -0,0 +1,116 @@
+###############################################################################
+## Benchmark: indexed gene lookup store (GeneLookup)
+## Writes synthetic results (priority_by_size, the three rankings and
+## potential_authors) and Wikidata gene tables to a temporary directory, builds
+## the lookup store, and compares answering "score, ranks and top authors of
+## gene X" by loading the TSVs into pandas (as editors do today) against
+## GeneLookup.gene, for random gene IDs, labels, QIDs and titles. Also times
+## top N queries and the same lookups over the HTTP service, and checks that
+## both sides find the same score and authors, and that the top 20 by score
+## follow genes_by_score
+## Usage: python benchmarks/bench_gene_lookup.py [--genes 9300] [--lookups 500]
+###############################################################################
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import GeneLookup
+from genewiki_prioritization import PrioritizeGenes
+from genewiki_prioritization.TableStorage import write_table, export_tsv
+
+
+def synthetic_results(datapath,resultpath,n_genes,authors_per_gene=40,seed=0):
+    rng = np.random.default_rng(seed)
+    geneids = np.arange(n_genes)+100
+    wdgenes = pd.DataFrame({'QID':['Q%d' % (1000000+x) for x in geneids],'label':['GENE%d' % x for x in geneids],
+                            'geneID':geneids.astype(str),'proteinID':['Q%d' % (2000000+x) for x in geneids]})
+    wdgenes['wikilink'] = 'https://en.wikipedia.org/wiki/Gene_'+wdgenes['geneID']
+    write_table(wdgenes,datapath,'genes_en_wiki')
+    articles = pd.DataFrame({'title':['Gene_%d' % x for x in geneids],'page_length':rng.integers(50,10000,size=n_genes),
+                             'last_touched':'2022-03-01T00:00:00Z','lastrevid':rng.integers(1,10**9,size=n_genes),
+                             'geneID':geneids,'proteinID':wdgenes['proteinID'],'wikilink':wdgenes['wikilink'],'counts':1})
+    export_tsv(articles,resultpath,'priority_by_size')
+    pub_sum = pd.DataFrame({'geneid':geneids,'pubcount':rng.zipf(1.6,size=n_genes)+10,'median_pub_year':2010,'max_pub_year':2021})
+    for name, ranked in PrioritizeGenes.rank_genes(articles.rename(columns={'geneID':'geneid'}).merge(pub_sum,on='geneid')).items():
+        export_tsv(ranked,resultpath,name)
+    n_authors = n_genes*authors_per_gene
+    authors = pd.DataFrame({'geneid':np.repeat(geneids,authors_per_gene),'AU':['Author%d A' % x for x in rng.integers(0,n_authors//4,size=n_authors)],
+                            'counts':np.tile(np.arange(authors_per_gene+2,2,-1),n_genes)})
+    authors['FullName'] = authors['AU'].str.replace(' A',', Anne',regex=False)
+    authors['email'] = None
+    export_tsv(authors,resultpath,'potential_authors')
+    return(wdgenes)
+
+
+#### What answering one lookup takes without the store
+def lookup_with_pandas(datapath,resultpath,label,n_authors=10):
+    wdgenes = pd.read_parquet(os.path.join(datapath,'genes_en_wiki.parquet'))
+    geneids = wdgenes.loc[wdgenes['label']==label,'geneID'].astype(int).unique()
+    by_score = pd.read_csv(os.path.join(resultpath,'genes_by_score.tsv'),sep='\t',index_col=0)
+    priority_by_size = pd.read_csv(os.path.join(resultpath,'priority_by_size.tsv'),sep='\t',index_col=0)
+    authors = pd.read_csv(os.path.join(resultpath,'potential_authors.tsv'),sep='\t',index_col=0)
+    return(by_score.loc[by_score['geneid'].isin(geneids)],priority_by_size.loc[priority_by_size['geneID'].isin(geneids)],
+           authors.loc[authors['geneid'].isin(geneids)].head(n_authors))
+
+
+def run(n_genes,n_lookups):
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as datapath, tempfile.TemporaryDirectory() as resultpath:
+        wdgenes = synthetic_results(datapath,resultpath,n_genes)
+        start = time.perf_counter()
+        path = GeneLookup.build_gene_lookup(datapath,resultpath)
+        print('build_s\t%.3f\tstore_MB\t%.1f' % (time.perf_counter()-start,os.path.getsize(path)/1e6))
+
+        rows = wdgenes.sample(n=n_lookups,random_state=0)
+        keys = [rng.choice([row.geneID,row.label,row.QID,row.wikilink.rsplit('/',1)[1]]) for row in rows.itertuples()]
+        start = time.perf_counter()
+        checks = [lookup_with_pandas(datapath,resultpath,label) for label in rows['label'][:10]]
+        pandas_time = (time.perf_counter()-start)/10
+        lookup = GeneLookup.GeneLookup(path)
+        start = time.perf_counter()
+        found = [lookup.gene(key) for key in keys]
+        store_time = (time.perf_counter()-start)/n_lookups
+        for (by_score, by_size, authors), entry in zip(checks,found[:10]):
+            assert [x['AU'] for x in entry[0]['authors']] == authors['AU'].tolist()
+            if len(by_score) > 0:
+                assert entry[0]['articles'][0]['priority_score'] == by_score['priority_score'].iloc[0]
+        assert all(len(x) == 1 and x[0]['geneid'] == int(row.geneID) for x,row in zip(found,rows.itertuples()))
+        start = time.perf_counter()
+        for i in range(100):
+            top = lookup.top('score',20)
+        top_time = (time.perf_counter()-start)/100
+        by_score = pd.read_csv(os.path.join(resultpath,'genes_by_score.tsv'),sep='\t',index_col=0)
+        assert [x['rank_score'] for x in top] == list(range(1,21))
+        assert [x['title'] for x in top] == by_score['title'].head(20).tolist()
+        print('lookup\tpandas_ms\tstore_ms\ttop20_ms')
+        print('\t%.1f\t%.3f\t%.3f' % (pandas_time*1000,store_time*1000,top_time*1000))
+
+        server = GeneLookup.http.server.ThreadingHTTPServer(('127.0.0.1',0),GeneLookup.GeneLookupHandler)
+        server.lookup = lookup
+        threading.Thread(target=server.serve_forever,daemon=True).start()
+        url = 'http://127.0.0.1:%d/gene/' % server.server_address[1]
+        start = time.perf_counter()
+        for key in keys:
+            with urllib.request.urlopen(url+urllib.request.quote(str(key))) as response:
+                json.load(response)
+        print('http_lookup_ms\t%.3f' % ((time.perf_counter()-start)/n_lookups*1000))
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='gene lookup store benchmark')
+    parser.add_argument('--genes',type=int,default=9300)
+    parser.add_argument('--lookups',type=int,default=500)
+    args = parser.parse_args()
+    run(args.genes,args.lookups)
@@ -0,0 +1,68 @@
+###############################################################################
+## Benchmark: HTTP response cache (HTTPCache.ResponseCache)
+## Runs the SPARQL gene query (get_wd_gene_table) and the monthly pageviews
+## (get_monthly_pvs) against a stand-in server that sends ETags and answers
+## matching If-None-Match requests with 304s, three ways:
+##   no_cache  every request downloads the full body
+##   cold      an empty cache in a temporary data/ directory (stores bodies)
+##   warm      the same cache again, so every request is revalidated
+## and reports seconds, the body bytes the server sent and the cache counts,
+## and checks that every run gives the same tables
+## Usage: python benchmarks/bench_http_cache.py [--scale 0.05] [--latency 0.02]
+###############################################################################
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import FetchGeneInfo
+from genewiki_prioritization.RunReport import REPORT
+import standins
+import synthetic
+import run_benchmarks
+
+
+def sparql(server,data):
+    return(FetchGeneInfo.get_wd_gene_table(url=server.url+'/sparql'))
+
+def pageviews(server,data):
+    no_missing = pd.DataFrame({'Gene Wiki Page':['https://en.wikipedia.org/wiki/'+x for x in data.titles]})
+    return(FetchGeneInfo.get_monthly_pvs(run_benchmarks.PV_PARAMETERS,{'User-Agent':'benchmark'},no_missing,
+                                         api_url=server.url+'/api/rest_v1/metrics/pageviews/per-article/')[0])
+
+def timed_run(function,server,data):
+    REPORT.counters.pop('http_cache',None)
+    server.counts['body_bytes'] = 0
+    start = time.perf_counter()
+    table = function(server,data)
+    seconds = time.perf_counter()-start
+    return(table,seconds,server.counts['body_bytes'],dict(REPORT.counters.get('http_cache',{})))
+
+
+def run(scale,latency):
+    data = synthetic.StandInData(scale)
+    print('stage\trun\tseconds\tbody_MB\tcache')
+    with standins.StandInServer(data,latency,etags=True) as server, tempfile.TemporaryDirectory() as datapath:
+        for function in [sparql,pageviews]:
+            tables = []
+            for label, cachepath in [('no_cache',None),('cold',datapath),('warm',datapath)]:
+                if label != 'warm':
+                    FetchGeneInfo.use_http_cache(cachepath)
+                table, seconds, nbytes, counts = timed_run(function,server,data)
+                tables.append(table.sort_values(list(table.columns)).reset_index(drop=True))
+                print('%s\t%s\t%.3f\t%.2f\t%s' % (function.__name__,label,seconds,nbytes/1e6,counts))
+            for table in tables[1:]:
+                pd.testing.assert_frame_equal(tables[0],table)
+    FetchGeneInfo.use_http_cache(None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP response cache benchmark')
+    parser.add_argument('--scale',type=float,default=0.05,help='fraction of the size of a full run')
+    parser.add_argument('--latency',type=float,default=0.02,help='seconds added to every stand-in call')
+    args = parser.parse_args()
+    run(args.scale,args.latency)
@@ -0,0 +1,71 @@
+###############################################################################
+## Benchmark: PrioritizeGenes.generate_pub_summary
+## Compares the single groupby.agg pass (years parsed once per distinct date)
+## with the old three-groupby version (regex over every row, then merges) on a
+## synthetic PublicationDetailsDF, and checks both give the same summary
+## Usage: python benchmarks/bench_pub_summary.py [--rows 3000000] [--genes 9000]
+###############################################################################
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import PrioritizeGenes
+
+MONTHS = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+
+#### Medline DP values: mostly 'YYYY Mon', some 'YYYY Mon DD', seasons and '?'
+def synthetic_pub_details(n_rows,n_genes,seed=0):
+    rng = np.random.default_rng(seed)
+    dates = ['%d %s' % (y,m) for y in range(1950,2023) for m in MONTHS]
+    dates += ['%d %s %d' % (y,m,d) for y in range(2000,2023) for m in MONTHS for d in (1,15)]
+    dates += ['%d Winter' % y for y in range(1970,2023)] + ['?']
+    pub_details = pd.DataFrame({'geneid':rng.integers(1,10*n_genes,size=n_genes)[rng.integers(0,n_genes,size=n_rows)],
+                                'pmid':rng.integers(10000000,40000000,size=n_rows),
+                                'PublicationDate':np.array(dates,dtype=object)[rng.integers(0,len(dates),size=n_rows)],
+                                'PubDateType':'DP'})
+    return(pub_details)
+
+
+#### the pre-aggregation implementation, kept here as the baseline
+def pub_summary_by_merges(pub_details):
+    pub_details = pub_details.copy()
+    pub_details['year'] = pub_details['PublicationDate'].str.extract(r'(\d\d\d\d)')
+    pub_details.drop('PubDateType',axis=1,inplace=True)
+    pub_details.drop_duplicates(keep='first',inplace=True)
+    pub_details['year'] = pub_details['year'].fillna(0).astype(int)
+    pub_frequency = pub_details.groupby('geneid').size().reset_index(name='pubcount')
+    median_year = pub_details.groupby('geneid')['year'].median().reset_index(name='median_pub_year')
+    median_year['median_pub_year'] = median_year['median_pub_year'].astype(int)
+    max_year = pub_details.groupby('geneid')['year'].max().reset_index(name='max_pub_year')
+    max_year['max_pub_year'] = max_year['max_pub_year'].astype(int)
+    pub_sum = pub_frequency.merge(median_year.merge(max_year,on='geneid',how='left'),on='geneid',how='left').copy()
+    return(pub_sum)
+
+
+def timed(function,*args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(result,time.perf_counter()-start)
+
+
+def run(n_rows,n_genes):
+    pub_details = synthetic_pub_details(n_rows,n_genes)
+    merged, merge_time = timed(pub_summary_by_merges,pub_details)
+    aggregated, agg_time = timed(PrioritizeGenes.generate_pub_summary,None,pub_details)
+    pd.testing.assert_frame_equal(merged,aggregated,check_dtype=False)
+    print('rows\tgenes\tmerges_s\tagg_s')
+    print('%d\t%d\t%.3f\t%.3f' % (n_rows,len(aggregated),merge_time,agg_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='publication summary benchmark')
+    parser.add_argument('--rows',type=int,default=3000000)
+    parser.add_argument('--genes',type=int,default=9000)
+    args = parser.parse_args()
+    run(args.rows,args.genes)
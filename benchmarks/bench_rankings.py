@@ -0,0 +1,98 @@
+###############################################################################
+## Benchmark: ranking the gene summary (PrioritizeGenes.rank_genes)
+## Compares the old filter, score and three full sorts with head(500) against
+## rank_genes' top-k selection on a synthetic gene summary, and checks that
+## rank_genes gives the same tables (columns and row order) as the old steps
+## done with stable sorts. The old code's quicksort is not stable, so its
+## order within ties is arbitrary; rank_genes keeps ties in summary order.
+## Then times sweep_rankings over a grid of thresholds and weights against
+## calling the old implementation once per variant
+## Usage: python benchmarks/bench_rankings.py [--genes 12600] [--variants 4 4 4]
+###############################################################################
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import PrioritizeGenes
+
+
+#### gene summary shaped like priority_by_size merged with the publication
+#### summary; genes with several proteins repeat their row, so there are ties
+def synthetic_gene_summary(n_genes,seed=0):
+    rng = np.random.default_rng(seed)
+    geneids = np.repeat(np.arange(n_genes)+100,rng.integers(1,3,size=n_genes))
+    lengths = rng.integers(50,10000,size=n_genes)
+    pubcounts = rng.zipf(1.6,size=n_genes)+10
+    codes = geneids-100
+    return(pd.DataFrame({'title':['Gene_%d' % x for x in geneids],'page_length':lengths[codes],'geneid':geneids,
+                         'pubcount':pubcounts[codes],'median_pub_year':2010,'max_pub_year':2021}))
+
+
+#### the old implementation, kept here as the baseline (returns instead of exporting)
+def rank_by_full_sorts(gene_summary,min_pubcount=30,min_pagelength=200,weights=(10000,2800)):
+    filtered_gene_summary = gene_summary.loc[((gene_summary['pubcount']>min_pubcount) & (gene_summary['page_length']>min_pagelength))].copy()
+    filtered_gene_summary.sort_values('page_length',ascending=True,inplace=True)
+    by_length = filtered_gene_summary.head(n=500)
+    scored_gene_summary = filtered_gene_summary.copy()
+    scored_gene_summary['priority_score']= weights[0]/scored_gene_summary['page_length']+(scored_gene_summary['pubcount']/weights[1])
+    scored_gene_summary.sort_values('priority_score',ascending=False,inplace=True)
+    by_score = scored_gene_summary.head(n=500)
+    scored_gene_summary.sort_values('pubcount',ascending=False,inplace=True)
+    return({'genes_by_wiki_length':by_length,'genes_by_score':by_score,'genes_by_pubcount':scored_gene_summary.head(n=500)})
+
+#### the same steps with stable sorts, each from the summary order, so ties
+#### come out in summary order (the old code sorted pubcount from the score order)
+def rank_by_stable_sorts(gene_summary,min_pubcount=30,min_pagelength=200,weights=(10000,2800)):
+    filtered_gene_summary = gene_summary.loc[((gene_summary['pubcount']>min_pubcount) & (gene_summary['page_length']>min_pagelength))].copy()
+    by_length = filtered_gene_summary.sort_values('page_length',ascending=True,kind='mergesort').head(n=500)
+    scored_gene_summary = filtered_gene_summary.copy()
+    scored_gene_summary['priority_score']= weights[0]/scored_gene_summary['page_length']+(scored_gene_summary['pubcount']/weights[1])
+    return({'genes_by_wiki_length':by_length,
+            'genes_by_score':scored_gene_summary.sort_values('priority_score',ascending=False,kind='mergesort').head(n=500),
+            'genes_by_pubcount':scored_gene_summary.sort_values('pubcount',ascending=False,kind='mergesort').head(n=500)})
+
+
+def timed(function,*args,**kwargs):
+    start = time.perf_counter()
+    result = function(*args,**kwargs)
+    return(result,time.perf_counter()-start)
+
+
+def run(n_genes,variants,repeats=20):
+    gene_summary = synthetic_gene_summary(n_genes)
+    old, old_time = timed(lambda: [rank_by_full_sorts(gene_summary) for i in range(repeats)])
+    new, new_time = timed(lambda: [PrioritizeGenes.rank_genes(gene_summary) for i in range(repeats)])
+    stable = rank_by_stable_sorts(gene_summary)
+    for name in PrioritizeGenes.RANKINGS:
+        pd.testing.assert_frame_equal(stable[name],new[0][name])
+    print('rows\tfull_sorts_s\ttop_k_s')
+    print('%d\t%.4f\t%.4f' % (len(gene_summary),old_time/repeats,new_time/repeats))
+
+    min_pubcounts = list(np.linspace(20,60,variants[0]).astype(int))
+    min_pagelengths = list(np.linspace(100,400,variants[1]).astype(int))
+    weights = [{'page_length':x,'pubcount':2800} for x in np.linspace(5000,20000,variants[2])]
+    swept, sweep_time = timed(PrioritizeGenes.sweep_rankings,gene_summary,min_pubcounts,min_pagelengths,weights)
+    loop_time = 0.0
+    for variant, (pubcount, pagelength, weight) in enumerate(itertools.product(min_pubcounts,min_pagelengths,weights)):
+        old, seconds = timed(rank_by_full_sorts,gene_summary,pubcount,pagelength,(weight['page_length'],2800))
+        loop_time += seconds
+        stable = rank_by_stable_sorts(gene_summary,pubcount,pagelength,(weight['page_length'],2800))['genes_by_score']
+        variant_rows = swept.loc[swept['variant']==variant]
+        np.testing.assert_array_equal(stable['geneid'].to_numpy(),variant_rows['geneid'].to_numpy())
+        np.testing.assert_allclose(stable['priority_score'].to_numpy(),variant_rows['priority_score'].to_numpy())
+    print('variants\tloop_s\tsweep_s')
+    print('%d\t%.3f\t%.3f' % (swept['variant'].nunique(),loop_time,sweep_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='gene ranking benchmark')
+    parser.add_argument('--genes',type=int,default=12600)
+    parser.add_argument('--variants',type=int,nargs=3,default=[4,4,4],help='min_pubcount, min_pagelength and weight values in the sweep')
+    args = parser.parse_args()
+    run(args.genes,args.variants)
@@ -0,0 +1,129 @@
+###############################################################################
+## Benchmark: FetchGeneInfo SPARQL post-processing
+## Compares loading a whole SPARQL JSON document into pd.DataFrame(bindings)
+## and building each column with list comprehensions (the old get_*_wiki
+## functions and filter_wikis) against streaming the bindings through
+## sparql_bindings_to_df, strip_prefix and wikilinks_to_titles, on a synthetic
+## gene query result, and checks both give the same columns
+## Then fetches the gene query from the stand-in server (chunked, with ETags)
+## with get_wd_gene_table and measures peak memory (tracemalloc) with no HTTP
+## cache, an empty cache (cold, bodies stored as they stream) and the same
+## cache again (warm, answered with 304s from the stored bodies), and checks
+## the cache adds no more than the compressed bodies to the peak. The stand-in
+## server runs in the same process, so its copy of each body counts as well
+## Usage: python benchmarks/bench_sparql_convert.py [--rows 100000] [--scale 0.2]
+###############################################################################
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from genewiki_prioritization import FetchGeneInfo
+import standins
+import synthetic
+
+ENTITY = 'http://www.wikidata.org/entity/'
+BOOLEAN = 'http://www.w3.org/2001/XMLSchema#boolean'
+
+
+#### Gene query result: a gene can encode several proteins and articles are
+#### shared between genes, so URIs and links repeat like in the real results
+def synthetic_sparql_json(n_rows,seed=0):
+    rng = np.random.default_rng(seed)
+    genes = rng.integers(0,n_rows//2,size=n_rows)
+    bindings = []
+    for i, gene in enumerate(genes):
+        binding = {'item':{'type':'uri','value':ENTITY+'Q%d' % (1000000+gene)},
+                   'itemLabel':{'xml:lang':'en','type':'literal','value':'gene %d' % gene},
+                   'geneID':{'type':'literal','value':str(100+gene)},
+                   'proteinwdid':{'type':'uri','value':ENTITY+'Q%d' % (2000000+gene)},
+                   'hassitelink':{'datatype':BOOLEAN,'type':'literal','value':'true' if gene%5 else 'false'}}
+        if gene%3 == 0:
+            binding['genelink'] = {'type':'uri','value':'https://en.wikipedia.org/wiki/Gene_%d' % (gene//2)}
+        if gene%4 == 0:
+            binding['proteinlink'] = {'type':'uri','value':'https://en.wikipedia.org/wiki/Protein_%d' % (gene//4)}
+        bindings.append(binding)
+    return(json.dumps({'head':{'vars':FetchGeneInfo.WD_GENE_VARIABLES},'results':{'bindings':bindings}}))
+
+
+#### the per-element post-processing of the old get_*_wiki functions
+def convert_by_comprehensions(document):
+    data = json.loads(document)
+    datadf = pd.DataFrame(data['results']['bindings'])
+    datadf['uri'] = [x['value'] for x in datadf['item']]
+    datadf['label'] = [x['value'] for x in datadf['itemLabel']]
+    datadf['geneID'] = [x['value'] for x in datadf['geneID']]
+    datadf['QID'] = [x.replace('http://www.wikidata.org/entity/','') for x in datadf['uri']]
+    datadf['proteinuri'] = [x['value'] for x in datadf['proteinwdid']]
+    datadf['proteinID'] = [x.replace('http://www.wikidata.org/entity/','') for x in datadf['proteinuri']]
+    datadf['wikilink'] = [x['value'] if isinstance(x,dict) else None for x in datadf['genelink']]
+    links = datadf['wikilink'].dropna()
+    titles = [x.replace(" ","_").replace("https://","http://").replace("http://en.wikipedia.org/wiki/","") for x in links]
+    return(datadf[['QID','label','geneID','proteinID']],titles)
+
+
+def convert_by_columns(document,chunksize=FetchGeneInfo.WD_CHUNKSIZE):
+    chunks = (document[i:i+chunksize] for i in range(0,len(document),chunksize))
+    datadf = FetchGeneInfo.sparql_bindings_to_df(FetchGeneInfo.iter_sparql_bindings(chunks),FetchGeneInfo.WD_GENE_VARIABLES)
+    datadf = FetchGeneInfo.clean_wd_gene_table(datadf)
+    titles = FetchGeneInfo.wikilinks_to_titles(datadf['genelink'].dropna())
+    return(datadf[['QID','label','geneID','proteinID']],titles.tolist())
+
+
+def timed(function,*args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(result,time.perf_counter()-start)
+
+
+def peak_memory(function,*args):
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        return(result,tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+
+def run_cache_memory(scale):
+    data = synthetic.StandInData(scale)
+    print('cache\tbody_MB\tpeak_MB\tstored_MB')
+    with standins.StandInServer(data,etags=True,chunked=True) as server, tempfile.TemporaryDirectory() as datapath:
+        peaks = {}
+        for label, cachepath in [('no_cache',None),('cold',datapath),('warm',datapath)]:
+            if label != 'warm':
+                FetchGeneInfo.use_http_cache(cachepath)
+            server.counts['body_bytes'] = 0
+            table, peaks[label] = peak_memory(FetchGeneInfo.get_wd_gene_table,FetchGeneInfo.WD_PAGES,server.url+'/sparql')
+            cache = FetchGeneInfo.get_http_cache()
+            stored = cache.size() if cache is not None else 0
+            print('%s\t%.2f\t%.1f\t%.2f' % (label,server.counts['body_bytes']/1e6,peaks[label]/1e6,stored/1e6))
+        FetchGeneInfo.use_http_cache(None)
+    #### each page's compressed body is held once while it streams in or out
+    assert max(peaks['cold'],peaks['warm']) <= 1.1*peaks['no_cache']+stored
+
+
+def run(n_rows,scale):
+    document = synthetic_sparql_json(n_rows)
+    (old_df,old_titles), old_time = timed(convert_by_comprehensions,document)
+    (new_df,new_titles), new_time = timed(convert_by_columns,document)
+    pd.testing.assert_frame_equal(old_df.reset_index(drop=True),new_df.reset_index(drop=True),check_dtype=False)
+    assert old_titles == new_titles
+    print('rows\tMB\tcomprehensions_s\tcolumns_s')
+    print('%d\t%.1f\t%.3f\t%.3f' % (n_rows,len(document)/1e6,old_time,new_time))
+    run_cache_memory(scale)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SPARQL result conversion benchmark')
+    parser.add_argument('--rows',type=int,default=100000)
+    parser.add_argument('--scale',type=float,default=0.2,help='fraction of a full run served by the stand-in query service')
+    args = parser.parse_args()
+    run(args.rows,args.scale)
@@ -0,0 +1,185 @@
+###############################################################################
+## Offline benchmark suite for the pipeline stages
+## Runs each stage against the stand-in services in standins.py and the
+## synthetic data in synthetic.py, and reports per stage: items processed,
+## seconds, items per second, peak traced memory (tracemalloc, in a second
+## run so it does not slow down the timed one) and the calls each stand-in saw
+## Stages:
+##   wiki_volume_info  FetchGeneInfo.get_wiki_volume_info (MediaWiki)
+##   monthly_pvs       FetchGeneInfo.get_monthly_pvs (Wikimedia REST)
+##   wd_gene_table     FetchGeneInfo.get_wd_gene_table + split (SPARQL)
+##   detailed_pubs     IdentifyAuthors.retrieve_detailed_pubs_by_gene (Entrez)
+##   parse_out_emails  IdentifyAuthors.parse_out_emails
+##   pub_summary       PrioritizeGenes.generate_pub_summary
+##   author_table      PrioritizeGenes.build_author_table
+## The report is written as JSON (by default benchmarks/results/<commit>.json)
+## and --compare prints the change against a report from another commit
+## Usage: python benchmarks/run_benchmarks.py [--scale 0.02] [--latency 0.02]
+##        [--stages pub_summary,author_table] [--compare old.json] [--no-memory]
+###############################################################################
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0,REPO_DIR)
+import mwclient as mw
+from genewiki_prioritization import FetchGeneInfo
+from genewiki_prioritization import IdentifyAuthors
+from genewiki_prioritization import PrioritizeGenes
+import standins
+import synthetic
+
+STAGES = ['wiki_volume_info','monthly_pvs','wd_gene_table','detailed_pubs','parse_out_emails','pub_summary','author_table']
+PV_PARAMETERS = {'project':'en.wikipedia','access':'all-access','agent':'user','granularity':'monthly',
+                 'start':'20210101','end':'20211231'}
+
+
+def get_commit():
+    try:
+        return(subprocess.check_output(['git','rev-parse','--short','HEAD'],cwd=REPO_DIR).decode().strip())
+    except (OSError,subprocess.CalledProcessError):
+        return('unknown')
+
+
+#### Each stage has a setup (not timed) returning the call to time and how
+#### many items it works through, and the stand-ins whose calls are counted
+def wiki_volume_info(args,data):
+    server = standins.StandInServer(data,args.latency,args.mediawiki_rate)
+    def setup():
+        mwsite = mw.Site(server.url.replace('http://',''),path='/w/',scheme='http',do_init=False,clients_useragent='benchmark')
+        return(lambda: FetchGeneInfo.get_wiki_volume_info(mwsite,data.titles,pause=0),len(data.titles))
+    return(setup,[server])
+
+def monthly_pvs(args,data):
+    server = standins.StandInServer(data,args.latency,args.pageview_rate)
+    def setup():
+        no_missing = pd.DataFrame({'Gene Wiki Page':['https://en.wikipedia.org/wiki/'+x for x in data.titles]})
+        api_url = server.url+'/api/rest_v1/metrics/pageviews/per-article/'
+        return(lambda: FetchGeneInfo.get_monthly_pvs(PV_PARAMETERS,{'User-Agent':'benchmark'},no_missing,api_url=api_url),len(data.titles))
+    return(setup,[server])
+
+def wd_gene_table(args,data):
+    server = standins.StandInServer(data,args.latency,args.sparql_rate)
+    def setup():
+        return(lambda: FetchGeneInfo.split_wd_gene_table(FetchGeneInfo.get_wd_gene_table(url=server.url+'/sparql')),len(data.gene_rows))
+    return(setup,[server])
+
+def detailed_pubs(args,data):
+    entrez = standins.StandInEntrez(data,args.latency,args.entrez_rate)
+    def setup():
+        IdentifyAuthors.Entrez = entrez
+        IdentifyAuthors.ENTREZ_PAUSE = args.entrez_pause
+        return(lambda: IdentifyAuthors.retrieve_detailed_pubs_by_gene(data.genes),len(data.genes))
+    return(setup,[entrez])
+
+def parse_out_emails(args,data):
+    author_df = synthetic.author_df(args.scale,args.seed)
+    return(lambda: (lambda: IdentifyAuthors.parse_out_emails(author_df.copy()),len(author_df)),[])
+
+def pub_summary(args,data):
+    pub_details = synthetic.pub_details(args.scale,args.seed)
+    return(lambda: (lambda: PrioritizeGenes.generate_pub_summary(None,pub_details),len(pub_details)),[])
+
+def author_table(args,data):
+    gene_pmid, clean_authors = synthetic.author_tables(args.scale,args.seed)
+    return(lambda: (lambda: PrioritizeGenes.build_author_table(gene_pmid,clean_authors),len(clean_authors)),[])
+
+
+def run_once(setup,memory=False):
+    function, items = setup()
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        function()
+        seconds = time.perf_counter()-start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return(items,seconds,peak)
+
+def stand_in_calls(standin):
+    calls = dict(getattr(standin,'counts',{}))
+    calls['rate_limited'] = standin.limit.limited
+    return(calls)
+
+def run_stage(name,args,data):
+    setup, servers = globals()[name](args,data)
+    for server in servers:
+        if isinstance(server,standins.StandInServer):
+            server.__enter__()
+    try:
+        items, seconds, peak = run_once(setup)
+        calls = [stand_in_calls(x) for x in servers]
+        if args.memory:
+            peak = run_once(setup,memory=True)[2]
+    finally:
+        for server in servers:
+            if isinstance(server,standins.StandInServer):
+                server.__exit__()
+    result = {'items':items,'seconds':round(seconds,4),'items_per_second':round(items/seconds,1) if seconds > 0 else None,
+              'peak_mb':round(peak/1e6,2) if peak is not None else None}
+    if len(calls) > 0:
+        result['calls'] = calls[0]
+    return(result)
+
+
+def compare(report,previous):
+    print('\nstage\titems/s\tprevious\tchange\tpeak_mb\tprevious')
+    for name, result in report['stages'].items():
+        old = previous.get('stages',{}).get(name)
+        if old is None:
+            continue
+        change = '%+.1f%%' % (100*(result['items_per_second']/old['items_per_second']-1)) if old.get('items_per_second') else '-'
+        print('%s\t%s\t%s\t%s\t%s\t%s' % (name,result['items_per_second'],old['items_per_second'],change,result['peak_mb'],old.get('peak_mb')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='offline benchmarks for the pipeline stages')
+    parser.add_argument('--stages',default=','.join(STAGES))
+    parser.add_argument('--scale',type=float,default=0.02,help='fraction of the size of a full run')
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--latency',type=float,default=0.02,help='seconds added to every stand-in call')
+    parser.add_argument('--mediawiki-rate',type=float,default=None)
+    parser.add_argument('--pageview-rate',type=float,default=FetchGeneInfo.PV_RATE_LIMIT)
+    parser.add_argument('--sparql-rate',type=float,default=None)
+    parser.add_argument('--entrez-rate',type=float,default=10)
+    parser.add_argument('--entrez-pause',type=float,default=0.1,help='IdentifyAuthors.ENTREZ_PAUSE during the run')
+    parser.add_argument('--no-memory',dest='memory',action='store_false')
+    parser.add_argument('--output',default=None)
+    parser.add_argument('--compare',default=None,help='report from an earlier run to compare with')
+    args = parser.parse_args()
+
+    FetchGeneInfo.use_http_cache(None) ## every run goes to the stand-ins (see bench_http_cache.py)
+    data = synthetic.StandInData(args.scale,args.seed)
+    report = {'commit':get_commit(),'python':platform.python_version(),'pandas':pd.__version__,
+              'settings':{k:v for k,v in vars(args).items() if k not in ('output','compare')},'stages':{}}
+    for name in args.stages.split(','):
+        print('running ',name)
+        report['stages'][name] = run_stage(name,args,data)
+        print(json.dumps(report['stages'][name]))
+
+    output = args.output or os.path.join(BENCH_DIR,'results',report['commit']+'.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)),exist_ok=True)
+    with open(output,'w') as outwrite:
+        json.dump(report,outwrite,indent=2)
+    print('report: ',output)
+    if args.compare is not None:
+        with open(args.compare) as previous:
+            compare(report,json.load(previous))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+###############################################################################
+## Local stand-ins for the services the pipelines call, for benchmarking
+## StandInServer is one HTTP server on 127.0.0.1 that answers like:
+##   MediaWiki (/w/api.php): action=query&prop=info for batches of titles,
+##     with normalized titles, redirects and missing pages
+##   Wikimedia REST (/api/rest_v1/metrics/pageviews/per-article/...): monthly
+##     pageviews for a title, 404 for titles without data
+##   Wikidata SPARQL (/sparql): the gene query results, paged by the last
+##     digit of the gene ID like the real query
+## StandInEntrez replaces Bio.Entrez in IdentifyAuthors (elink, epost, efetch
+## and read), since Bio.Entrez always calls the real E-utilities
+## Both add a fixed latency to every call and enforce a rate limit: calls over
+## the limit get a 429 with Retry-After (HTTP) or an HTTPError 429 (Entrez),
+## the same as the real services. The data they serve comes from synthetic.py
+## With etags=True the server sends an ETag with every 200 and answers a
+## request whose If-None-Match matches it with a 304 and no body, like the
+## Wikimedia services; body_bytes counts the body bytes it sent
+## With chunked=True bodies are sent with Transfer-Encoding: chunked and no
+## Content-Length, like the query service's large results
+###############################################################################
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+import http.server
+
+CHUNK_BYTES = 64*1024
+
+
+#### Fixed window rate limit shared by all the threads of a stand-in
+class RateLimit(object):
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.window = int(time.monotonic())
+        self.used = 0
+        self.limited = 0
+
+    def allow(self):
+        if self.rate is None:
+            return(True)
+        with self.lock:
+            now = int(time.monotonic())
+            if now != self.window:
+                self.window = now
+                self.used = 0
+            if self.used >= self.rate:
+                self.limited += 1
+                return(False)
+            self.used += 1
+            return(True)
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.respond(url.path,urllib.parse.parse_qs(url.query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length',0))).decode('utf-8')
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        params.update(urllib.parse.parse_qs(body))
+        self.respond(url.path,params)
+
+    def respond(self, path, params):
+        server = self.server
+        time.sleep(server.latency)
+        if path.startswith('/w/api.php'):
+            service = 'mediawiki'
+        elif path.startswith('/api/rest_v1/metrics/pageviews/per-article/'):
+            service = 'pageviews'
+        elif path.startswith('/sparql'):
+            service = 'sparql'
+        else:
+            self.send_body(404,b'')
+            return
+        server.count(service)
+        if not server.limit.allow():
+            self.send_body(429,b'{"error":"rate limited"}',{'Retry-After':'1'})
+            return
+        params = {k:v[0] for k,v in params.items()}
+        if service == 'mediawiki':
+            self.send_body(200,json.dumps(server.data.page_info(params.get('titles','').split('|'))).encode('utf-8'))
+        elif service == 'pageviews':
+            title = urllib.parse.unquote(path.split('/')[-4])
+            items = server.data.pageviews(title)
+            if items is None:
+                self.send_body(404,b'{"type":"not found"}')
+            else:
+                self.send_body(200,json.dumps({'items':items}).encode('utf-8'))
+        else:
+            self.send_body(200,server.data.sparql(params.get('query','')).encode('utf-8'),
+                           {'Content-Type':'application/sparql-results+json'})
+
+    def send_body(self, status, body, headers=None):
+        if status == 200 and self.server.etags:
+            headers = dict(headers or {},ETag='"%08x"' % zlib.crc32(body))
+            if self.headers.get('If-None-Match') == headers['ETag']:
+                status, body = 304, b''
+        self.server.count('body_bytes',len(body))
+        self.send_response(status)
+        if self.server.chunked:
+            self.send_header('Transfer-Encoding','chunked')
+        else:
+            self.send_header('Content-Length',str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key,value)
+        self.end_headers()
+        if self.server.chunked:
+            for i in range(0,len(body),CHUNK_BYTES):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(body[i:i+CHUNK_BYTES]),body[i:i+CHUNK_BYTES]))
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.wfile.write(body)
+
+
+#### data is a synthetic.StandInData; rate is requests per second (None for no limit)
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data, latency=0.0, rate=None, etags=False, chunked=False):
+        super().__init__(('127.0.0.1',0),StandInHandler)
+        self.etags = etags
+        self.chunked = chunked
+        self.data = data
+        self.latency = latency
+        self.limit = RateLimit(rate)
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever,daemon=True)
+
+    def count(self, service, n=1):
+        with self.counts_lock:
+            self.counts[service] = self.counts.get(service,0)+n
+
+    @property
+    def url(self):
+        return('http://127.0.0.1:%d' % self.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return(self)
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+#### Drop-in for Bio.Entrez as used by IdentifyAuthors
+class StandInEntrez(object):
+    email = None
+
+    def __init__(self, data, latency=0.0, rate=None):
+        self.data = data
+        self.latency = latency
+        self.limit = RateLimit(rate)
+        self.history = {}
+        self.lock = threading.Lock()
+        self.counts = {'elink':0,'epost':0,'efetch':0}
+
+    def call(self, name):
+        time.sleep(self.latency)
+        with self.lock:
+            self.counts[name] += 1
+        if not self.limit.allow():
+            raise urllib.error.HTTPError('https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'+name+'.fcgi',
+                                         429,'Too Many Requests',{'Retry-After':'1'},None)
+
+    def read(self, handle):
+        return(handle)
+
+    def elink(self, dbfrom, db, id, **kwargs):
+        self.call('elink')
+        ids = id if isinstance(id,list) else str(id).split(',')
+        linksets = []
+        for geneid in ids:
+            pmids = self.data.gene_pmids.get(str(geneid))
+            if pmids is None:
+                linksets.append({'IdList':[str(geneid)],'LinkSetDb':[]})
+                continue
+            linksets.append({'IdList':[str(geneid)],'LinkSetDb':[{'LinkName':'gene_pubmed','Link':[{'Id':x} for x in pmids]}]})
+        return(linksets)
+
+    def epost(self, db, id, WebEnv=None, **kwargs):
+        self.call('epost')
+        with self.lock:
+            query_key = str(len(self.history)+1)
+            self.history[query_key] = str(id).split(',')
+        return({'WebEnv':WebEnv or 'standin','QueryKey':query_key})
+
+    def efetch(self, db, rettype, retmode, id=None, webenv=None, query_key=None, retstart=0, retmax=None, **kwargs):
+        self.call('efetch')
+        if id is not None:
+            pmids = str(id).split(',')
+        else:
+            pmids = self.history[query_key][retstart:retstart+retmax]
+        return(io.StringIO('\n'.join(self.data.medline(x) for x in pmids)))
@@ -0,0 +1,140 @@
+###############################################################################
+## Synthetic data for the benchmark suite, sized from the real tables
+## REAL_SIZES holds the approximate size of each input in a full run (from
+## data/ and results/: ~12,600 wiki titles, ~46,000 gene query rows, ~9,300
+## priority genes); every generator takes a scale factor against those sizes
+## StandInData is what the stand-in services in standins.py serve: page info
+## and pageviews for the titles, the Wikidata gene query results, gene->PMID
+## links and Medline records. Everything is generated from a seed, so two runs
+## (or two commits) are benchmarked on the same data
+## The table generators reuse the ones in the single-stage benchmarks
+###############################################################################
+import json
+import random
+import re
+import zlib
+
+import bench_author_rows
+import bench_author_table
+import bench_pub_summary
+
+REAL_SIZES = {'titles':12600,          ## data/gene_wiki_vol_info
+              'sparql_rows':46000,     ## genes_no_wiki + genes_en_wiki + proteins_en_wiki
+              'genes':9300,            ## genes in results/priority_by_size
+              'pmids_per_gene':150,
+              'pub_rows':1400000,      ## PublicationDetailsDF
+              'medline_records':200000,
+              'author_pmids':300000}
+
+ENTITY = 'http://www.wikidata.org/entity/'
+BOOLEAN = 'http://www.w3.org/2001/XMLSchema#boolean'
+MONTHS = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+
+def scaled(name,scale):
+    return(max(1,int(REAL_SIZES[name]*scale)))
+
+
+class StandInData(object):
+    def __init__(self, scale=0.05, seed=0):
+        rng = random.Random(seed)
+        self.seed = seed
+        #### titles: about 2% missing, 3% redirects and 3% without pageviews
+        self.titles = []
+        self.pages = {}
+        self.redirects = {}
+        for i in range(scaled('titles',scale)):
+            roll = rng.random()
+            if roll < 0.02:
+                self.titles.append('Missing_gene_%d' % i)
+                continue
+            self.pages['Gene %d' % i] = {'pageid':i+1,'ns':0,'title':'Gene %d' % i,'length':rng.randint(500,60000),
+                                         'touched':'2022-03-%02dT00:00:00Z' % rng.randint(1,28),'lastrevid':1000000+i}
+            if roll < 0.05:
+                self.redirects['Gene alias %d' % i] = 'Gene %d' % i
+                self.titles.append('Gene_alias_%d' % i)
+            else:
+                self.titles.append('Gene_%d' % i)
+        self.no_pageviews = set(x for x in self.pages if rng.random() < 0.03)
+        #### gene query rows, a few genes encoding more than one protein
+        self.gene_rows = []
+        for i in range(scaled('sparql_rows',scale)):
+            gene = i if rng.random() > 0.05 else max(0,i-1)
+            row = {'item':{'type':'uri','value':ENTITY+'Q%d' % (1000000+gene)},
+                   'itemLabel':{'xml:lang':'en','type':'literal','value':'GENE%d' % gene},
+                   'geneID':{'type':'literal','value':str(100+gene)},
+                   'proteinwdid':{'type':'uri','value':ENTITY+'Q%d' % (2000000+i)},
+                   'hassitelink':{'datatype':BOOLEAN,'type':'literal','value':'true' if rng.random() > 0.2 else 'false'}}
+            if rng.random() < 0.33:
+                row['genelink'] = {'type':'uri','value':'https://en.wikipedia.org/wiki/Gene_%d' % gene}
+            if rng.random() < 0.05:
+                row['proteinlink'] = {'type':'uri','value':'https://en.wikipedia.org/wiki/Protein_%d' % i}
+            self.gene_rows.append(row)
+        #### gene->PMID links from a shared pool, about 1 in 5 genes with 30 or fewer
+        n_genes = scaled('genes',scale)
+        n_pmids = max(100,n_genes*REAL_SIZES['pmids_per_gene']//3)
+        self.genes = [1000+i for i in range(n_genes)]
+        self.gene_pmids = {}
+        for geneid in self.genes:
+            count = rng.randint(5,30) if rng.random() < 0.2 else rng.randint(31,2*REAL_SIZES['pmids_per_gene'])
+            self.gene_pmids[str(geneid)] = [str(10000000+x) for x in rng.sample(range(n_pmids),min(count,n_pmids))]
+
+    def page_info(self, titles):
+        query = {'normalized':[],'redirects':[],'pages':{}}
+        for eachtitle in titles:
+            normal = eachtitle.replace('_',' ')
+            if normal != eachtitle:
+                query['normalized'].append({'from':eachtitle,'to':normal})
+            if normal in self.redirects:
+                query['redirects'].append({'from':normal,'to':self.redirects[normal]})
+                normal = self.redirects[normal]
+            page = self.pages.get(normal)
+            if page is None:
+                query['pages'][str(-len(query['pages'])-1)] = {'ns':0,'title':normal,'missing':''}
+            else:
+                query['pages'][str(page['pageid'])] = page
+        return({'batchcomplete':'','query':query})
+
+    def pageviews(self, title):
+        normal = title.replace('_',' ')
+        if normal not in self.pages or normal in self.no_pageviews:
+            return(None)
+        views = zlib.crc32(normal.encode('utf-8'))
+        return([{'project':'en.wikipedia','article':title,'granularity':'monthly','timestamp':'2021%02d0100' % month,
+                 'access':'all-access','agent':'user','views':(views >> month) % 5000} for month in range(1,13)])
+
+    def sparql(self, query):
+        page = re.search(r'STRENDS\(\?geneID,"(\d)"\)',query)
+        rows = self.gene_rows
+        if page is not None:
+            rows = [x for x in rows if x['geneID']['value'].endswith(page.group(1))]
+        return(json_results(rows))
+
+    #### Medline text for a PMID, the same every time it is asked for
+    def medline(self, pmid):
+        rng = random.Random(int(pmid)*31+self.seed)
+        lines = ['PMID- %s' % pmid,'DP  - %d %s' % (rng.randint(1970,2022),rng.choice(MONTHS))]
+        for i in range(rng.randint(1,15)):
+            surname = 'Author%d' % rng.randint(0,20000)
+            lines.append('FAU - %s, Anne' % surname)
+            lines.append('AU  - %s A' % surname)
+            if rng.random() < 0.6:
+                lines.append('AD  - Department %d, University %d, City. a%s@univ%d.edu.' % (rng.randint(0,50),rng.randint(0,500),pmid,i))
+        return('\n'.join(lines)+'\n')
+
+
+def json_results(rows):
+    variables = ['item','itemLabel','geneID','proteinwdid','genelink','proteinlink','hassitelink']
+    return(json.dumps({'head':{'vars':variables},'results':{'bindings':rows}}))
+
+
+#### Tables for the stages that run on data already in data/
+def pub_details(scale,seed=0):
+    return(bench_pub_summary.synthetic_pub_details(scaled('pub_rows',scale),scaled('genes',scale),seed))
+
+def author_tables(scale,seed=0):
+    return(bench_author_table.synthetic_tables(scaled('genes',scale),scaled('author_pmids',scale),seed=seed))
+
+def author_df(scale,seed=0):
+    return(bench_author_rows.author_df_by_columns(bench_author_rows.synthetic_medline_records(scaled('medline_records',scale),seed)))
+
@@ -0,0 +1,659 @@
+#### Import libraries
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+import pandas as pd
+import os
+import json
+import re
+import urllib.parse
+import urllib.request
+import time
+import threading
+import concurrent.futures
+import email.utils
+from datetime import datetime
+from .TableStorage import read_table, write_table, export_tsv
+from .WikidataDump import read_gene_table, DUMP_WORKERS
+from .RunReport import stage, instrument_session
+from .HTTPCache import HTTP_CACHE, ResponseCache
+from . import DATA_PATH
+
+###############################################################################
+## Request nicely
+###############################################################################
+
+DEFAULT_TIMEOUT = 5 # seconds
+
+## cache, if given, is called on every request for the response cache to go
+## through (see HTTPCache), or None to send the request as it is
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def __init__(self, *args, **kwargs):
+        self.timeout = DEFAULT_TIMEOUT
+        if "timeout" in kwargs:
+            self.timeout = kwargs["timeout"]
+            del kwargs["timeout"]
+        self.cache = kwargs.pop("cache", None)
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        timeout = kwargs.get("timeout")
+        if timeout is None:
+            kwargs["timeout"] = self.timeout
+        cache = self.cache() if self.cache is not None else None
+        if cache is not None:
+            return cache.send(super().send, request, **kwargs)
+        return super().send(request, **kwargs)
+
+## Responses (SPARQL results, pageviews) are cached in data/cache/http.sqlite
+## and revalidated with their ETag/Last-Modified on the next run. The cache is
+## opened on first use; use_http_cache moves it to another data directory or
+## turns it off (None)
+http_cache_path = os.path.join(DATA_PATH,HTTP_CACHE)
+http_cache = None
+http_cache_lock = threading.Lock()
+
+def get_http_cache():
+    global http_cache
+    with http_cache_lock:
+        if http_cache is None and http_cache_path is not None:
+            http_cache = ResponseCache(http_cache_path)
+        return(http_cache)
+
+def use_http_cache(datapath):
+    global http_cache, http_cache_path
+    with http_cache_lock:
+        if http_cache is not None:
+            http_cache.close()
+        http_cache = None
+        http_cache_path = os.path.join(datapath,HTTP_CACHE) if datapath is not None else None
+
+## Set time outs, backoff, retries
+## The session is pooled and shared by every stage in the process; it is built
+## on first use so importing the module does not set up any connections
+httprequests = None
+session_lock = threading.Lock()
+
+def get_session():
+    global httprequests
+    with session_lock:
+        if httprequests is None:
+            session = requests.Session()
+            retry_strategy = Retry(
+                total=3,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+                method_whitelist=["HEAD", "GET", "OPTIONS"] ## Note this method is deprecated and replaced with `allowed_methods` for newer releases of requests library
+                #allowed_methods=["HEAD", "GET", "OPTIONS"] ## Note this method is deprecated and replaced with `allowed_methods` for newer releases of requests library
+            )
+            adapter = TimeoutHTTPAdapter(timeout=25,max_retries=retry_strategy,cache=get_http_cache)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            httprequests = instrument_session(session)
+    return(httprequests)
+
+## USER_AGENT is only needed once something is requested from Wikimedia
+def get_useragent():
+    return({'User-Agent': os.environ['USER_AGENT']})
+
+## mwclient is imported and the site connected on first use, and the site is
+## kept for the rest of the process
+mwsite = None
+
+def get_mwsite():
+    global mwsite
+    if mwsite is None:
+        import mwclient as mw
+        site = mw.Site('en.wikipedia.org', clients_useragent=get_useragent()['User-Agent'])
+        instrument_session(site.connection)
+        mwsite = site
+    return(mwsite)
+
+###############################################################################
+## This module uses mwclient to pull page size and edit stats on wikipedia pages  
+## for each gene given a list of gene wikipedia titles
+## Titles are sent to the MediaWiki API in batches (50 titles per request, or
+## 500 if the account has bot/apihighlimits rights) instead of one at a time.
+## Normalized and redirected titles are mapped back to the input titles, so
+## the 'title' column always matches the title that was asked for, while
+## 'page_title' holds the title of the page the info was actually taken from.
+## Pages that do not exist are returned in pagemissing, while titles that
+## could not be fetched at all (timeouts, API errors) are returned in pagefails
+## pause is the wait between batches (MW_PAUSE by default, 0 against a local stub)
+## filter_wikis waits MW_REFRESH_PAUSE instead: its batches are sent one after
+## another, and mwclient sends maxlag with each request and waits out the
+## servers' lag itself, so a fixed second per batch only slows the refresh down
+###############################################################################
+MW_MAX_TITLES = 50 ## per-request title limit for regular users
+MW_MAX_TITLES_BOT = 500 ## per-request title limit for accounts with apihighlimits
+MW_PAUSE = 1 ## seconds between batches
+MW_REFRESH_PAUSE = 0 ## seconds between batches in filter_wikis
+
+def get_title_batchsize(mwsite):
+    try:
+        if 'apihighlimits' in mwsite.rights:
+            return(MW_MAX_TITLES_BOT)
+    except Exception:
+        pass
+    return(MW_MAX_TITLES)
+
+#### Query page info for a batch of titles, following continuation tokens
+#### returns a dictionary of input title: page info (None if no page came back)
+def query_page_info(mwsite,titles):
+    pages = {}
+    normalized = {}
+    redirects = {}
+    params = {'prop':'info','titles':'|'.join(titles),'redirects':1,'continue':''}
+    while True:
+        result = mwsite.api('query',**params)
+        query = result.get('query',{})
+        for item in query.get('normalized',[]):
+            normalized[item['from']]=item['to']
+        for item in query.get('redirects',[]):
+            redirects[item['from']]=item['to']
+        results1 = query.get('pages',{})
+        if isinstance(results1,dict):
+            results1 = results1.values()
+        for results2 in results1:
+            pages.setdefault(results2['title'],{}).update(results2)
+        if 'continue' not in result:
+            break
+        params.update(result['continue'])
+    resolved = {}
+    for eachtitle in titles:
+        target = normalized.get(eachtitle,eachtitle)
+        seen = set()
+        while target in redirects and target not in seen:
+            seen.add(target)
+            target = redirects[target]
+        resolved[eachtitle] = pages.get(target)
+    return(resolved)
+
+def get_wiki_volume_info(mwsite,titlelist,batchsize=None,pause=MW_PAUSE):
+    print('obtaining wikipedia volume information')
+    if batchsize is None:
+        batchsize = get_title_batchsize(mwsite)
+    pageinfo=[]
+    pagemissing = []
+    pagefails = []
+    for i in range(0,len(titlelist),batchsize):
+        batch = titlelist[i:i+batchsize]
+        try:
+            with stage('page_info'):
+                resolved = query_page_info(mwsite,batch)
+        except Exception:
+            pagefails.extend(batch)
+            time.sleep(pause)
+            continue
+        for eachpage in batch:
+            results2 = resolved[eachpage]
+            if results2 is None or 'missing' in results2 or 'invalid' in results2:
+                pagemissing.append(eachpage)
+                continue
+            try:
+                tempdict={} #title, length/size, last_revised, last_revision_id
+                tempdict['title']=str(eachpage)
+                tempdict['page_title']=str(results2['title'])
+                tempdict['page_length']=int(results2['length'])
+                tempdict['last_touched']=str(results2['touched'])
+                tempdict['lastrevid']=str(results2['lastrevid'])
+                pageinfo.append(tempdict)
+            except (KeyError,TypeError,ValueError):
+                pagefails.append(eachpage)
+        time.sleep(pause)
+    return(pageinfo,pagemissing,pagefails)
+
+###############################################################################
+## Token bucket used to keep concurrent requests under an API's rate limit
+## rate is the number of requests allowed per second and capacity is the burst
+## size. When a server answers with 429/Retry-After, pause() holds back every
+## worker sharing the bucket, not just the one that was told to slow down
+###############################################################################
+class TokenBucket(object):
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0,self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed = max(0.0,now-self.updated)
+                self.tokens = min(self.capacity,self.tokens+elapsed*self.rate)
+                self.updated = max(now,self.updated)
+                if self.tokens >= 1 and now >= self.updated:
+                    self.tokens -= 1
+                    return
+                wait = max(self.updated-now,(1-self.tokens)/self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.tokens = 0
+            self.updated = max(self.updated,time.monotonic()+seconds)
+
+#### Convert a Retry-After header (seconds or an HTTP date) into seconds to wait
+def parse_retry_after(value,default=1):
+    if value is None:
+        return(default)
+    try:
+        return(max(0.0,float(value)))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return(max(0.0,retry_at.timestamp()-time.time()))
+    except (TypeError,ValueError):
+        return(default)
+
+#### Session for the pageview engine. 429s are left to the engine so that the
+#### Retry-After delay can be shared with every worker through the token bucket
+def get_pv_session(max_workers=None):
+    session = requests.Session()
+    pv_retry_strategy = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 504],
+        method_whitelist=["HEAD", "GET", "OPTIONS"],
+        respect_retry_after_header=False
+    )
+    pool_size = max(10,max_workers or 0)
+    pv_adapter = TimeoutHTTPAdapter(timeout=25,max_retries=pv_retry_strategy,pool_connections=pool_size,pool_maxsize=pool_size,cache=get_http_cache)
+    session.mount("https://", pv_adapter)
+    session.mount("http://", pv_adapter)
+    return(instrument_session(session))
+
+#### One pageview session per pool size, kept for the rest of the process
+pv_sessions = {}
+
+def get_shared_pv_session(max_workers=None):
+    pool_size = max(10,max_workers or 0)
+    with session_lock:
+        if pool_size not in pv_sessions:
+            pv_sessions[pool_size] = get_pv_session(pool_size)
+        return(pv_sessions[pool_size])
+
+###############################################################################
+## This module uses pulls pageview data from the Media Wiki PageViews API
+## More on the API here: https://wikimedia.org/api/rest_v1/#/Pageviews%20data/
+## The module pulls in a parameter dictionary, and the list of wiki titles
+## Parameters include:
+## project: en.wikipedia.org, other wikimedia projects
+## access: all-access, desktop, mobile-app, mobile-web
+## agent: all-agents, user, spider, bot
+## granularity: daily, monthly
+## start, end: timestamps in YYYYMMDD or YYYYMMDDHH format
+## Titles are fetched concurrently by a pool of max_workers threads. All of
+## the workers draw from one token bucket set to the REST API's allowance
+## (PV_RATE_LIMIT requests per second) and honor Retry-After on 429/503.
+## Rows are yielded as each title completes, so callers can stream them
+###############################################################################
+PV_API_URL = "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/"
+PV_RATE_LIMIT = 100 ## requests per second allowed by the Wikimedia REST API
+PV_MAX_WORKERS = 10
+PV_MAX_TRIES = 5
+
+def get_pv_url(page_view_parameters,title,api_url=PV_API_URL):
+    params = {'project':'en.wikipedia','access':'all-access','agent':'user','granularity':'monthly'}
+    params.update(page_view_parameters)
+    parts = [api_url.rstrip('/')]
+    for key in ['project','access','agent']:
+        parts.append(str(params[key]).strip('/'))
+    parts.append(urllib.parse.quote(title,safe=''))
+    for key in ['granularity','start','end']:
+        parts.append(str(params[key]).strip('/'))
+    return('/'.join(parts))
+
+def fetch_title_pvs(session,url,title,useragent,bucket,max_tries=PV_MAX_TRIES):
+    for attempt in range(max_tries):
+        bucket.acquire()
+        try:
+            r = session.get(url, headers=useragent)
+        except requests.exceptions.RequestException:
+            if attempt == max_tries-1:
+                raise
+            time.sleep(2**attempt)
+            continue
+        if r.status_code in (429,503):
+            bucket.pause(parse_retry_after(r.headers.get('Retry-After'),default=2**attempt))
+            continue
+        if r.status_code == 404:
+            return([{'title':title, 'views':-1, 'granularity':"no data",
+                     'timestamp':"00000000",'access':"not data",'agent':"no data"}])
+        r.raise_for_status()
+        items = r.json()
+        pvrows = []
+        for item in items.get("items",[]):
+            pvrows.append({'title':item["article"], 'views':int(item["views"]), 'granularity':item['granularity'],
+                           'timestamp':item["timestamp"],'access':item['access'],'agent':item['agent']})
+        return(pvrows)
+    raise requests.exceptions.RetryError('rate limited too many times: '+title)
+
+def iter_monthly_pvs(page_view_parameters,useragent,titlelist,api_url=PV_API_URL,
+                     rate=PV_RATE_LIMIT,max_workers=PV_MAX_WORKERS,session=None):
+    if session is None:
+        session = get_shared_pv_session(max_workers)
+    bucket = TokenBucket(rate)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for eachtitle in titlelist:
+            url = get_pv_url(page_view_parameters,eachtitle,api_url)
+            futures[executor.submit(fetch_title_pvs,session,url,eachtitle,useragent,bucket)] = eachtitle
+        for future in concurrent.futures.as_completed(futures):
+            eachtitle = futures[future]
+            try:
+                yield(eachtitle,future.result(),None)
+            except Exception as e:
+                yield(eachtitle,[],e)
+
+def get_monthly_pvs(page_view_parameters, useragent, no_missing, **kwargs):
+    no_missing['titlelist'] = wikilinks_to_titles(no_missing['Gene Wiki Page'])
+    pginfo = []
+    pgfails = []
+    print('obtaining wikipedia pageview information')
+    titlelist = no_missing['titlelist'].unique().tolist()
+    with stage('pageviews'):
+        for eachtitle,pvrows,error in iter_monthly_pvs(page_view_parameters,useragent,titlelist,**kwargs):
+            if error is not None:
+                pgfails.append(eachtitle)
+            else:
+                pginfo.extend(pvrows)
+
+    pginfodf = pd.DataFrame(pginfo,columns=['title','views','granularity','timestamp','access','agent'])
+    
+    return(pginfodf, pgfails)    
+
+###############################################################################
+## This module pulls every human gene with its protein and their English
+## Wikipedia sitelinks from Wikidata in one SPARQL query, then splits the
+## result into the four tables the rest of the pipeline uses:
+## genes_no_wiki: genes with no English Wikipedia article
+## proteins_no_wiki: genes whose protein has no English Wikipedia article
+## genes_en_wiki: genes with an English Wikipedia article, with the link
+## proteins_en_wiki: genes whose protein has an English Wikipedia article
+## As before, the no_wiki tables only include genes that have a sitelink to
+## some wiki (hassitelink)
+## The query can be split into pages by the last digit of the Entrez gene ID
+## (WD_PAGES), so no single request has to return the whole human gene scan.
+## The response is parsed a binding at a time as it streams in, keeping only
+## the values, rather than loading the whole JSON document first
+###############################################################################
+WD_SPARQL_URL = 'https://query.wikidata.org/sparql'
+WD_PAGES = [str(x) for x in range(10)] ## last digits of the gene IDs, one query each
+WD_CHUNKSIZE = 1024*1024
+SPARQL_SEPARATORS = re.compile(r'[\s,]*')
+
+WD_GENE_QUERY = """
+    SELECT ?item ?itemLabel ?geneID ?proteinwdid ?genelink ?proteinlink ?hassitelink
+    WHERE
+    {
+      ?item wdt:P31 wd:Q7187 .
+      ?item wdt:P703 wd:Q15978631 .
+      ?item wdt:P351 ?geneID .
+      ?item wdt:P688 ?proteinwdid .
+      %s
+      OPTIONAL {
+        ?genelink schema:about ?item .
+        ?genelink schema:isPartOf <https://en.wikipedia.org/> .
+      }
+      OPTIONAL {
+        ?proteinlink schema:about ?proteinwdid .
+        ?proteinlink schema:isPartOf <https://en.wikipedia.org/> .
+      }
+      BIND(EXISTS { ?sitelink schema:about ?item } AS ?hassitelink)
+
+    SERVICE wikibase:label { bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en" }
+    }
+"""
+WD_GENE_VARIABLES = ['item','itemLabel','geneID','proteinwdid','genelink','proteinlink','hassitelink']
+
+def get_wd_gene_query(page=None):
+    if page is None:
+        return(WD_GENE_QUERY % '')
+    return(WD_GENE_QUERY % ('FILTER(STRENDS(?geneID,"%s"))' % page))
+
+#### Yield each binding of a SPARQL JSON response as it is read
+#### chunks is an iterable of text, eg- response.iter_content(decode_unicode=True)
+def iter_sparql_bindings(chunks):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    chunks = iter(chunks)
+    found = False
+    for chunk in chunks:
+        buffer += chunk
+        i = buffer.find('"bindings"')
+        if i >= 0 and buffer.find('[',i) >= 0:
+            buffer = buffer[buffer.find('[',i)+1:]
+            found = True
+            break
+    if found == False:
+        return
+    pos = 0
+    while True:
+        pos = SPARQL_SEPARATORS.match(buffer,pos).end()
+        if buffer.startswith(']',pos):
+            return
+        try:
+            binding, pos = decoder.raw_decode(buffer,pos)
+        except ValueError:
+            chunk = next(chunks,None)
+            if chunk is None:
+                raise ValueError('SPARQL response ended in the middle of the results')
+            buffer = buffer[pos:]+chunk
+            pos = 0
+            continue
+        yield(binding)
+
+###############################################################################
+## Shared conversion of SPARQL JSON results into DataFrames
+## sparql_bindings_to_df fills one list per variable straight from the
+## bindings (None where a binding has no value), then types each column from
+## the datatype of its literals: xsd booleans become bool and xsd numbers
+## numeric, while URIs and plain strings stay as text
+## URIs and wikilinks repeat a lot (a protein for every gene row, the same
+## article for several genes), so entity IDs and page titles are worked out
+## once per distinct value and spread back over the rows with pd.factorize
+###############################################################################
+WD_ENTITY_PREFIX = 'http://www.wikidata.org/entity/'
+ENWIKI_PREFIX = 'http://en.wikipedia.org/wiki/'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+XSD_NUMBERS = [XSD+x for x in ['integer','int','long','decimal','double','float']]
+
+def sparql_bindings_to_df(bindings,variables):
+    columns = {x:[] for x in variables}
+    datatypes = {}
+    for binding in bindings:
+        for eachvar in variables:
+            value = binding.get(eachvar)
+            if value is None:
+                columns[eachvar].append(None)
+                continue
+            columns[eachvar].append(value['value'])
+            if eachvar not in datatypes and 'datatype' in value:
+                datatypes[eachvar] = value['datatype']
+    datadf = pd.DataFrame(columns,columns=variables)
+    for eachvar, datatype in datatypes.items():
+        if datatype == XSD+'boolean':
+            datadf[eachvar] = datadf[eachvar]=='true'
+        elif datatype in XSD_NUMBERS:
+            datadf[eachvar] = pd.to_numeric(datadf[eachvar])
+    return(datadf)
+
+#### Apply func once per distinct value of a column (missing values stay missing)
+def map_unique(values,func):
+    codes, uniques = pd.factorize(pd.Series(values))
+    mapped = pd.Series([func(x) for x in uniques],dtype=object)
+    result = mapped.reindex(codes).values
+    return(pd.Series(result,index=values.index if isinstance(values,pd.Series) else None))
+
+def strip_prefix(values,prefix):
+    return(map_unique(values,lambda x: x[len(prefix):] if x.startswith(prefix) else x))
+
+#### 'https://en.wikipedia.org/wiki/Gene_(x%27y)' -> 'Gene_(x'y)'
+def wikilink_to_title(wikilink):
+    title = wikilink.replace(" ","_").replace("https://","http://").replace(ENWIKI_PREFIX,"")
+    return(urllib.parse.unquote(title))
+
+def wikilinks_to_titles(values):
+    return(map_unique(values,wikilink_to_title))
+
+#### Run a SPARQL query and convert the streamed results to a DataFrame
+def get_sparql_table(query,variables,url=WD_SPARQL_URL,chunksize=WD_CHUNKSIZE):
+    r = get_session().get(url, params = {'format': 'json', 'query': query}, stream=True)
+    r.raise_for_status()
+    r.encoding = 'utf-8'
+    try:
+        chunks = r.iter_content(chunk_size=chunksize,decode_unicode=True)
+        table = sparql_bindings_to_df(iter_sparql_bindings(chunks),variables)
+        #### read the few bytes after the bindings, so the HTTP cache sees the whole response
+        for chunk in chunks:
+            pass
+        return(table)
+    finally:
+        r.close()
+
+#### Gene rows from the query results, with the columns split_wd_gene_table expects
+def clean_wd_gene_table(datadf):
+    datadf['QID'] = strip_prefix(datadf['item'],WD_ENTITY_PREFIX)
+    datadf['label'] = datadf['itemLabel']
+    datadf['proteinID'] = strip_prefix(datadf['proteinwdid'],WD_ENTITY_PREFIX)
+    return(datadf)
+
+def get_wd_gene_table(pages=WD_PAGES,url=WD_SPARQL_URL):
+    tables = []
+    for page in (pages or [None]):
+        table = get_sparql_table(get_wd_gene_query(page),WD_GENE_VARIABLES,url)
+        print('genes ending in ',page,': ',len(table),' rows')
+        tables.append(table)
+    return(clean_wd_gene_table(pd.concat(tables,ignore_index=True)))
+
+#### Split the gene table into the four Wikidata tables
+def split_wd_gene_table(datadf):
+    nolinks = ['QID','label','geneID','proteinID']
+    tables = {}
+    tables['genes_no_wiki'] = datadf.loc[datadf['hassitelink'] & datadf['genelink'].isnull(),nolinks]
+    tables['proteins_no_wiki'] = datadf.loc[datadf['hassitelink'] & datadf['proteinlink'].isnull(),nolinks]
+    tables['genes_en_wiki'] = datadf.loc[datadf['genelink'].notnull(),nolinks+['genelink']].rename(columns={'genelink':'wikilink'})
+    tables['proteins_en_wiki'] = datadf.loc[datadf['proteinlink'].notnull(),nolinks+['proteinlink']].rename(columns={'proteinlink':'wikilink'})
+    return({name:table.drop_duplicates(keep='first').reset_index(drop=True) for name,table in tables.items()})
+
+def write_wd_tables(datapath,tables):
+    for name, table in tables.items():
+        write_table(table,datapath,name)
+        print(name,': ',len(table))
+
+def get_wd_info(datapath,pages=WD_PAGES):
+    print("fetching info from Wikidata: ",datetime.now())
+    write_wd_tables(datapath,split_wd_gene_table(get_wd_gene_table(pages)))
+    print("fetching complete: ",datetime.now())
+
+#### Same tables from a Wikidata JSON dump (see WikidataDump)
+def get_wd_info_from_dump(datapath,dumppath,workers=DUMP_WORKERS):
+    print("reading Wikidata dump: ",dumppath,datetime.now())
+    write_wd_tables(datapath,split_wd_gene_table(read_gene_table(dumppath,workers)))
+    print("reading complete: ",datetime.now())
+    
+###############################################################################
+## Incremental refresh of the stored page volume table (data/gene_wiki_vol_info)
+## Each run's page info is compared with the stored table by lastrevid: rows
+## whose revision changed, and titles not seen before, replace the stored rows,
+## while rows for titles that could not be fetched this run are carried over
+## from the stored table instead of being dropped. Titles that no longer have
+## a page or are no longer linked from Wikidata are removed. checked_at is the
+## time each row was last confirmed against the API. Tables stored before
+## these columns were added get checked_at from last_touched and page_title
+## from title
+## lastrevid and length come back in the same prop=info response, so the
+## batched page info query doubles as the check for which titles changed
+###############################################################################
+WIKI_VOL_COLUMNS = ['title','page_title','page_length','last_touched','lastrevid']
+
+def load_wiki_volume_info(datapath):
+    try:
+        stored = read_table(datapath,'gene_wiki_vol_info')
+    except (IOError,OSError):
+        return(None)
+    stored['lastrevid'] = stored['lastrevid'].astype(str)
+    if 'checked_at' not in stored.columns:
+        stored['checked_at'] = stored['last_touched']
+    if 'page_title' not in stored.columns:
+        stored['page_title'] = stored['title']
+    return(stored)
+
+#### Returns the merged table and the list of titles that are new or edited
+def merge_wiki_volume_info(stored,pageinfo,pagefails,titlelist):
+    wikiinfo = pd.DataFrame(pageinfo,columns=WIKI_VOL_COLUMNS)
+    wikiinfo['checked_at'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    if stored is None or len(stored) == 0:
+        return(wikiinfo,wikiinfo['title'].tolist())
+    previous = stored.drop_duplicates('title').set_index('title')['lastrevid']
+    changed = wikiinfo.loc[wikiinfo['lastrevid']!=wikiinfo['title'].map(previous),'title'].tolist()
+    carried = stored.loc[stored['title'].isin(pagefails)&stored['title'].isin(titlelist)]
+    if len(carried) > 0:
+        print('keeping stored info for ',len(carried),' pages that could not be fetched')
+        wikiinfo = pd.concat((wikiinfo,carried[wikiinfo.columns]),ignore_index=True)
+        order = pd.Series(range(len(titlelist)),index=titlelist)
+        wikiinfo = wikiinfo.iloc[wikiinfo['title'].map(order).argsort(kind='mergesort')].reset_index(drop=True)
+    return(wikiinfo,changed)
+
+#### Merge table of genes and proteins to identify Genes which do NOT have wikipedia articles, 
+#### which encode proteins that do NOT have Wikipedia articles
+#### ie - Identify genes which show up on both lists (no gene article, no protein article)
+def filter_no_wikis(datapath,resultpath):
+    genes_no_wiki = read_table(datapath,'genes_no_wiki')
+    proteins_no_wiki = read_table(datapath,'proteins_no_wiki')
+    no_wiki_merge = pd.concat((genes_no_wiki,proteins_no_wiki),ignore_index=True)
+    frequency = no_wiki_merge.groupby('geneID').size().reset_index(name='counts')
+    no_gene_protein = frequency.loc[frequency['counts']==2]
+    no_gene_protein_info = genes_no_wiki.loc[genes_no_wiki['geneID'].isin(no_gene_protein['geneID'].tolist())]
+    export_tsv(no_gene_protein_info,resultpath,'genes_with_no_gene_protein_wiki')
+
+    
+#### Merge table of genes and proteins to identify Genes which have a wikipedia article or
+#### the protein encoded by those genes has a Wikipedia article
+#### ie - Identify all unique wikilinks and their corresponding gene --  this is the merged list
+#### Then pull page length for all Wikipedia articles and merged list
+#### Filter out Wikipedia articles which are greater than 10,000 characters in length
+
+def filter_wikis(datapath,resultpath,incremental=True,site=None,pause=MW_REFRESH_PAUSE):
+    genes_en_wiki = read_table(datapath,'genes_en_wiki')
+    proteins_en_wiki = read_table(datapath,'proteins_en_wiki')
+    en_wiki_merge = pd.concat((genes_en_wiki,proteins_en_wiki),ignore_index=True)
+    unique_wikis = en_wiki_merge.groupby(['geneID','proteinID','wikilink']).size().reset_index(name='counts')
+    write_table(unique_wikis,datapath,'gene_protein_wikilinks')
+    unique_wikis['title'] = wikilinks_to_titles(unique_wikis['wikilink'])
+    titlelist = unique_wikis['title'].unique().tolist()
+    pageinfo,pagemissing,pagefails = get_wiki_volume_info(site or get_mwsite(),titlelist,pause=pause)
+    print('pages missing: ',len(pagemissing),' pages failed: ',len(pagefails))
+    stored = load_wiki_volume_info(datapath) if incremental==True else None
+    wikiinfo,changed = merge_wiki_volume_info(stored,pageinfo,pagefails,titlelist)
+    print('pages new or edited since last run: ',len(changed),' of ',len(wikiinfo))
+    write_table(wikiinfo,datapath,'gene_wiki_vol_info')
+    wikiinfo = wikiinfo[WIKI_VOL_COLUMNS]
+    shorter_articles = wikiinfo.loc[wikiinfo['page_length']<10000].copy()
+    shorter_articles.sort_values('page_length',ascending=True,inplace=True)
+    detailed_shorter_articles = shorter_articles.merge(unique_wikis,on='title',how='inner')
+    export_tsv(detailed_shorter_articles,resultpath,'priority_by_size')
+    print(len(detailed_shorter_articles))
+    print(detailed_shorter_articles.head(n=2))
+    
+
+
+#### All of the stages, in order
+def fetch_gene_info(datapath,resultpath,wikidata_dump=None):
+    print("script started: ",datetime.now())
+    with stage('wikidata'):
+        if wikidata_dump is not None:
+            get_wd_info_from_dump(datapath,wikidata_dump)
+        else:
+            get_wd_info(datapath)
+    print("wdinfo_script_complete: ",datetime.now())
+    with stage('filter_no_wikis'):
+        filter_no_wikis(datapath,resultpath)
+    print("genes/proteins, no wiki, filtered: ",datetime.now())
+    with stage('filter_wikis'):
+        filter_wikis(datapath,resultpath)
+    print("scripts completely run: ",datetime.now())
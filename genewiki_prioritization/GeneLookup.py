@@ -0,0 +1,220 @@
+import os
+import json
+import pathlib
+import sqlite3
+import threading
+import urllib.parse
+import http.server
+import numpy as np
+import pandas as pd
+from pandas import read_csv
+from .TableStorage import read_table, table_exists
+from .PrioritizeGenes import RANKINGS, generate_pub_summary, score_genes, rank_genes
+
+###############################################################################
+## Indexed lookup store over the prioritization results
+## build_gene_lookup compiles the results into one SQLite file,
+## results/gene_lookup.sqlite, indexed for the two questions editors ask:
+## everything about one gene, and the top N genes of a ranking
+##   genes     one row per gene: geneid, QID and label (from the Wikidata tables)
+##   articles  one row per gene article in priority_by_size with its size, the
+##             publication summary, the scores, and its rank in each of
+##             RANKINGS (rank_score etc, NULL if it does not pass the filters)
+##   names     every name a gene is looked up by: label, QID, protein QID,
+##             article title and page title, in lower case with spaces for
+##             underscores
+##   authors   potential_authors, with each author's rank within the gene
+## Without data/PublicationDetailsDF the publication summary is taken from the
+## exported rankings instead. The file is written under a temporary name and
+## moved into place, so a service reading the old file is not disturbed
+## GeneLookup opens the store read-only and answers point lookups (by gene ID,
+## label, QID or title) and top N queries without loading any table;
+## serve_gene_lookup answers the same over HTTP as JSON:
+##   /gene/<key>?authors=10       /top/<ranking>?n=20
+###############################################################################
+GENE_LOOKUP = 'gene_lookup.sqlite'
+WIKIDATA_TABLES = ['genes_en_wiki','proteins_en_wiki','genes_no_wiki']
+PUB_SUMMARY_COLUMNS = ['geneid','pubcount','median_pub_year','max_pub_year']
+RANK_COLUMNS = {name:'rank_'+name.replace('genes_by_','') for name in RANKINGS}
+ARTICLE_COLUMNS = ['geneid','title','page_title','page_length','last_touched','proteinID','wikilink']
+AUTHOR_COLUMNS = ['geneid','author_rank','AU','FullName','counts','email']
+
+def gene_lookup_path(resultpath):
+    return(os.path.join(resultpath,GENE_LOOKUP))
+
+def normalize_names(values):
+    return(values.astype(str).str.replace('_',' ').str.strip().str.lower())
+
+def normalize_name(name):
+    return(str(name).replace('_',' ').strip().lower())
+
+def to_geneids(values):
+    return(pd.to_numeric(values,errors='coerce').astype('Int64'))
+
+#### priority_by_size with the publication summary and scores of each gene
+def load_article_summary(datapath,resultpath):
+    articles = read_csv(os.path.join(resultpath,'priority_by_size.tsv'),delimiter='\t',index_col=0,header=0)
+    articles.rename(columns={'geneID':'geneid'},inplace=True)
+    if table_exists(datapath,'PublicationDetailsDF'):
+        pub_sum = generate_pub_summary(datapath)
+    else:
+        exported = [os.path.join(resultpath,name+'.tsv') for name in RANKINGS]
+        exported = [read_csv(x,delimiter='\t',index_col=0,header=0)[PUB_SUMMARY_COLUMNS] for x in exported if os.path.exists(x)]
+        pub_sum = pd.concat(exported,ignore_index=True).drop_duplicates('geneid') if len(exported) > 0 else pd.DataFrame(columns=PUB_SUMMARY_COLUMNS)
+    return(articles.merge(pub_sum,on='geneid',how='left'))
+
+#### Ranks match the row order of the exported rankings
+def rank_articles(articles,min_pubcount=30,min_pagelength=200):
+    articles = score_genes(articles.reset_index(drop=True))
+    for name, ranked in rank_genes(articles,min_pubcount,min_pagelength,k=len(articles)).items():
+        articles[RANK_COLUMNS[name]] = pd.Series(np.arange(1,len(ranked)+1),index=ranked.index).reindex(articles.index).astype('Int64')
+    return(articles)
+
+def load_wikidata_genes(datapath):
+    tables = [read_table(datapath,x,columns=['QID','label','geneID','proteinID']) for x in WIKIDATA_TABLES if table_exists(datapath,x)]
+    if len(tables) == 0:
+        return(pd.DataFrame(columns=['QID','label','geneid','proteinID']))
+    wdgenes = pd.concat(tables,ignore_index=True).rename(columns={'geneID':'geneid'})
+    wdgenes['geneid'] = to_geneids(wdgenes['geneid'])
+    return(wdgenes.loc[wdgenes['geneid'].notnull()].drop_duplicates())
+
+def load_potential_authors(resultpath):
+    path = os.path.join(resultpath,'potential_authors.tsv')
+    if not os.path.exists(path):
+        return(pd.DataFrame(columns=AUTHOR_COLUMNS))
+    authors = read_csv(path,delimiter='\t',index_col=0,header=0).reindex(columns=['geneid','AU','FullName','counts','email'])
+    authors['author_rank'] = authors.groupby('geneid').cumcount()+1
+    return(authors[AUTHOR_COLUMNS])
+
+def gene_names(articles,wdgenes):
+    names = [pd.DataFrame({'name':wdgenes[x],'kind':kind,'geneid':wdgenes['geneid']}) for x,kind in [('label','label'),('QID','qid'),('proteinID','protein_qid')]]
+    names += [pd.DataFrame({'name':articles[x],'kind':x,'geneid':articles['geneid']}) for x in ['title','page_title'] if x in articles.columns]
+    names = pd.concat(names,ignore_index=True).dropna()
+    names['name'] = normalize_names(names['name'])
+    return(names.drop_duplicates())
+
+#### Rows as plain Python values, NaN/NA as NULL
+def sql_rows(df):
+    values = df.astype(object)
+    return(values.where(df.notna(),None).to_numpy().tolist())
+
+def write_sql_table(conn,name,df,columns):
+    conn.execute("CREATE TABLE %s (%s)" % (name,', '.join(columns)))
+    conn.executemany("INSERT INTO %s VALUES (%s)" % (name,','.join('?'*len(df.columns))),sql_rows(df))
+
+def build_gene_lookup(datapath,resultpath,min_pubcount=30,min_pagelength=200,path=None):
+    path = path or gene_lookup_path(resultpath)
+    articles = rank_articles(load_article_summary(datapath,resultpath),min_pubcount,min_pagelength)
+    for column in PUB_SUMMARY_COLUMNS[1:]:
+        articles[column] = articles[column].round().astype('Int64')
+    articles = articles.reindex(columns=ARTICLE_COLUMNS+PUB_SUMMARY_COLUMNS[1:]+[x for x in articles.columns if x not in ARTICLE_COLUMNS+PUB_SUMMARY_COLUMNS])
+    wdgenes = load_wikidata_genes(datapath)
+    genes = pd.concat((wdgenes[['geneid','QID','label']],articles[['geneid']]),ignore_index=True).drop_duplicates('geneid')
+    names = gene_names(articles,wdgenes)
+    authors = load_potential_authors(resultpath)
+    if os.path.exists(path+'.tmp'):
+        os.remove(path+'.tmp')
+    conn = sqlite3.connect(path+'.tmp')
+    try:
+        with conn:
+            write_sql_table(conn,'genes',genes,['geneid INTEGER PRIMARY KEY','qid TEXT','label TEXT'])
+            write_sql_table(conn,'articles',articles,['%s %s' % (x,'INTEGER' if x.startswith('rank_') or x == 'geneid' else '') for x in articles.columns])
+            write_sql_table(conn,'names',names,['name TEXT','kind TEXT','geneid INTEGER'])
+            write_sql_table(conn,'authors',authors,['geneid INTEGER','author_rank INTEGER','AU TEXT','FullName TEXT','counts INTEGER','email TEXT'])
+            conn.execute("CREATE INDEX articles_geneid ON articles (geneid)")
+            for column in RANK_COLUMNS.values():
+                conn.execute("CREATE INDEX articles_%s ON articles (%s) WHERE %s IS NOT NULL" % (column,column,column))
+            conn.execute("CREATE INDEX names_name ON names (name)")
+            conn.execute("CREATE INDEX authors_geneid ON authors (geneid, author_rank)")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(path+'.tmp',path)
+    print('gene lookup: ',len(genes),' genes, ',len(articles),' articles, ',len(names),' names, ',len(authors),' authors -> ',path)
+    return(path)
+
+
+#### Read-only queries against the store, one connection per thread
+class GeneLookup(object):
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError('no gene lookup store at '+path+', build it with the gene-lookup stage')
+        self.uri = pathlib.Path(path).resolve().as_uri()+'?mode=ro'
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local,'conn',None)
+        if conn is None:
+            conn = sqlite3.connect(self.uri,uri=True)
+            conn.row_factory = sqlite3.Row
+            self.local.conn = conn
+        return(conn)
+
+    def query(self, sql, params=()):
+        return([dict(x) for x in self.connection().execute(sql,params).fetchall()])
+
+    #### A gene ID, or a label, QID, protein QID or article title (any case,
+    #### underscores or spaces)
+    def find_geneids(self, key):
+        key = str(key).strip()
+        geneids = [x['geneid'] for x in self.query("SELECT DISTINCT geneid FROM names WHERE name = ?",(normalize_name(key),))]
+        if key.isdigit() and len(self.query("SELECT geneid FROM genes WHERE geneid = ?",(int(key),))) > 0:
+            geneids = [int(key)]+[x for x in geneids if x != int(key)]
+        return(geneids)
+
+    def gene(self, key, authors=10):
+        found = []
+        for geneid in self.find_geneids(key):
+            entry = (self.query("SELECT geneid, qid, label FROM genes WHERE geneid = ?",(geneid,)) or [{'geneid':geneid}])[0]
+            entry['articles'] = self.query("SELECT * FROM articles WHERE geneid = ? ORDER BY rowid",(geneid,))
+            entry['authors'] = self.query("SELECT AU, FullName, counts, email FROM authors WHERE geneid = ? ORDER BY author_rank LIMIT ?",(geneid,authors))
+            found.append(entry)
+        return(found)
+
+    #### ranking is a name in RANKINGS, with or without the genes_by_ prefix
+    def top(self, ranking='score', n=20):
+        column = RANK_COLUMNS.get(ranking,RANK_COLUMNS.get('genes_by_'+ranking))
+        if column is None:
+            raise ValueError('unknown ranking '+ranking+', expected one of '+', '.join(RANK_COLUMNS))
+        return(self.query("SELECT articles.*, genes.qid, genes.label FROM articles LEFT JOIN genes ON articles.geneid = genes.geneid "
+                          "WHERE %s IS NOT NULL ORDER BY %s LIMIT ?" % (column,column),(n,)))
+
+
+class GeneLookupHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = {k:v[0] for k,v in urllib.parse.parse_qs(url.query).items()}
+        parts = [urllib.parse.unquote(x) for x in url.path.strip('/').split('/',1)]
+        try:
+            if parts[0] == 'gene' and len(parts) == 2:
+                found = self.server.lookup.gene(parts[1],int(params.get('authors',10)))
+                self.send_json(200 if len(found) > 0 else 404,found)
+            elif parts[0] == 'top':
+                self.send_json(200,self.server.lookup.top(parts[1] if len(parts) == 2 else 'score',int(params.get('n',20))))
+            else:
+                self.send_json(404,{'error':'expected /gene/<key> or /top/<ranking>'})
+        except ValueError as e:
+            self.send_json(400,{'error':str(e)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type','application/json')
+        self.send_header('Content-Length',str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve_gene_lookup(path,host='127.0.0.1',port=8000):
+    server = http.server.ThreadingHTTPServer((host,port),GeneLookupHandler)
+    server.daemon_threads = True
+    server.lookup = GeneLookup(path)
+    print('gene lookup service on http://%s:%d/ (/gene/<key>, /top/<ranking>)' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
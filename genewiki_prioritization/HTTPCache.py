@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import pathlib
+import threading
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from .RunReport import count
+
+###############################################################################
+## Local cache of HTTP responses shared across runs and retries
+## ResponseCache sits in a requests adapter (see TimeoutHTTPAdapter in
+## FetchGeneInfo): the adapter hands every request to ResponseCache.send
+## along with its own send. GET responses are keyed by the method and the
+## full URL (with its query parameters, eg- the SPARQL query) and stored with
+## their status, headers and zlib-compressed body
+## A stored response that is still fresh (within its Cache-Control max-age)
+## is answered locally without any request. An older one is revalidated: the
+## request goes out with If-None-Match/If-Modified-Since from the stored
+## ETag/Last-Modified, and a 304 is answered with the stored body. Only 200s
+## that have a validator or a max-age (and no no-store) are kept
+## Answers from the cache are marked on the response (from_cache 'hit' or
+## 'revalidated') so the run report does not count local hits as requests;
+## hits (local or revalidated), misses and revalidations are counted under
+## http_cache. When the stored bodies grow past max_bytes the least recently
+## used responses are dropped
+## Streamed requests (stream=True, eg- the SPARQL queries) are not read into
+## memory to be stored: StoredBody compresses the body as the caller reads it
+## and stores it once it has all been read (a stream closed part way is not
+## stored), and a stored response is handed back as a CachedBody that
+## decompresses a chunk at a time. Only the compressed body is held
+## The cache lives in data/cache/ and is not committed with the data tables
+###############################################################################
+HTTP_CACHE = os.path.join('cache','http.sqlite')
+HTTP_CACHE_MAX_BYTES = 512*1024**2
+HTTP_CACHE_TIMEOUT = 60 ## seconds to wait while another process writes
+CACHED_METHODS = ['GET']
+VALIDATOR_HEADERS = ['ETag','Last-Modified','Cache-Control','Expires','Date']
+UNSTORED_HEADERS = ['Content-Encoding','Content-Length','Transfer-Encoding','Connection','Keep-Alive','Set-Cookie']
+CACHE_CHUNK_BYTES = 1024*1024
+MAX_AGE = re.compile(r'(?:^|[,\s])max-age\s*=\s*"?(\d+)')
+
+def get_max_age(headers):
+    match = MAX_AGE.search(headers.get('Cache-Control',''))
+    return(int(match.group(1)) if match is not None else 0)
+
+def is_storable(response):
+    cache_control = response.headers.get('Cache-Control','').lower()
+    if response.status_code != 200 or 'no-store' in cache_control:
+        return(False)
+    return('ETag' in response.headers or 'Last-Modified' in response.headers or get_max_age(response.headers) > 0)
+
+#### Stands in for a streamed response's urllib3 body (response.raw) and
+#### compresses the decoded chunks as they are handed out; the body is stored
+#### when the stream runs out. Reads outside stream() (eg- raw.read(), which
+#### is not decoded) are passed through and the body is not stored
+class StoredBody(object):
+    def __init__(self, raw, cache, key, response):
+        self.raw = raw
+        self.cache = cache
+        self.key = key
+        self.url = response.url
+        self.status = response.status_code
+        self.headers = response.headers
+        self.compressor = zlib.compressobj()
+        self.compressed = []
+
+    def __getattr__(self, name):
+        return(getattr(self.raw,name))
+
+    def stream(self, *args, **kwargs):
+        for chunk in self.raw.stream(*args,**kwargs):
+            if self.compressor is not None:
+                self.compressed.append(self.compressor.compress(chunk))
+            yield(chunk)
+        if self.compressor is not None:
+            self.compressed.append(self.compressor.flush())
+            self.cache.put(self.key,self.url,self.status,self.headers,b''.join(self.compressed))
+            self.compressor = None
+            self.compressed = []
+
+    def read(self, *args, **kwargs):
+        self.compressor = None
+        self.compressed = []
+        return(self.raw.read(*args,**kwargs))
+
+#### Body of a stored response for a streamed request, decompressed in
+#### chunks of at most amt bytes as it is read
+class CachedBody(object):
+    def __init__(self, data):
+        self.data = data
+        self.chunks = None
+
+    def stream(self, amt=CACHE_CHUNK_BYTES, decode_content=None):
+        decompressor = zlib.decompressobj()
+        data = self.data
+        self.data = b''
+        while len(data) > 0:
+            chunk = decompressor.decompress(data,amt or CACHE_CHUNK_BYTES)
+            data = decompressor.unconsumed_tail
+            if len(chunk) > 0:
+                yield(chunk)
+        chunk = decompressor.flush()
+        if len(chunk) > 0:
+            yield(chunk)
+
+    def read(self, amt=None, decode_content=None):
+        if self.chunks is None:
+            self.chunks = self.stream(amt)
+        if amt is None:
+            return(b''.join(self.chunks))
+        return(next(self.chunks,b''))
+
+    def close(self):
+        self.data = b''
+
+    def release_conn(self):
+        pass
+
+class ResponseCache(object):
+    def __init__(self, path, max_bytes=HTTP_CACHE_MAX_BYTES):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path,timeout=HTTP_CACHE_TIMEOUT,check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL, "
+                          "headers TEXT NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL, stored REAL NOT NULL, last_used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def request_key(request):
+        body = request.body or b''
+        if isinstance(body,str):
+            body = body.encode('utf-8')
+        return(hashlib.sha1(request.method.encode('utf-8')+b' '+request.url.encode('utf-8')+b'\n'+body).hexdigest())
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT status, headers, data, stored FROM responses WHERE key = ?",(key,)).fetchone()
+        if row is None:
+            return(None)
+        return({'status':row[0],'headers':CaseInsensitiveDict(json.loads(row[1])),'data':row[2],'stored':row[3]})
+
+    def put(self, key, url, status, headers, compressed):
+        unstored = {x.lower() for x in UNSTORED_HEADERS}
+        headers = {k:v for k,v in headers.items() if k.lower() not in unstored}
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, url, status, headers, size, data, stored, last_used) VALUES (?,?,?,?,?,?,?,?)",
+                              (key,url,status,json.dumps(headers),len(compressed),compressed,now,now))
+        self.evict()
+
+    #### After a 304: the new validators are kept and the response counts as just stored
+    def refresh(self, key, entry, response):
+        headers = dict(entry['headers'])
+        headers.update({k:response.headers[k] for k in VALIDATOR_HEADERS if k in response.headers})
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE responses SET headers = ?, stored = ?, last_used = ? WHERE key = ?",(json.dumps(headers),now,now,key))
+        entry['headers'] = CaseInsensitiveDict(headers)
+
+    def touch(self, key):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?",(time.time(),key))
+
+    def is_fresh(self, entry):
+        if 'no-cache' in entry['headers'].get('Cache-Control','').lower():
+            return(False)
+        return(time.time()-entry['stored'] < get_max_age(entry['headers']))
+
+    def build_response(self, request, entry, from_cache, stream=False):
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        if stream:
+            response.raw = CachedBody(entry['data'])
+        else:
+            response._content = zlib.decompress(entry['data'])
+            response._content_consumed = True
+            response.headers['Content-Length'] = str(len(response._content))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.from_cache = from_cache
+        return(response)
+
+    def record(self, key):
+        with self.lock:
+            setattr(self,key,getattr(self,key)+1)
+        count('http_cache',key)
+
+    #### send is the adapter's own send, called for everything that cannot be
+    #### answered from the cache
+    def send(self, send, request, **kwargs):
+        if request.method not in CACHED_METHODS:
+            return(send(request,**kwargs))
+        key = self.request_key(request)
+        entry = self.get(key)
+        if entry is not None and self.is_fresh(entry):
+            self.touch(key)
+            self.record('hits')
+            return(self.build_response(request,entry,'hit',kwargs.get('stream',False)))
+        if entry is not None:
+            request = request.copy()
+            if 'ETag' in entry['headers']:
+                request.headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                request.headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        response = send(request,**kwargs)
+        if entry is not None and response.status_code == 304:
+            #### reading the (empty) body first puts the connection back in the pool
+            response.content
+            response.close()
+            self.refresh(key,entry,response)
+            self.record('hits')
+            self.record('revalidated')
+            return(self.build_response(request,entry,'revalidated',kwargs.get('stream',False)))
+        self.record('misses')
+        if is_storable(response) and kwargs.get('stream',False):
+            response.raw = StoredBody(response.raw,self,key,response)
+        elif is_storable(response):
+            self.put(key,request.url,response.status_code,response.headers,zlib.compress(response.content))
+        return(response)
+
+    def size(self):
+        with self.lock:
+            return(self.conn.execute("SELECT COALESCE(SUM(size),0) FROM responses").fetchone()[0])
+
+    def evict(self):
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        with self.lock, self.conn:
+            for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                self.conn.execute("DELETE FROM responses WHERE key = ?",(key,))
+                count('http_cache','evicted')
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def close(self):
+        self.conn.close()
+
+def open_http_cache(datapath,max_bytes=HTTP_CACHE_MAX_BYTES):
+    return(ResponseCache(os.path.join(datapath,HTTP_CACHE),max_bytes))
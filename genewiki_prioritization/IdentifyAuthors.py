@@ -0,0 +1,1072 @@
+from datetime import datetime
+from datetime import timedelta
+import time
+import numpy as np
+import pandas as pd
+from pandas import read_csv
+import os
+import re
+import pathlib
+from .TableStorage import read_table, read_legacy_pickle, write_table, clear_table, table_exists, dataset_path, last_part, part_numbers, copy_part, remove_parts_after, to_int_ids, DatasetWriter
+import sqlite3
+import hashlib
+import zlib
+import io
+import shutil
+import multiprocessing
+from .RunReport import stage, count, api_call, merge_report, REPORT
+
+
+###############################################################################
+## Local cache of Medline records shared across runs and retries
+## Record text is stored zlib-compressed and content-addressed: the records
+## table is keyed by the sha1 of the Medline text, and the pmid_index table
+## maps each PMID to the hash of its current text along with the last time it
+## was read. When the stored text grows past max_bytes the least recently used
+## PMIDs are dropped, followed by any record no PMID points to anymore
+## The cache lives in data/cache/ and is not committed with the data tables
+###############################################################################
+MEDLINE_CACHE = os.path.join('cache','medline.sqlite')
+MEDLINE_CACHE_MAX_BYTES = 2*1024**3
+MEDLINE_CACHE_TIMEOUT = 60 ## seconds to wait while another process (eg- a shard) writes
+
+class MedlineCache(object):
+    def __init__(self, path, max_bytes=MEDLINE_CACHE_MAX_BYTES):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path,timeout=MEDLINE_CACHE_TIMEOUT)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS records (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, data BLOB NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pmid_index (pmid TEXT PRIMARY KEY, hash TEXT NOT NULL, last_used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pmid_index_last_used ON pmid_index (last_used)")
+
+    def get_many(self, PMIDList):
+        medline_texts = {}
+        now = time.time()
+        with self.conn:
+            for PMID in PMIDList:
+                row = self.conn.execute("SELECT records.data FROM pmid_index JOIN records ON pmid_index.hash = records.hash WHERE pmid_index.pmid = ?",(str(PMID),)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                medline_texts[str(PMID)] = zlib.decompress(row[0]).decode('utf-8')
+                self.conn.execute("UPDATE pmid_index SET last_used = ? WHERE pmid = ?",(now,str(PMID)))
+        return(medline_texts)
+
+    def put_many(self, medline_texts):
+        now = time.time()
+        with self.conn:
+            for PMID, text in medline_texts.items():
+                data = text.encode('utf-8')
+                texthash = hashlib.sha1(data).hexdigest()
+                compressed = zlib.compress(data)
+                self.conn.execute("INSERT OR IGNORE INTO records (hash, size, data) VALUES (?,?,?)",(texthash,len(compressed),compressed))
+                self.conn.execute("INSERT OR REPLACE INTO pmid_index (pmid, hash, last_used) VALUES (?,?,?)",(str(PMID),texthash,now))
+        self.evict()
+
+    def size(self):
+        return(self.conn.execute("SELECT COALESCE(SUM(size),0) FROM records").fetchone()[0])
+
+    def evict(self):
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        with self.conn:
+            for PMID, texthash in self.conn.execute("SELECT pmid, hash FROM pmid_index ORDER BY last_used").fetchall():
+                self.conn.execute("DELETE FROM pmid_index WHERE pmid = ?",(PMID,))
+                if self.conn.execute("SELECT 1 FROM pmid_index WHERE hash = ? LIMIT 1",(texthash,)).fetchone() is None:
+                    row = self.conn.execute("SELECT size FROM records WHERE hash = ?",(texthash,)).fetchone()
+                    if row is not None:
+                        total -= row[0]
+                        self.conn.execute("DELETE FROM records WHERE hash = ?",(texthash,))
+                if total <= self.max_bytes:
+                    break
+            self.conn.execute("DELETE FROM records WHERE hash NOT IN (SELECT hash FROM pmid_index)")
+
+    def close(self):
+        self.conn.close()
+
+def open_medline_cache(datapath,max_bytes=MEDLINE_CACHE_MAX_BYTES):
+    return(MedlineCache(os.path.join(datapath,MEDLINE_CACHE),max_bytes))
+
+
+###############################################################################
+## This module fetches Medline records for a list of PMIDs in batches
+## Small lists are sent as comma separated ids (up to EFETCH_BATCHSIZE per
+## efetch). Lists longer than EPOST_THRESHOLD are first uploaded with EPost
+## and then paged out of the Entrez history server with WebEnv/query_key
+## Returns a dictionary of PMID: Medline record and the list of PMIDs whose
+## batch could not be fetched. PMIDs that simply have no record are in neither
+## If a MedlineCache is passed, it is read first and only misses go to Entrez
+## If an errors dictionary is passed, the reason each failed PMID failed is
+## recorded in it (PMID: error message)
+###############################################################################
+EFETCH_BATCHSIZE = 200
+EPOST_THRESHOLD = 1000
+EPOST_CHUNKSIZE = 5000
+ENTREZ_PAUSE = 0.5
+
+#### Bio.Entrez and Bio.Medline are imported on first use. NCBI asks for a
+#### contact address with every request, so USEREMAIL is read at that point,
+#### along with the NCBI_API_KEY if there is one
+#### Entrez can be set to a replacement beforehand (eg- the benchmark stand-in)
+Entrez = None
+Medline = None
+
+def get_entrez():
+    global Entrez
+    if Entrez is None:
+        from Bio import Entrez as BioEntrez
+        if BioEntrez.email is None:
+            BioEntrez.email = os.environ['USEREMAIL']
+        if BioEntrez.api_key is None and os.environ.get('NCBI_API_KEY'):
+            BioEntrez.api_key = os.environ['NCBI_API_KEY']
+        Entrez = BioEntrez
+    return(Entrez)
+
+def get_medline():
+    global Medline
+    if Medline is None:
+        from Bio import Medline as BioMedline
+        Medline = BioMedline
+    return(Medline)
+
+
+###############################################################################
+## Entrez rate limit shared between processes
+## NCBI allows ENTREZ_RATE requests per second (ENTREZ_KEY_RATE with an API
+## key) however many processes send them. Bio.Entrez only spaces out the
+## requests of its own process, so shards run side by side take turns through
+## two files in data/cache/: entrez_rate.lock, created with O_EXCL by the
+## process holding the lock (which works the same way on Windows), and
+## entrez_rate, the time the next request may be sent. Each request reserves
+## the slot 1/rate seconds after the last one, then sleeps until it comes
+## A lock left behind by a process that died is removed after RATE_LOCK_STALE
+## seconds. With no limit set (the default) Entrez calls are not held up
+###############################################################################
+ENTREZ_RATE = 3
+ENTREZ_KEY_RATE = 10
+ENTREZ_RATE_FILE = os.path.join('cache','entrez_rate')
+RATE_LOCK_STALE = 10 ## seconds
+
+class EntrezRateLimit(object):
+    def __init__(self, path, rate):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lockpath = path+'.lock'
+        self.interval = 1.0/rate
+
+    def lock(self):
+        while True:
+            try:
+                os.close(os.open(self.lockpath,os.O_CREAT|os.O_EXCL|os.O_WRONLY))
+                return
+            except (FileExistsError,PermissionError):
+                pass
+            try:
+                if time.time()-os.path.getmtime(self.lockpath) > RATE_LOCK_STALE:
+                    os.remove(self.lockpath)
+                    continue
+            except OSError:
+                pass
+            time.sleep(0.001)
+
+    def unlock(self):
+        os.remove(self.lockpath)
+
+    def acquire(self):
+        self.lock()
+        try:
+            now = time.time()
+            try:
+                with open(self.path) as f:
+                    next_at = float(f.read())
+            except (OSError,ValueError):
+                next_at = 0.0
+            slot = max(now,next_at)
+            with open(self.path,'w') as f:
+                f.write(repr(slot+self.interval))
+        finally:
+            self.unlock()
+        time.sleep(slot-now)
+
+entrez_limit = None
+
+def default_entrez_rate():
+    return(ENTREZ_KEY_RATE if getattr(get_entrez(),'api_key',None) else ENTREZ_RATE)
+
+#### Hold every Entrez call in this process to the limit shared through datapath
+def set_entrez_rate_limit(datapath,rate=None):
+    global entrez_limit
+    entrez_limit = EntrezRateLimit(os.path.join(datapath,ENTREZ_RATE_FILE),rate or default_entrez_rate())
+
+def entrez_call(api,function,*args,**kwargs):
+    if entrez_limit is not None:
+        entrez_limit.acquire()
+    return(api_call(api,function,*args,**kwargs))
+
+#### Split Medline text into one block of text per record, keyed by PMID
+def split_medline(text):
+    medline_texts = {}
+    for block in re.split(r'\n\s*\n',text.strip()):
+        if block.strip() == '':
+            continue
+        block = block+'\n'
+        record = get_medline().read(io.StringIO(block))
+        medline_texts[record.get("PMID")] = block
+    return(medline_texts)
+
+def read_efetch(**params):
+    handle = get_entrez().efetch(db="pubmed", rettype="medline", retmode="text", **params)
+    try:
+        text = handle.read()
+    finally:
+        handle.close()
+    if isinstance(text,bytes):
+        text = text.decode('utf-8')
+    return(text)
+
+def efetch_medline(**params):
+    return(split_medline(entrez_call('entrez.efetch',read_efetch,nbytes=len,**params)))
+
+def record_errors(errors,ids,message):
+    if errors is not None:
+        for x in ids:
+            errors[x] = message
+
+def fetch_medline_texts(PMIDList,batchsize=EFETCH_BATCHSIZE,use_history=EPOST_THRESHOLD,errors=None):
+    medline_texts = {}
+    PMIDFails = []
+    if len(PMIDList) <= use_history:
+        for i in range(0,len(PMIDList),batchsize):
+            batch = PMIDList[i:i+batchsize]
+            try:
+                medline_texts.update(efetch_medline(id=",".join(batch)))
+            except Exception as e:
+                PMIDFails.extend(batch)
+                record_errors(errors,batch,'efetch: '+repr(e))
+            time.sleep(ENTREZ_PAUSE)
+        return(medline_texts,PMIDFails)
+    webenv = None
+    for i in range(0,len(PMIDList),EPOST_CHUNKSIZE):
+        chunk = PMIDList[i:i+EPOST_CHUNKSIZE]
+        try:
+            if webenv is None:
+                posted = entrez_call('entrez.epost',lambda: get_entrez().read(get_entrez().epost(db="pubmed", id=",".join(chunk))))
+            else:
+                posted = entrez_call('entrez.epost',lambda: get_entrez().read(get_entrez().epost(db="pubmed", id=",".join(chunk), WebEnv=webenv)))
+            webenv = posted["WebEnv"]
+            query_key = posted["QueryKey"]
+        except Exception as e:
+            PMIDFails.extend(chunk)
+            record_errors(errors,chunk,'epost: '+repr(e))
+            time.sleep(ENTREZ_PAUSE)
+            continue
+        time.sleep(ENTREZ_PAUSE)
+        chunkfailed = None
+        for retstart in range(0,len(chunk),batchsize):
+            try:
+                medline_texts.update(efetch_medline(webenv=webenv, query_key=query_key, retstart=retstart, retmax=batchsize))
+            except Exception as e:
+                chunkfailed = e
+            time.sleep(ENTREZ_PAUSE)
+        if chunkfailed is not None:
+            #### history results are not guaranteed to come back in posted order,
+            #### so anything from a chunk with a failed page that is still missing is a failure
+            missing = [x for x in chunk if x not in medline_texts]
+            PMIDFails.extend(missing)
+            record_errors(errors,missing,'efetch history: '+repr(chunkfailed))
+    return(medline_texts,PMIDFails)
+
+def fetch_medline_records(PMIDList,cache=None,batchsize=EFETCH_BATCHSIZE,use_history=EPOST_THRESHOLD,errors=None):
+    PMIDList = list(dict.fromkeys(str(x) for x in PMIDList))
+    medline_texts = {}
+    if cache is not None:
+        medline_texts = cache.get_many(PMIDList)
+        print('medline cache: ',len(medline_texts),' hits, ',len(PMIDList)-len(medline_texts),' to fetch')
+        count('medline_cache','hits',len(medline_texts))
+        count('medline_cache','misses',len(PMIDList)-len(medline_texts))
+    fetched, PMIDFails = fetch_medline_texts([x for x in PMIDList if x not in medline_texts],batchsize,use_history,errors)
+    if cache is not None:
+        cache.put_many(fetched)
+    medline_texts.update(fetched)
+    medline_records = {PMID:get_medline().read(io.StringIO(text)) for PMID,text in medline_texts.items()}
+    return(medline_records,PMIDFails)
+
+
+###############################################################################
+## Author rows are gathered into append-only column lists and turned into a
+## DataFrame once at the end, rather than concatenating a small frame per PMID
+## append_author_rows lays rows out the same way as
+## pd.DataFrame({'AU':pd.Series(AuthorSet),...}) did: one row per entry of the
+## longest field, shorter fields padded with NaN, and a missing field ("?")
+## counting as a single value. constants are repeated on every row (eg- pmid)
+###############################################################################
+AUTHOR_COLUMNS = ["AU", "FullName","AuthorDetails","pmid","publish_date"]
+
+def new_author_columns(columns=AUTHOR_COLUMNS):
+    return({x:[] for x in columns})
+
+def append_author_rows(author_columns,AuthorSet,FullAuthorSet,AuthorDetails,**constants):
+    fields = [x if isinstance(x,list) else [x] for x in (AuthorSet,FullAuthorSet,AuthorDetails)]
+    nrows = max(len(x) for x in fields)
+    for column, values in zip(["AU","FullName","AuthorDetails"],fields):
+        author_columns[column].extend(values)
+        author_columns[column].extend([np.nan]*(nrows-len(values)))
+    for column in author_columns:
+        if column in constants:
+            author_columns[column].extend([constants[column]]*nrows)
+        elif column not in ("AU","FullName","AuthorDetails"):
+            author_columns[column].extend([np.nan]*nrows)
+    return(nrows)
+
+def build_author_df(author_columns):
+    return(pd.DataFrame(author_columns,columns=list(author_columns.keys())))
+
+
+###############################################################################
+## This module looks up the PMIDs linked to many genes with a single elink
+## call per batch. Passing the ids as a list sends one id= parameter per gene
+## so NCBI returns one linkset per gene and the results stay separated
+## Returns a dictionary of geneid: [PMIDs] and the list of genes that failed
+###############################################################################
+ELINK_BATCHSIZE = 100
+
+def get_pubmed_linkset(linkset):
+    for linksetdb in linkset.get("LinkSetDb",[]):
+        if linksetdb.get("LinkName") == "gene_pubmed":
+            return(linksetdb)
+    return(linkset["LinkSetDb"][0])
+
+def elink_gene_pmids(genelist,batchsize=ELINK_BATCHSIZE,errors=None):
+    gene_pmids = {}
+    genefailures = []
+    for i in range(0,len(genelist),batchsize):
+        batch = genelist[i:i+batchsize]
+        lookup = {str(x):x for x in batch}
+        try:
+            record = entrez_call('entrez.elink',lambda: get_entrez().read(get_entrez().elink(dbfrom="gene", db="pubmed", id=[str(x) for x in batch])))
+        except Exception as e:
+            genefailures.extend(batch)
+            record_errors(errors,batch,'elink: '+repr(e))
+            time.sleep(ENTREZ_PAUSE)
+            continue
+        for linkset in record:
+            geneid = lookup.get(str(linkset["IdList"][0]))
+            if geneid is None:
+                continue
+            try:
+                gene_pmids[geneid] = [link["Id"] for link in get_pubmed_linkset(linkset)["Link"]]
+            except (IndexError,KeyError):
+                gene_pmids[geneid] = []
+        missing = [x for x in batch if x not in gene_pmids]
+        genefailures.extend(missing)
+        record_errors(errors,missing,'elink: no linkset returned')
+        time.sleep(ENTREZ_PAUSE)
+    return(gene_pmids,genefailures)
+
+
+###############################################################################
+## The gene->PMID mapping is kept in a SQLite index under data/ so that later
+## runs (and deal_with_failures) only go back to Entrez for genes that are
+## missing from the index or whose links were fetched more than max_age_days ago
+## gene_fetch holds one row per gene with the time its links were fetched
+## gene_pmid holds the links, with rank keeping the order elink returned them in
+###############################################################################
+GENE_PMID_INDEX = 'gene_pmid_index.sqlite'
+GENE_PMID_MAX_AGE = 180 ## days
+
+def open_gene_pmid_index(datapath):
+    conn = sqlite3.connect(os.path.join(datapath,GENE_PMID_INDEX))
+    conn.execute("CREATE TABLE IF NOT EXISTS gene_fetch (geneid TEXT PRIMARY KEY, fetched_at TEXT NOT NULL, pmidcount INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS gene_pmid (geneid TEXT NOT NULL, pmid TEXT NOT NULL, rank INTEGER NOT NULL, PRIMARY KEY (geneid, pmid))")
+    return(conn)
+
+#### The index of the data directory a shard belongs to, read-only (None if
+#### there is none yet). Shards add their links to their own index, and
+#### merge_author_shards copies them into this one
+def open_shared_gene_pmid_index(basepath):
+    path = os.path.join(basepath,GENE_PMID_INDEX)
+    if not os.path.exists(path):
+        return(None)
+    return(sqlite3.connect(pathlib.Path(path).resolve().as_uri()+'?mode=ro',uri=True))
+
+def load_gene_pmids(conn,genelist,max_age_days=GENE_PMID_MAX_AGE):
+    cutoff = (datetime.now()-timedelta(days=max_age_days)).isoformat()
+    gene_pmids = {}
+    stale = []
+    for geneid in genelist:
+        fetched = conn.execute("SELECT fetched_at FROM gene_fetch WHERE geneid = ?",(str(geneid),)).fetchone()
+        if fetched is None or fetched[0] < cutoff:
+            stale.append(geneid)
+            continue
+        rows = conn.execute("SELECT pmid FROM gene_pmid WHERE geneid = ? ORDER BY rank",(str(geneid),)).fetchall()
+        gene_pmids[geneid] = [x[0] for x in rows]
+    return(gene_pmids,stale)
+
+def save_gene_pmids(conn,gene_pmids,fetched_at=None):
+    if fetched_at is None:
+        fetched_at = datetime.now().isoformat()
+    with conn:
+        for geneid, PMIDList in gene_pmids.items():
+            conn.execute("DELETE FROM gene_pmid WHERE geneid = ?",(str(geneid),))
+            conn.executemany("INSERT OR IGNORE INTO gene_pmid (geneid, pmid, rank) VALUES (?,?,?)",
+                             [(str(geneid),str(PMID),rank) for rank,PMID in enumerate(PMIDList)])
+            conn.execute("INSERT OR REPLACE INTO gene_fetch (geneid, fetched_at, pmidcount) VALUES (?,?,?)",
+                         (str(geneid),fetched_at,len(PMIDList)))
+
+#### Look genes up in the index first and elink only the missing/stale ones
+#### Without a datapath the index is skipped and every gene is looked up
+#### basepath is the data directory a shard's datapath belongs to, whose index
+#### is read for the genes the shard's own index does not have
+def get_gene_pmids(genelist,datapath=None,max_age_days=GENE_PMID_MAX_AGE,errors=None,basepath=None):
+    if datapath is None:
+        return(elink_gene_pmids(genelist,errors=errors))
+    conn = open_gene_pmid_index(datapath)
+    try:
+        gene_pmids, stale = load_gene_pmids(conn,genelist,max_age_days)
+        shared = open_shared_gene_pmid_index(basepath) if basepath is not None and len(stale) > 0 else None
+        if shared is not None:
+            try:
+                found, stale = load_gene_pmids(shared,stale,max_age_days)
+            finally:
+                shared.close()
+            gene_pmids.update(found)
+        print('gene pmid index: ',len(gene_pmids),' genes cached, ',len(stale),' to fetch')
+        count('gene_pmid_index','hits',len(gene_pmids))
+        count('gene_pmid_index','misses',len(stale))
+        fetched, genefailures = elink_gene_pmids(stale,errors=errors)
+        save_gene_pmids(conn,fetched)
+    finally:
+        conn.close()
+    gene_pmids.update(fetched)
+    return({x:gene_pmids[x] for x in genelist if x in gene_pmids},genefailures)
+
+
+###############################################################################
+## Genes are worked through a chunk at a time: link the chunk's genes to
+## PMIDs, fetch the chunk's Medline records, then yield each gene with its
+## (PMID, record, fetch failed) tuples in order. Only one chunk of records is
+## in memory at once, and PMIDs shared with genes in later chunks are read
+## back from the Medline record cache rather than from Entrez. Without a
+## cache the whole list is one chunk, so every PMID is still fetched once
+## Yields (geneid, [(PMID, record, error)], error). Genes that could not be
+## linked, or that have 30 or fewer PMIDs, come with None instead of a list,
+## and only the ones that could not be linked have an error. A PMID's error is
+## None unless its fetch failed, and record is None if PubMed had no record
+## known_pmids maps geneids (as strings) to PMIDs that already have rows; those
+## are left out of the gene's list, after the 30 PMID cut-off is applied
+## basepath is passed on to get_gene_pmids, for a shard to use the main index
+###############################################################################
+GENES_PER_CHUNK = 100
+
+def iter_gene_records(genelist,datapath=None,max_age_days=GENE_PMID_MAX_AGE,cache=None,genes_per_chunk=None,known_pmids=None,basepath=None):
+    if genes_per_chunk is None:
+        genes_per_chunk = GENES_PER_CHUNK if cache is not None else max(1,len(genelist))
+    for i in range(0,len(genelist),genes_per_chunk):
+        chunk = genelist[i:i+genes_per_chunk]
+        elinkerrors = {}
+        fetcherrors = {}
+        with stage('elink'):
+            gene_pmids, elinkfailures = get_gene_pmids(chunk,datapath,max_age_days,elinkerrors,basepath)
+        if len(elinkfailures) > 0:
+            print(len(elinkfailures),' genes could not be linked to pmids')
+        gene_pmids = {geneid:PMIDList for geneid,PMIDList in gene_pmids.items() if len(PMIDList) > 30}
+        if known_pmids is not None:
+            gene_pmids = {geneid:[x for x in PMIDList if str(x) not in known_pmids.get(str(geneid),())] for geneid,PMIDList in gene_pmids.items()}
+        unique_pmids = list(dict.fromkeys(PMID for PMIDList in gene_pmids.values() for PMID in PMIDList))
+        print('fetching ',len(unique_pmids),' unique pmids for ',len(gene_pmids),' genes')
+        with stage('efetch'):
+            medline_records, fetch_failures = fetch_medline_records(unique_pmids,cache,errors=fetcherrors)
+        for geneid in chunk:
+            if geneid not in gene_pmids:
+                yield(geneid,None,elinkerrors.get(geneid))
+                continue
+            yield(geneid,[(PMID,medline_records.get(str(PMID)),fetcherrors.get(str(PMID))) for PMID in gene_pmids[geneid]],None)
+
+
+###############################################################################
+## Collects the publication and author rows emitted for each gene, along with
+## the gene and PMID failures. take_rows() hands back what has been gathered
+## so far as DataFrames and starts over, so rows can be flushed in chunks
+###############################################################################
+class PublicationRows(object):
+    def __init__(self):
+        self.PublicationDetails = []
+        self.author_columns = new_author_columns()
+        self.genefailures = []
+        self.pmid_failures = []
+        self.pmid_author_fail = []
+
+    def add_gene(self, geneid, pmid_records):
+        if pmid_records is None:
+            self.genefailures.append(geneid)
+            return
+        for PMID, record, error in pmid_records:
+            if error is not None:
+                self.pmid_failures.append({'geneid':geneid,'pmid':PMID})
+                continue
+            if record is None:
+                continue
+            try:
+                PublicationDate = record.get("DP","?") #writes the publication date 
+                pubdate_type = "DP"
+            except:
+                PublicationDate = record.get("EDAT","?") #writes the initial Entrez record submission date 
+                pubdate_type = "EDAT"
+            self.PublicationDetails.append({'geneid':str(geneid),'pmid':PMID,'PublicationDate':PublicationDate,"PubDateType":pubdate_type})
+            try:
+                AuthorSet = record.get("AU","?") #writes the record to a list called AuthorSet                     
+                FullAuthorSet = record.get("FAU","?") #writes the record to a list called AuthorSet
+                AuthorDetails = record.get("AD","?") #writes the record to a list called AuthorDetails
+                append_author_rows(self.author_columns,AuthorSet,FullAuthorSet,AuthorDetails,pmid=PMID,publish_date=PublicationDate)
+            except:
+                self.pmid_author_fail.append(PMID)
+
+    def rowcount(self):
+        return(len(self.PublicationDetails)+len(self.author_columns["AU"]))
+
+    def take_rows(self):
+        PublicationDetailsDF = pd.DataFrame(self.PublicationDetails)
+        author_df = build_author_df(self.author_columns)
+        self.PublicationDetails = []
+        self.author_columns = new_author_columns()
+        return(PublicationDetailsDF, author_df)
+
+
+###############################################################################
+## This module takes a list of entrez gene ids, looks up PMIDs associated with
+## each gene, obtains the authors of each PMID along with their affiliations
+## The returned dataframe can be processed for top authors and more
+## Note that Entrez caps requests at 3/second without API key
+## With API key, requests are capped at 10/second
+## To be on the safe side, this module voluntarily throttles (sleeps) to
+## 2 requests/second (sleep is half a second)
+## PMIDs are deduplicated and fetched in batches (see fetch_medline_records),
+## then each Medline record is fanned back out to every gene that links to it
+## When datapath is given the gene->PMID links come from the index in data/
+## and Medline records are read from the local record cache where possible
+## This version keeps every row in memory. For the full priority list use
+## get_authors (see run_author_journal), which writes rows to data/ in
+## checkpoints as it goes and can resume a run that was cut short
+###############################################################################
+def retrieve_detailed_pubs_by_gene(genelist,datapath=None,max_age_days=GENE_PMID_MAX_AGE):
+    timestart = datetime.now().time()
+    print(timestart, 'obtaining publication details and authors for each gene.')
+    rows = PublicationRows()
+    cache = open_medline_cache(datapath) if datapath is not None else None
+    try:
+        for geneid, pmid_records, error in iter_gene_records(genelist,datapath,max_age_days,cache):
+            rows.add_gene(geneid,pmid_records)
+    finally:
+        if cache is not None:
+            cache.close()
+    PublicationDetailsDF, author_df = rows.take_rows()
+    PMIDfailsDF = pd.DataFrame(rows.pmid_failures)
+    timeend = datetime.now().time()
+    print(timeend)
+    return(PublicationDetailsDF, author_df, rows.genefailures, rows.pmid_author_fail, PMIDfailsDF)
+
+
+###############################################################################
+## Job journal for author retrieval (data/author_journal.sqlite)
+## gene_units has one row per gene in the run and pmid_units one row per
+## gene/PMID pair whose record could not be fetched. Each unit has a status
+## (pending, done, skipped, failed), an attempt count and the last error
+## Rows are written in checkpoints: the checkpoint's parts are added to the
+## PublicationDetailsDF/ and author_df/ datasets, then the unit statuses and
+## the checkpoint number are committed together. On resume, parts numbered
+## after the last committed checkpoint are dropped and pending genes pick up
+## where the run stopped, so nothing is lost or written twice
+## A checkpoint is taken every GENES_PER_CHECKPOINT genes or ROWS_PER_FLUSH
+## rows, whichever comes first, so memory stays flat however long the gene
+## list is
+## Failed units are retried up to JOURNAL_MAX_ATTEMPTS times, waiting
+## JOURNAL_RETRY_BACKOFF seconds before the first retry and doubling after
+## each one. Genes with 30 or fewer PMIDs are skipped, not retried
+## A run is identified by run_label (the current year by default). Calling
+## run_author_journal with the same label resumes the run; a new label starts
+## over. With max_runtime (seconds) the run stops at the first checkpoint past
+## the limit, so a yearly run can be spread over several CI jobs
+## A delta run (delta=True) keeps the existing datasets and adds to them: each
+## gene is linked to PMIDs again and only gene/PMID pairs that are not already
+## in PublicationDetailsDF are fetched. Its checkpoint parts are numbered after
+## the parts already in the datasets. Rows for links that have since been
+## removed from Entrez are not taken out; run without delta to rebuild
+###############################################################################
+AUTHOR_JOURNAL = 'author_journal.sqlite'
+JOURNAL_MAX_ATTEMPTS = 5
+JOURNAL_RETRY_BACKOFF = 60 ## seconds
+GENES_PER_CHECKPOINT = 100
+ROWS_PER_FLUSH = 50000
+
+def open_author_journal(datapath):
+    conn = sqlite3.connect(os.path.join(datapath,AUTHOR_JOURNAL))
+    conn.execute("CREATE TABLE IF NOT EXISTS journal_state (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS gene_units (geneid TEXT PRIMARY KEY, rank INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, updated_at REAL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS pmid_units (geneid TEXT NOT NULL, pmid TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, updated_at REAL, PRIMARY KEY (geneid, pmid))")
+    return(conn)
+
+def get_journal_state(conn,key,default=None):
+    row = conn.execute("SELECT value FROM journal_state WHERE key = ?",(key,)).fetchone()
+    return(default if row is None else row[0])
+
+def set_journal_state(conn,key,value):
+    conn.execute("INSERT OR REPLACE INTO journal_state (key, value) VALUES (?,?)",(key,str(value)))
+
+#### Delta runs append parts to the datasets, so a table still stored as a
+#### single file (or as the old author_df.xz) is turned into part 0 first
+def prepare_delta_table(datapath,name):
+    if os.path.isdir(dataset_path(datapath,name)):
+        return
+    if table_exists(datapath,name):
+        df = read_table(datapath,name)
+    elif name == 'author_df' and os.path.exists(os.path.join(datapath,'author_df.xz')):
+        df = read_legacy_pickle(datapath,name)
+    else:
+        return
+    DatasetWriter(datapath,name).write(df,part=0)
+
+def start_author_journal(conn,datapath,genelist,run_label,delta=False):
+    if delta == True:
+        for name in ['PublicationDetailsDF','author_df']:
+            prepare_delta_table(datapath,name)
+        base_part = max(last_part(datapath,'PublicationDetailsDF'),last_part(datapath,'author_df'),0)
+    else:
+        clear_table(datapath,'PublicationDetailsDF')
+        clear_table(datapath,'author_df')
+        base_part = 0
+    with conn:
+        conn.execute("DELETE FROM gene_units")
+        conn.execute("DELETE FROM pmid_units")
+        conn.execute("DELETE FROM journal_state")
+        conn.executemany("INSERT OR IGNORE INTO gene_units (geneid, rank, status) VALUES (?,?,'pending')",
+                         [(str(geneid),rank) for rank,geneid in enumerate(genelist)])
+        set_journal_state(conn,'run_label',run_label)
+        set_journal_state(conn,'started_at',datetime.now().isoformat())
+        set_journal_state(conn,'checkpoint',0)
+        set_journal_state(conn,'base_part',base_part)
+        set_journal_state(conn,'delta',int(delta))
+
+#### Dataset part number the last committed checkpoint was written to
+def committed_part(conn):
+    return(int(get_journal_state(conn,'base_part',0))+int(get_journal_state(conn,'checkpoint',0)))
+
+#### Options for iter_gene_records in the journaled run. Delta runs link genes
+#### again unless they were linked after the run started, and skip the
+#### gene/PMID pairs that already have rows (in basepath's tables too, if given)
+def journal_gene_options(conn,datapath,basepath=None):
+    if get_journal_state(conn,'delta','0') != '1':
+        return({})
+    started_at = datetime.fromisoformat(get_journal_state(conn,'started_at'))
+    known_pmids = {}
+    stored = 0
+    for eachpath in dict.fromkeys(x for x in [basepath,datapath] if x is not None):
+        if not table_exists(eachpath,'PublicationDetailsDF'):
+            continue
+        known = read_table(eachpath,'PublicationDetailsDF',columns=['geneid','pmid'])
+        for geneid, PMID in zip(known['geneid'].astype(str),known['pmid'].astype(str)):
+            known_pmids.setdefault(geneid,set()).add(PMID)
+        stored += len(known)
+    print(stored,' gene/pmid pairs already stored')
+    return({'max_age_days':(datetime.now()-started_at).total_seconds()/86400,'known_pmids':known_pmids})
+
+def checkpoint_author_journal(conn,datapath,rows,gene_updates,pmid_updates):
+    with stage('checkpoint'):
+        write_author_checkpoint(conn,datapath,rows,gene_updates,pmid_updates)
+
+def write_author_checkpoint(conn,datapath,rows,gene_updates,pmid_updates):
+    checkpoint = int(get_journal_state(conn,'checkpoint',0))+1
+    part = committed_part(conn)+1
+    PublicationDetailsDF, author_df = rows.take_rows()
+    DatasetWriter(datapath,'PublicationDetailsDF',append=True).write(PublicationDetailsDF,part=part)
+    if len(author_df) > 0:
+        DatasetWriter(datapath,'author_df',append=True).write(parse_out_emails(author_df),part=part)
+    now = time.time()
+    with conn:
+        conn.executemany("UPDATE gene_units SET status = ?, attempts = attempts+1, last_error = ?, updated_at = ? WHERE geneid = ?",
+                         [(status,error,now,str(geneid)) for geneid,status,error in gene_updates])
+        conn.executemany("INSERT INTO pmid_units (geneid, pmid, status, attempts, last_error, updated_at) VALUES (?,?,?,1,?,?) "
+                         "ON CONFLICT (geneid, pmid) DO UPDATE SET status = excluded.status, attempts = pmid_units.attempts+1, "
+                         "last_error = excluded.last_error, updated_at = excluded.updated_at",
+                         [(str(geneid),str(PMID),status,error,now) for geneid,PMID,status,error in pmid_updates])
+        set_journal_state(conn,'checkpoint',checkpoint)
+    del gene_updates[:]
+    del pmid_updates[:]
+
+def past_deadline(deadline):
+    return(deadline is not None and time.monotonic() >= deadline)
+
+#### Run genes through the pipeline, checkpointing every genes_per_checkpoint
+#### genes or rows_per_flush rows. Returns False if the deadline cut it short
+def run_gene_units(conn,datapath,geneids,cache,deadline=None,genes_per_checkpoint=GENES_PER_CHECKPOINT,rows_per_flush=ROWS_PER_FLUSH,**options):
+    rows = PublicationRows()
+    gene_updates = []
+    pmid_updates = []
+    for geneid, pmid_records, error in iter_gene_records(geneids,datapath,cache=cache,**options):
+        rows.add_gene(geneid,pmid_records)
+        if pmid_records is None:
+            gene_updates.append((geneid,'skipped' if error is None else 'failed',error))
+        else:
+            gene_updates.append((geneid,'done',None))
+            pmid_updates.extend([(geneid,PMID,'failed',pmiderror) for PMID,record,pmiderror in pmid_records if pmiderror is not None])
+        if len(gene_updates) >= genes_per_checkpoint or rows.rowcount() >= rows_per_flush:
+            checkpoint_author_journal(conn,datapath,rows,gene_updates,pmid_updates)
+            if past_deadline(deadline):
+                return(False)
+    checkpoint_author_journal(conn,datapath,rows,gene_updates,pmid_updates)
+    return(True)
+
+#### Refetch failed gene/PMID pairs and add their rows to the datasets
+def run_pmid_units(conn,datapath,units,cache):
+    rows = PublicationRows()
+    fetcherrors = {}
+    medline_records, fetch_failures = fetch_medline_records([PMID for geneid,PMID in units],cache,errors=fetcherrors)
+    pmid_updates = []
+    for geneid, PMID in units:
+        error = fetcherrors.get(str(PMID))
+        rows.add_gene(geneid,[(PMID,medline_records.get(str(PMID)),error)])
+        pmid_updates.append((geneid,PMID,'done' if error is None else 'failed',error))
+    checkpoint_author_journal(conn,datapath,rows,[],pmid_updates)
+
+#### Failed units that have attempts left, with the time each is next due
+def retryable_units(conn,table,columns,max_attempts):
+    rows = conn.execute("SELECT "+columns+", attempts, updated_at FROM "+table+" WHERE status = 'failed' AND attempts < ?",(max_attempts,)).fetchall()
+    return([(x[:-2],x[-1]+JOURNAL_RETRY_BACKOFF*2**(x[-2]-1)) for x in rows])
+
+def retry_failed_units(conn,datapath,cache,deadline=None,max_attempts=JOURNAL_MAX_ATTEMPTS,**options):
+    while True:
+        genes = retryable_units(conn,'gene_units','geneid',max_attempts)
+        pmids = retryable_units(conn,'pmid_units','geneid, pmid',max_attempts)
+        if len(genes)+len(pmids) == 0:
+            return(True)
+        due_at = min(x[1] for x in genes+pmids)
+        wait = max(0,due_at-time.time())
+        if deadline is not None and time.monotonic()+wait >= deadline:
+            return(False)
+        print('retrying ',len(genes),' genes and ',len(pmids),' pmids in ',int(wait),' seconds')
+        time.sleep(wait)
+        now = time.time()
+        due_genes = [x[0][0] for x in genes if x[1] <= now]
+        due_pmids = [x[0] for x in pmids if x[1] <= now]
+        if len(due_genes) > 0 and run_gene_units(conn,datapath,due_genes,cache,deadline,**options) == False:
+            return(False)
+        if len(due_pmids) > 0:
+            run_pmid_units(conn,datapath,due_pmids,cache)
+
+#### Write the failure tables that get_authors has always left in data/
+def write_journal_failures(conn,datapath):
+    PMIDfailsDF = pd.read_sql_query("SELECT geneid, pmid FROM pmid_units WHERE status = 'failed' ORDER BY geneid, pmid",conn)
+    write_table(PMIDfailsDF,datapath,'PMIDfailsDF')
+    genefailures = conn.execute("SELECT geneid FROM gene_units WHERE status IN ('failed','skipped') ORDER BY rank").fetchall()
+    with open(os.path.join(datapath,'genefailures.txt'),'w') as outwrite:
+        for eachgene in genefailures:
+            outwrite.write(str(eachgene[0])+'\n')
+
+#### Start or resume a journaled run. genelist can be None to resume whatever
+#### run is in the journal. Returns True once every unit is done, skipped, or
+#### out of attempts, and False if max_runtime ran out first
+#### basepath is the data directory a shard's datapath belongs to: the shard
+#### uses its Medline cache, reads its gene->PMID index, and delta runs skip
+#### the pairs in its tables
+def run_author_journal(genelist,datapath,run_label=None,max_runtime=None,max_attempts=JOURNAL_MAX_ATTEMPTS,delta=False,basepath=None):
+    if run_label is None:
+        run_label = str(datetime.now().year)
+    deadline = time.monotonic()+max_runtime if max_runtime is not None else None
+    conn = open_author_journal(datapath)
+    cache = open_medline_cache(basepath or datapath)
+    try:
+        if genelist is not None and get_journal_state(conn,'run_label') != run_label:
+            print('starting author retrieval run: ',run_label,' (delta)' if delta else '')
+            start_author_journal(conn,datapath,genelist,run_label,delta)
+        else:
+            print('resuming author retrieval run: ',get_journal_state(conn,'run_label'))
+        remove_parts_after(datapath,'PublicationDetailsDF',committed_part(conn))
+        remove_parts_after(datapath,'author_df',committed_part(conn))
+        options = journal_gene_options(conn,datapath,basepath)
+        if basepath is not None:
+            options['basepath'] = basepath
+        pending = [x[0] for x in conn.execute("SELECT geneid FROM gene_units WHERE status = 'pending' ORDER BY rank").fetchall()]
+        print(len(pending),' genes pending')
+        with stage('genes'):
+            complete = run_gene_units(conn,datapath,pending,cache,deadline,**options)
+        if complete:
+            with stage('retries'):
+                complete = retry_failed_units(conn,datapath,cache,deadline,max_attempts,**options)
+        write_journal_failures(conn,datapath)
+    finally:
+        cache.close()
+        conn.close()
+    print('author retrieval complete' if complete else 'author retrieval stopped, run again to resume')
+    return(complete)
+
+
+###############################################################################
+## Sharded author retrieval
+## Shard i of N takes the genes whose ID leaves remainder i when divided by N,
+## so the split is the same on every run and machine. Each shard is a full
+## journaled run (run_author_journal) in its own directory, data/shards/i-of-N/,
+## with its own journal, gene->PMID index and datasets; the Medline cache in
+## data/cache/ is shared, and data/gene_pmid_index.sqlite is read (not
+## written) for genes the shard's own index does not have. Shards can run as
+## separate CI jobs (run_author_shard) or side by side as local processes
+## (run_author_shards), where they hold to one Entrez rate limit between them
+## (see EntrezRateLimit). Separate jobs do not share data/cache/, so each one
+## is given 1/N of the rate instead (shard_entrez_rate). A shard stopped by
+## max_runtime resumes like any journaled run
+## Once every shard has finished, merge_author_shards copies the shards' parts
+## into data/PublicationDetailsDF/ and data/author_df/ (after the existing
+## parts for a delta run, in place of them otherwise), adds the links the
+## shards fetched to data/gene_pmid_index.sqlite, and writes data/author_journal.sqlite as if the run had not been
+## sharded, so deal_with_failures can pick it up. The shard directories are
+## then removed
+###############################################################################
+SHARD_DIR = 'shards'
+AUTHOR_DATASETS = ['PublicationDetailsDF','author_df']
+
+def shard_genes(genelist,shard,shards):
+    return([x for x in genelist if int(x) % shards == shard])
+
+def shard_datapath(datapath,shard,shards):
+    return(os.path.join(datapath,SHARD_DIR,'%d-of-%d' % (shard,shards),''))
+
+#### Entrez rate for one of N shards run as separate jobs: an even share of
+#### rate (or of NCBI's limit)
+def shard_entrez_rate(shards,rate=None):
+    return((rate or default_entrez_rate())/shards)
+
+def run_author_shard(genelist,datapath,shard,shards,run_label=None,max_runtime=None,delta=False,entrez_rate=None):
+    if entrez_rate is not None:
+        set_entrez_rate_limit(datapath,entrez_rate)
+    shardpath = shard_datapath(datapath,shard,shards)
+    os.makedirs(shardpath,exist_ok=True)
+    genes = shard_genes(genelist,shard,shards) if genelist is not None else None
+    print('shard ',shard,' of ',shards,': ',len(genes) if genes is not None else 'resuming',' genes')
+    return(run_author_journal(genes,shardpath,run_label,max_runtime,delta=delta,basepath=datapath))
+
+#### Runs in a worker process, handing back its run report with the result
+def run_shard_process(*args):
+    complete = run_author_shard(*args)
+    return(complete,REPORT.as_dict())
+
+#### Run every shard in a pool of workers processes (one per shard by default)
+#### and merge them if they all finish. Returns True once merged
+def run_author_shards(genelist,datapath,shards,workers=None,run_label=None,max_runtime=None,delta=False,entrez_rate=None):
+    entrez_rate = entrez_rate or default_entrez_rate()
+    print('running ',shards,' shards at ',entrez_rate,' Entrez requests per second between them')
+    jobs = [(genelist,datapath,shard,shards,run_label,max_runtime,delta,entrez_rate) for shard in range(shards)]
+    with multiprocessing.Pool(workers or shards,maxtasksperchild=1) as pool:
+        results = pool.starmap(run_shard_process,jobs)
+    with stage('shards'):
+        for complete, report in results:
+            merge_report(report)
+    unfinished = [shard for shard,(complete,report) in enumerate(results) if not complete]
+    if len(unfinished) > 0:
+        print('shards ',unfinished,' stopped, run again to resume')
+        return(False)
+    with stage('merge'):
+        merge_author_shards(datapath,shards)
+    return(True)
+
+def merge_gene_pmid_index(datapath,shardpath):
+    conn = open_gene_pmid_index(datapath)
+    try:
+        with conn:
+            conn.execute("ATTACH DATABASE ? AS shard",(os.path.join(shardpath,GENE_PMID_INDEX),))
+            conn.execute("DELETE FROM gene_pmid WHERE geneid IN (SELECT geneid FROM shard.gene_fetch)")
+            conn.execute("INSERT OR REPLACE INTO gene_fetch SELECT * FROM shard.gene_fetch")
+            conn.execute("INSERT OR IGNORE INTO gene_pmid SELECT * FROM shard.gene_pmid")
+        conn.execute("DETACH DATABASE shard")
+    finally:
+        conn.close()
+
+def merge_author_shards(datapath,shards):
+    shardpaths = [shard_datapath(datapath,shard,shards) for shard in range(shards)]
+    journals = []
+    try:
+        for eachpath in shardpaths:
+            if not os.path.exists(os.path.join(eachpath,AUTHOR_JOURNAL)):
+                raise ValueError('shard has not been run: '+eachpath)
+            journals.append(open_author_journal(eachpath))
+            if journals[-1].execute("SELECT COUNT(*) FROM gene_units WHERE status = 'pending'").fetchone()[0] > 0:
+                raise ValueError('shard has not finished: '+eachpath)
+        run_labels = set(get_journal_state(x,'run_label') for x in journals)
+        deltas = set(get_journal_state(x,'delta','0') for x in journals)
+        if len(run_labels) > 1 or len(deltas) > 1:
+            raise ValueError('shards are from different runs: '+', '.join(sorted(run_labels)))
+        delta = deltas.pop() == '1'
+        if delta:
+            for name in AUTHOR_DATASETS:
+                prepare_delta_table(datapath,name)
+            base_part = max(max(last_part(datapath,x) for x in AUTHOR_DATASETS),0)
+        else:
+            for name in AUTHOR_DATASETS:
+                clear_table(datapath,name)
+            base_part = 0
+        #### parts keep their checkpoint pairing across the two datasets
+        part = base_part
+        for eachpath in shardpaths:
+            for number in sorted(set(x for name in AUTHOR_DATASETS for x in part_numbers(eachpath,name))):
+                part += 1
+                for name in AUTHOR_DATASETS:
+                    if number in part_numbers(eachpath,name):
+                        copy_part(eachpath,datapath,name,number,part)
+            #### a shard that had no genes to link never opened its index
+            if os.path.exists(os.path.join(eachpath,GENE_PMID_INDEX)):
+                merge_gene_pmid_index(datapath,eachpath)
+        conn = open_author_journal(datapath)
+        try:
+            with conn:
+                conn.execute("DELETE FROM gene_units")
+                conn.execute("DELETE FROM pmid_units")
+                conn.execute("DELETE FROM journal_state")
+                offset = 0
+                for eachjournal in journals:
+                    gene_units = eachjournal.execute("SELECT geneid, rank, status, attempts, last_error, updated_at FROM gene_units ORDER BY rank").fetchall()
+                    conn.executemany("INSERT INTO gene_units (geneid, rank, status, attempts, last_error, updated_at) VALUES (?,?,?,?,?,?)",
+                                     [(x[0],x[1]+offset)+tuple(x[2:]) for x in gene_units])
+                    offset += len(gene_units)
+                    conn.executemany("INSERT INTO pmid_units (geneid, pmid, status, attempts, last_error, updated_at) VALUES (?,?,?,?,?,?)",
+                                     eachjournal.execute("SELECT geneid, pmid, status, attempts, last_error, updated_at FROM pmid_units").fetchall())
+                set_journal_state(conn,'run_label',run_labels.pop())
+                set_journal_state(conn,'started_at',min(get_journal_state(x,'started_at') for x in journals))
+                set_journal_state(conn,'checkpoint',part-base_part)
+                set_journal_state(conn,'base_part',base_part)
+                set_journal_state(conn,'delta',int(delta))
+            write_journal_failures(conn,datapath)
+        finally:
+            conn.close()
+    finally:
+        for eachjournal in journals:
+            eachjournal.close()
+    for eachpath in shardpaths:
+        shutil.rmtree(eachpath)
+    if len(os.listdir(os.path.join(datapath,SHARD_DIR))) == 0:
+        os.rmdir(os.path.join(datapath,SHARD_DIR))
+    print('merged ',shards,' shards into ',part-base_part,' parts')
+
+
+################################################################################
+## This uses a list of PMIDs to pull author information
+################################################################################
+
+#PMIDList = [23039619,29390967,31363486,30951672] ##Unit test
+
+def retrieve_authors_by_pmids(PMIDList,datapath=None):
+    print(datetime.now().time())
+    author_columns = new_author_columns(AUTHOR_COLUMNS+["PubDate"])
+    PublicationDetails = []
+    cache = open_medline_cache(datapath) if datapath is not None else None
+    try:
+        medline_records, fetch_failures = fetch_medline_records(PMIDList,cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    fetch_failures = set(fetch_failures)
+    PMIDFails = []
+    for PMID in PMIDList: #iterates through the PMID list
+        if str(PMID) in fetch_failures:
+            PMIDFails.append(PMID)
+            print("pmid not found: ",PMID)
+            continue
+        record = medline_records.get(str(PMID))
+        if record is None:
+            continue
+        AuthorSet = record.get("AU","?") #writes the record to a list called AuthorSet
+        FullAuthorSet = record.get("FAU","?") #writes the record to a list called AuthorSet
+        try:
+            AuthorDetails = record.get("AD","?") #writes the record to a list called AuthorDetails
+        except:
+            AuthorDetails = ['No details']
+        try:
+            PublicationDate = record.get("DP","?") #writes the initial Entrez record submission date
+            PublicationDetails.append({'pmid':PMID, 'PubDateType':'PD','PubDate':PublicationDate})
+        except:
+            PublicationDate = record.get("EDAT","?")
+            PublicationDetails.append({'pmid':PMID, 'PubDateType':'EDAT','PubDate':PublicationDate})
+        #print(len(AuthorSet),len(AuthorDetails),AuthorSet[0],AuthorDetails[0])
+        append_author_rows(author_columns,AuthorSet,FullAuthorSet,AuthorDetails,pmid=PMID,PubDate=PublicationDate)
+
+    PublicationDF = pd.DataFrame(PublicationDetails)
+    author_df = build_author_df(author_columns)
+    print(datetime.now().time())
+    return(PublicationDF,author_df,PMIDFails)
+
+
+################################################################################
+## This module parses email addresses from the AD/Affiliation field if available
+## input is the author dataframe resulting from this module:
+## retrieve_detailed_pubs_by_gene
+## Note that Articles prior to: October 1, 2013, will have an affiliation ONLY 
+## for the first author. Details on that here: 
+## https://www.nlm.nih.gov/pubs/techbull/so13/brief/so13_author_affiliations.html
+## The same affiliation is repeated for every paper an author or group has,
+## so the regex and the trailing dot cleanup run once per distinct affiliation
+## and the emails are mapped back to the rows through the factorized codes
+################################################################################
+EMAIL_PATTERN = r'([^@|\s]+@[^@]+\.[^@|\s]+)'
+
+def parse_affiliation_emails(affiliations):
+    codes, uniques = pd.factorize(affiliations)
+    emails = pd.Series(uniques,dtype=object).str.extract(EMAIL_PATTERN,expand=False)
+    emails = emails.where(emails.str[-1]!=".",emails.str[:-1]).to_numpy()
+    if len(emails) == 0:
+        return(np.full(len(codes),np.nan,dtype=object))
+    return(np.where(codes>=0,emails[codes],np.nan))
+
+def parse_out_emails(author_df):
+    author_df.reset_index(inplace=True)
+    try:
+        author_df.drop(['level_0'],axis=1,inplace=True)
+    except Exception: 
+        pass
+    try:
+        author_df.drop(['index'],axis=1,inplace=True)
+    except Exception: 
+        pass
+    author_df['email'] = parse_affiliation_emails(author_df['AuthorDetails'])
+    return(author_df)
+
+
+###############################################################################
+## This module takes the resulting dataframes from the previous module
+## merges them and then gets a count of the number of publications an author
+## has for each gene. Note that the optional parameter, method allows for the
+## counts to be based on the author "AU" or full name of the author "FullName"
+## The default is the FullName
+###############################################################################
+## The author columns can be categoricals (as PrioritizeGenes.load_authordf
+## reads them), so the groupby only keeps the combinations that occur
+def get_top_authors_from_dfs(PublicationDetailsDF, author_df, method="FullName"):
+    author_df = author_df.assign(pmid=to_int_ids(author_df['pmid']))
+    PublicationDetailsDF = PublicationDetailsDF.assign(pmid=to_int_ids(PublicationDetailsDF['pmid']))
+    all_merged_df = author_df.merge(PublicationDetailsDF, on='pmid',how='left')
+    all_merged_df.drop_duplicates(keep='first',inplace=True)
+    top_authors_per_gene = all_merged_df.groupby(list(dict.fromkeys(['geneid',method,'FullName'])),observed=True).size().reset_index(name='pubcounts')
+    top_authors_per_gene.sort_values(by=['geneid','pubcounts'],ascending=[True,False],inplace=True)
+    return(top_authors_per_gene)
+
+
+## Pull up all pmids per genes, get author details, pull out available email addresses
+## Perform groupby counts to get top contributing authors per gene
+        
+## The run is journaled (see run_author_journal): calling get_authors again
+## with the same genes resumes an unfinished run instead of starting over
+## delta=True adds the publications linked since the last run to the existing
+## tables instead of rebuilding them
+def get_authors(genelist,datapath,test=False,run_label=None,max_runtime=None,delta=False):
+    if test==True:
+        genelist = [439921,55768] ## for unit test     
+    return(run_author_journal(genelist,datapath,run_label=run_label,max_runtime=max_runtime,delta=delta))
+
+## Retry whatever failed in the current run, resuming it first if it was cut short
+def deal_with_failures(datapath,max_runtime=None):
+    return(run_author_journal(None,datapath,max_runtime=max_runtime))
+
+
+## Pull top authors for high priority genes
+def load_priority_genes(resultpath,genefile='priority_by_size.tsv'):
+    prioritylist = read_csv(os.path.join(resultpath,genefile),delimiter='\t',header=0,index_col=0)
+    return(prioritylist['geneID'].unique().tolist())
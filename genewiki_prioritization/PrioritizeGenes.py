@@ -0,0 +1,208 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from pandas import read_csv
+from .TableStorage import read_table, read_legacy_pickle, table_exists, to_int_ids, export_tsv
+
+
+
+#### The author and publication tables repeat the same names, affiliations and
+#### dates across many rows, so those columns are loaded as categoricals, and
+#### geneid and pmid (stored as text by IdentifyAuthors) as integers
+AUTHOR_CATEGORIES = ['AU','FullName','AuthorDetails','publish_date']
+PUB_CATEGORIES = ['PublicationDate','PubDateType']
+ID_COLUMNS = ['geneid','pmid']
+
+#### Load author_df, or only some of its columns / rows
+#### Falls back to the lzma-compressed pickle written by older runs
+def load_authordf(datapath,columns=None,filters=None):
+    if table_exists(datapath,'author_df'):
+        return(read_table(datapath,'author_df',columns=columns,filters=filters,categories=AUTHOR_CATEGORIES,integers=ID_COLUMNS))
+    return(read_legacy_pickle(datapath,'author_df',columns=columns,filters=filters,categories=AUTHOR_CATEGORIES,integers=ID_COLUMNS))
+
+
+#### Authors (AU) that appear on more than one row
+def get_clean_authors(datapath):
+    less_details = load_authordf(datapath,columns=['AU','FullName','pmid','email'])
+    author_sum = less_details['AU'].value_counts()
+    clean_authors = less_details.loc[less_details['AU'].isin(author_sum.index[author_sum>1])]
+    return(clean_authors)
+
+
+def load_pub_details(datapath,columns=None):
+    return(read_table(datapath,'PublicationDetailsDF',columns=columns,categories=PUB_CATEGORIES,integers=ID_COLUMNS))
+
+
+def get_gene_pmid_table(datapath,pub_details=None):
+    if pub_details is None:
+        pub_details = load_pub_details(datapath,columns=['geneid','pmid'])
+    gene_pmid = pub_details[['geneid','pmid']].copy()
+    gene_pmid.drop_duplicates(keep='first',inplace=True)
+    return(gene_pmid)
+
+
+#### Pull the first 4 digit year out of each publication date
+#### The regex only runs once per distinct date string (there are far fewer
+#### distinct dates than publications) and is mapped back through the codes
+def parse_pub_years(dates):
+    codes, uniques = pd.factorize(dates)
+    years = pd.Series(uniques,dtype=object).astype(str).str.extract(r'(\d\d\d\d)',expand=False)
+    years = pd.to_numeric(years).fillna(0).astype(int).to_numpy()
+    return(np.where(codes>=0,years[codes] if len(years)>0 else 0,0))
+
+
+def generate_pub_summary(datapath,pub_details=None):
+    if pub_details is None:
+        pub_details = load_pub_details(datapath)
+    pub_details = pub_details.drop('PubDateType',axis=1).drop_duplicates(keep='first')
+    pub_details['year'] = parse_pub_years(pub_details['PublicationDate'])
+    pub_sum = pub_details.groupby('geneid')['year'].agg(pubcount='size',median_pub_year='median',max_pub_year='max').reset_index()
+    pub_sum['median_pub_year'] = pub_sum['median_pub_year'].astype(int)
+    pub_sum['max_pub_year'] = pub_sum['max_pub_year'].astype(int)
+    return(pub_sum)
+
+
+###############################################################################
+## Ranking the genes that pass the filters
+## SCORES holds the score formulas, each a sum of terms over summary columns:
+## {column: (transform, weight)}, where the transform is one of TRANSFORMS,
+## eg- priority_score is 10000/page_length + pubcount/2800. Every score is
+## added as a column. RANKINGS holds the tables to export: {name: (column,
+## ascending, scores)}, where the column is a summary column or a score and
+## scores are the score columns the table keeps (genes_by_wiki_length has
+## none, as before)
+## Each ranking only keeps the top genes: top_k_rows partitions around the
+## k-th value (np.partition) and only sorts the genes on the near side of it,
+## instead of sorting the whole summary for every table. Ties are kept in
+## summary order. The old full sorts used sort_values' default quicksort,
+## which is not stable, and sorted by pubcount from the score order, so the
+## order within ties, and which tied genes make the cut at k, can differ from
+## tables written before
+## sweep_rankings runs the filters and one score over a grid of thresholds
+## and weights at once, as (variants x genes) arrays, so many variants of the
+## prioritization can be compared in one run
+###############################################################################
+TOP_K = 500
+TRANSFORMS = {'linear':lambda x,w: x*w,      ## w*x
+              'per':lambda x,w: x/w,         ## x/w
+              'inverse':lambda x,w: w/x,     ## w/x
+              'log':lambda x,w: w*np.log1p(x)}
+SCORES = {'priority_score':{'page_length':('inverse',10000),'pubcount':('per',2800)}}
+RANKINGS = {'genes_by_wiki_length':('page_length',True,[]),
+            'genes_by_score':('priority_score',False,['priority_score']),
+            'genes_by_pubcount':('pubcount',False,['priority_score'])}
+
+def get_gene_summary(datapath,resultpath,pub_details=None):
+    priority_by_size = read_csv(os.path.join(resultpath,'priority_by_size.tsv'), delimiter='\t',index_col=0,header=0)
+    priority_by_size.rename(columns={'geneID':'geneid'},inplace=True)
+    pub_sum = generate_pub_summary(datapath,pub_details)
+    return(priority_by_size.merge(pub_sum,on='geneid',how='inner'))
+
+#### weights, if given, replaces the weight of each term with an array of
+#### weights (one per variant) and the score comes back as (variants x rows)
+def evaluate_score(gene_summary,terms,weights=None):
+    total = 0
+    with np.errstate(divide='ignore',invalid='ignore'):
+        for column, (transform, weight) in terms.items():
+            values = gene_summary[column].to_numpy(dtype=float)
+            if weights is not None:
+                values, weight = values[None,:], weights[column][:,None]
+            total = total+TRANSFORMS[transform](values,weight)
+    return(total)
+
+def score_genes(gene_summary,scores=SCORES):
+    for name, terms in scores.items():
+        gene_summary[name] = evaluate_score(gene_summary,terms)
+    return(gene_summary)
+
+#### Top k columns of each row of key (smallest first; NaN and inf never
+#### count), as (row, column) pairs in ranked order within each row
+def top_k_rows(key,k):
+    key = np.where(np.isnan(key),np.inf,key)
+    k = min(k,key.shape[1])
+    if k == 0:
+        return(np.array([],dtype=int),np.array([],dtype=int))
+    kth = np.partition(key,k-1,axis=1)[:,k-1:k]
+    selected = key < kth
+    tied = (key == kth) & np.isfinite(kth)
+    #### rows with more ties at the k-th value than places left keep the first ones
+    need = k-selected.sum(axis=1)
+    over = tied.sum(axis=1) > need
+    if over.any():
+        tied[over] &= np.cumsum(tied[over],axis=1) <= need[over,None]
+    selected |= tied
+    rows, columns = np.nonzero(selected)
+    order = np.lexsort((columns,key[rows,columns],rows))
+    return(rows[order],columns[order])
+
+def top_k(values,k,ascending=True):
+    key = np.asarray(values,dtype=float)
+    return(top_k_rows((key if ascending else -key)[None,:],k)[1])
+
+def rank_genes(gene_summary,min_pubcount=30,min_pagelength=200,scores=SCORES,rankings=RANKINGS,k=TOP_K):
+    filtered = gene_summary.loc[(gene_summary['pubcount']>min_pubcount) & (gene_summary['page_length']>min_pagelength)].copy()
+    columns = [x for x in filtered.columns if x not in scores]
+    score_genes(filtered,scores)
+    return({name:filtered.iloc[top_k(filtered[column],k,ascending)][columns+list(kept)] for name,(column,ascending,kept) in rankings.items()})
+
+def merge_and_filter_results(datapath,resultpath,min_pubcount=30,min_pagelength=200,pub_details=None,scores=SCORES,rankings=RANKINGS,k=TOP_K):
+    gene_summary = get_gene_summary(datapath,resultpath,pub_details)
+    for name, ranked in rank_genes(gene_summary,min_pubcount,min_pagelength,scores,rankings,k).items():
+        export_tsv(ranked,resultpath,name)
+
+#### Every combination of the thresholds and weights (a list of {column:
+#### weight} for the score's terms; the formula's own weights by default) is
+#### one variant. Returns the top k genes of every variant, one row per gene
+def sweep_rankings(gene_summary,min_pubcounts=(30,),min_pagelengths=(200,),weights=None,score='priority_score',scores=SCORES,k=TOP_K):
+    terms = scores[score]
+    if weights is None:
+        weights = [{column:weight for column,(transform,weight) in terms.items()}]
+    grid = pd.DataFrame(list(itertools.product(min_pubcounts,min_pagelengths,range(len(weights)))),
+                        columns=['min_pubcount','min_pagelength','weights'])
+    for column in terms:
+        grid[column+'_weight'] = [weights[x].get(column,terms[column][1]) for x in grid['weights']]
+    grid.drop('weights',axis=1,inplace=True)
+    values = evaluate_score(gene_summary,terms,{x:grid[x+'_weight'].to_numpy(dtype=float) for x in terms})
+    keep = ((gene_summary['pubcount'].to_numpy()[None,:] > grid['min_pubcount'].to_numpy()[:,None])
+            & (gene_summary['page_length'].to_numpy()[None,:] > grid['min_pagelength'].to_numpy()[:,None]))
+    variants, rows = top_k_rows(np.where(keep,-values,np.inf),k)
+    swept = grid.iloc[variants].reset_index().rename(columns={'index':'variant'})
+    swept['rank'] = np.arange(len(variants))-np.searchsorted(variants,variants)+1
+    for column in ['geneid','title','page_length','pubcount']:
+        swept[column] = gene_summary[column].to_numpy()[rows]
+    swept[score] = values[variants,rows]
+    return(swept)
+
+
+#### Join gene->pmid links with the author table once, count distinct papers per
+#### author per gene, keep authors with more than min_papers papers for a gene
+#### Genes keep the order they first appear in gene_pmid, authors are sorted by counts
+#### pmid is compared as an integer on both sides, whether it was loaded as text or not
+#### The author columns may be categoricals, so groupby only keeps observed pairs
+def build_author_table(gene_pmid,clean_authors,min_papers=2):
+    gene_pmid = gene_pmid[['geneid','pmid']].copy()
+    gene_pmid['pmid'] = to_int_ids(gene_pmid['pmid'])
+    clean_authors = clean_authors.assign(pmid=to_int_ids(clean_authors['pmid']))
+    gene_authors = gene_pmid.merge(clean_authors,on='pmid',how='inner')
+    cleanauths = gene_authors.drop_duplicates(subset=['geneid','AU','FullName','pmid'],keep='first')
+    authorlist = cleanauths.groupby(['geneid','AU'],observed=True).size().reset_index(name='counts')
+    to_keep = authorlist.loc[authorlist['counts']>min_papers]
+    author_by_gene = to_keep.merge(gene_authors,on=['geneid','AU'],how='inner')
+    author_by_gene.drop('pmid',axis=1,inplace=True)
+    author_by_gene.drop_duplicates(keep='first',inplace=True)
+    gene_order = {geneid:i for i,geneid in enumerate(gene_pmid['geneid'].unique())}
+    author_by_gene['gene_order'] = author_by_gene['geneid'].map(gene_order)
+    author_by_gene.sort_values(['gene_order','counts'],ascending=[True,False],kind='mergesort',inplace=True)
+    columns = ['geneid','AU','counts','FullName','email']
+    columns = columns+[x for x in author_by_gene.columns if x not in columns and x != 'gene_order']
+    author_by_gene = author_by_gene.reindex(columns=columns).reset_index(drop=True)
+    return(author_by_gene)
+
+
+def generate_author_table(datapath,resultpath):
+    gene_pmid = get_gene_pmid_table(datapath)
+    clean_authors = get_clean_authors(datapath)
+    author_by_gene = build_author_table(gene_pmid,clean_authors)
+    export_tsv(author_by_gene,resultpath,'potential_authors')
+    
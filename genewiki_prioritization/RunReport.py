@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import urllib.parse
+from datetime import datetime
+
+###############################################################################
+## Lightweight instrumentation for the pipelines
+## One report is kept per process (REPORT). The scripts wrap their steps in
+## stage('name'), which records wall time and how often each stage ran, and
+## nested stages are reported under their full path (eg- 'authors/genes')
+## External calls are tallied per API: requests, seconds, bytes, errors,
+## retries, 429s and the count of each status code
+## Sessions built on requests (the shared httprequests session, the pageview
+## session, mwclient's connection) are hooked with instrument_session, which
+## reads the status and time of every response and the retries urllib3 made
+## before it, and counts the body bytes as they are read (after any gzip is
+## decoded), so chunked and streamed responses are measured too. Entrez calls
+## are wrapped with api_call
+## Other counters, eg- cache hits and misses, go through count()
+## Reports from worker processes are added to the parent's with merge_report
+## write_report saves the report as JSON in results/run_report_<name>.json, so
+## each run's numbers are kept next to its results and can be compared with
+## earlier runs
+###############################################################################
+API_HOSTS = {'en.wikipedia.org':'mediawiki',
+             'wikimedia.org':'pageviews',
+             'query.wikidata.org':'sparql',
+             'eutils.ncbi.nlm.nih.gov':'entrez'}
+
+class RunReport(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.apis = {}
+        self.counters = {}
+
+    def stage_path(self):
+        return(getattr(self.local,'path',[]))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        path = self.stage_path()+[name]
+        self.local.path = path
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.local.path = path[:-1]
+            seconds = time.perf_counter()-start
+            with self.lock:
+                entry = self.stages.setdefault('/'.join(path),{'seconds':0.0,'calls':0})
+                entry['seconds'] += seconds
+                entry['calls'] += 1
+
+    def api_entry(self, api):
+        return(self.apis.setdefault(api,{'requests':0,'seconds':0.0,'bytes':0,'errors':0,
+                                         'retries':0,'status_429':0,'statuses':{}}))
+
+    def add_request(self, api, seconds, nbytes=0, status=None, retries=0, retry_statuses=(), error=None):
+        with self.lock:
+            entry = self.api_entry(api)
+            entry['requests'] += 1
+            entry['seconds'] += seconds
+            entry['bytes'] += nbytes
+            entry['retries'] += retries
+            for eachstatus in list(retry_statuses)+[status]:
+                if eachstatus is None:
+                    continue
+                entry['statuses'][str(eachstatus)] = entry['statuses'].get(str(eachstatus),0)+1
+                if eachstatus == 429:
+                    entry['status_429'] += 1
+            if error is not None or (status is not None and status >= 400):
+                entry['errors'] += 1
+
+    #### Bytes of a response body, added once it has been read
+    def add_bytes(self, api, nbytes):
+        with self.lock:
+            self.api_entry(api)['bytes'] += nbytes
+
+    def count(self, name, key, n=1):
+        with self.lock:
+            entry = self.counters.setdefault(name,{})
+            entry[key] = entry.get(key,0)+n
+
+    #### Add in a report from another process (as_dict), eg- a shard run in a
+    #### worker process, with its stages nested under the current stage
+    def merge(self, other):
+        path = self.stage_path()
+        with self.lock:
+            for name, entry in other['stages'].items():
+                target = self.stages.setdefault('/'.join(path+[name]),{'seconds':0.0,'calls':0})
+                target['seconds'] += entry['seconds']
+                target['calls'] += entry['calls']
+            for api, entry in other['apis'].items():
+                target = self.api_entry(api)
+                for key, value in entry.items():
+                    if key == 'statuses':
+                        for status, n in value.items():
+                            target['statuses'][status] = target['statuses'].get(status,0)+n
+                    else:
+                        target[key] += value
+            for name, entry in other['counters'].items():
+                target = self.counters.setdefault(name,{})
+                for key, value in entry.items():
+                    if key != 'hit_rate':
+                        target[key] = target.get(key,0)+value
+
+    def as_dict(self):
+        with self.lock:
+            counters = {}
+            for name, entry in self.counters.items():
+                counters[name] = dict(entry)
+                if 'hits' in entry or 'misses' in entry:
+                    total = entry.get('hits',0)+entry.get('misses',0)
+                    counters[name]['hit_rate'] = round(entry.get('hits',0)/total,4) if total > 0 else None
+            return({'started_at':self.started_at.isoformat(timespec='seconds'),
+                    'seconds':round(time.perf_counter()-self.start,3),
+                    'stages':{k:{'seconds':round(v['seconds'],3),'calls':v['calls']} for k,v in self.stages.items()},
+                    'apis':{k:dict(v,seconds=round(v['seconds'],3)) for k,v in self.apis.items()},
+                    'counters':counters})
+
+REPORT = RunReport()
+
+def stage(name):
+    return(REPORT.stage(name))
+
+def count(name,key,n=1):
+    REPORT.count(name,key,n)
+
+def merge_report(other):
+    REPORT.merge(other)
+
+def get_api_name(url):
+    host = urllib.parse.urlsplit(url).hostname or ''
+    for eachhost, api in API_HOSTS.items():
+        if host == eachhost or host.endswith('.'+eachhost):
+            return(api)
+    return(host)
+
+#### Stands in for a response's urllib3 body (response.raw) and adds up the
+#### bytes handed out, whether requests reads it all at once or the caller
+#### streams it. The total goes in the report when the body runs out or the
+#### response is closed, so a stream abandoned part way counts what was read
+class CountedBody(object):
+    def __init__(self, raw, api):
+        self.raw = raw
+        self.api = api
+        self.nbytes = 0
+        self.counted = False
+
+    def __getattr__(self, name):
+        return(getattr(self.raw,name))
+
+    def add_bytes(self):
+        if not self.counted:
+            self.counted = True
+            REPORT.add_bytes(self.api,self.nbytes)
+
+    def stream(self, *args, **kwargs):
+        for chunk in self.raw.stream(*args,**kwargs):
+            self.nbytes += len(chunk)
+            yield(chunk)
+        self.add_bytes()
+
+    def read(self, amt=None, *args, **kwargs):
+        data = self.raw.read(amt,*args,**kwargs)
+        self.nbytes += len(data or b'')
+        if amt is None or not data:
+            self.add_bytes()
+        return(data)
+
+    def close(self):
+        self.add_bytes()
+        self.raw.close()
+
+    def release_conn(self):
+        self.add_bytes()
+        self.raw.release_conn()
+
+#### requests response hook: one request per response, plus the retries
+#### urllib3 made for it (and the statuses that caused them). Responses
+#### answered from the HTTPCache are not requests; revalidated ones count as
+#### the 304 they were, with no body. A body that was already read (eg- by
+#### the HTTPCache, to store it) is counted now, any other as it is read
+def record_response(response, *args, **kwargs):
+    from_cache = getattr(response,'from_cache',None)
+    if from_cache == 'hit':
+        return(response)
+    api = get_api_name(response.url)
+    retries = getattr(getattr(response,'raw',None),'retries',None)
+    history = getattr(retries,'history',()) or ()
+    REPORT.add_request(api,response.elapsed.total_seconds(),0,304 if from_cache else response.status_code,
+                       len(history),[x.status for x in history if x.status is not None])
+    if from_cache is None and response._content_consumed:
+        REPORT.add_bytes(api,len(response._content or b''))
+    elif from_cache is None and response.raw is not None:
+        response.raw = CountedBody(response.raw,api)
+    return(response)
+
+def instrument_session(session):
+    if record_response not in session.hooks['response']:
+        session.hooks['response'].append(record_response)
+    return(session)
+
+#### Time a call to an API that is not made through requests (eg- Entrez)
+#### nbytes, if given, works out the size of the result
+def api_call(api,function,*args,nbytes=None,**kwargs):
+    start = time.perf_counter()
+    try:
+        result = function(*args,**kwargs)
+    except Exception as e:
+        REPORT.add_request(api,time.perf_counter()-start,error=e)
+        raise
+    REPORT.add_request(api,time.perf_counter()-start,nbytes(result) if nbytes is not None else 0)
+    return(result)
+
+def write_report(resultpath,name):
+    path = os.path.join(resultpath,'run_report_'+name+'.json')
+    with open(path,'w') as outwrite:
+        json.dump(REPORT.as_dict(),outwrite,indent=2,sort_keys=True)
+    return(path)
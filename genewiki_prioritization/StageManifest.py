@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from .TableStorage import dataset_path, table_path, legacy_path
+
+###############################################################################
+## Content-hash memoization of the pipeline stages
+## data/stage_manifest.json records, for every stage that ran, one hash of its
+## inputs, its parameters and the pipeline code, and the hash of every output
+## it wrote. A stage is skipped when that hash is the same as last time and its
+## outputs are still there, unchanged
+## Inputs and outputs are named by where they live: 'data/<table>' is a table
+## in data/ in whichever form it is stored (dataset directory, Parquet or TSV,
+## see TableStorage) and 'results/<file>' is a file in results/
+## A stage's inputs are the outputs of the stages before it, so a stage re-runs
+## when anything upstream changed. When a stage writes outputs that differ from
+## last time, the entries of the stages that read them (and of the stages
+## after those) are dropped as well
+## A stage can read one of its own outputs (filter_wikis reads the stored
+## page volume table and writes it back). Its hash is worked out again after
+## it ran, so its own write does not count as a change but anything else
+## that rewrites the table does
+## Stages that read from remote services (Wikidata, MediaWiki, Entrez) give a
+## max_age: they are only skipped for that many seconds after their last run,
+## since the services change even when the local inputs do not (max_age 0
+## always runs). force skips the check for one run
+## Hashing every file each run would read all of author_df, so the hash of
+## each file is kept with its size and modification time and only worked out
+## again when either changes
+###############################################################################
+MANIFEST_FILE = 'stage_manifest.json'
+HASH_CHUNK = 1024*1024
+CODE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+def manifest_path(datapath):
+    return(os.path.join(datapath,MANIFEST_FILE))
+
+#### stages is {name: {'inputs':[...], 'outputs':[...], 'max_age':seconds or None}}
+class StageManifest(object):
+    def __init__(self, datapath, resultpath, stages):
+        self.roots = {'data':datapath,'results':resultpath,'code':CODE_PATH}
+        self.path = manifest_path(datapath)
+        self.specs = stages
+        self.stages = {}
+        self.files = {}
+        if os.path.exists(self.path):
+            with open(self.path) as inread:
+                stored = json.load(inread)
+            self.stages = stored.get('stages',{})
+            self.files = stored.get('files',{})
+
+    #### (key, path) of every file making up a named input, in a fixed order
+    def resolve(self, name):
+        root, rest = name.split('/',1)
+        base = self.roots[root]
+        if root == 'results' or os.path.splitext(rest)[1] != '':
+            paths = [os.path.join(base,rest)]
+        elif os.path.isdir(dataset_path(base,rest)):
+            paths = [os.path.join(x[0],y) for x in os.walk(dataset_path(base,rest)) for y in x[2]]
+        else:
+            paths = [table_path(base,rest),legacy_path(base,rest)]
+        paths = sorted(x for x in paths if os.path.isfile(x))
+        return([(root+'/'+os.path.relpath(x,base).replace(os.sep,'/'),x) for x in paths])
+
+    def file_hash(self, key, path):
+        info = os.stat(path)
+        cached = self.files.get(key)
+        if cached is not None and cached[0] == info.st_size and cached[1] == info.st_mtime_ns:
+            return(cached[2])
+        digest = hashlib.sha256()
+        with open(path,'rb') as inread:
+            for chunk in iter(lambda: inread.read(HASH_CHUNK),b''):
+                digest.update(chunk)
+        self.files[key] = [info.st_size,info.st_mtime_ns,digest.hexdigest()]
+        return(digest.hexdigest())
+
+    #### None if the input does not exist
+    def input_hash(self, name):
+        files = self.resolve(name)
+        if len(files) == 0:
+            return(None)
+        digest = hashlib.sha256()
+        for key, path in files:
+            digest.update((key+'\t'+self.file_hash(key,path)+'\n').encode('utf-8'))
+        return(digest.hexdigest())
+
+    #### The modules of this package, so a change to the code re-runs the stages
+    def code_hash(self):
+        digest = hashlib.sha256()
+        for filename in sorted(x for x in os.listdir(CODE_PATH) if x.endswith('.py')):
+            digest.update((filename+'\t'+self.file_hash('code/'+filename,os.path.join(CODE_PATH,filename))+'\n').encode('utf-8'))
+        return(digest.hexdigest())
+
+    def stage_hash(self, name, params):
+        spec = self.specs[name]
+        state = {'inputs':{x:self.input_hash(x) for x in spec['inputs']},'params':params,'code':self.code_hash()}
+        return(hashlib.sha256(json.dumps(state,sort_keys=True,default=str).encode('utf-8')).hexdigest())
+
+    #### Returns the stage hash and why the stage has to run (None if it can be skipped)
+    def check(self, name, params, force=False):
+        key = self.stage_hash(name,params)
+        entry = self.stages.get(name)
+        max_age = self.specs[name].get('max_age')
+        if force:
+            return(key,'forced')
+        if entry is None:
+            return(key,'no earlier run')
+        if entry['hash'] != key:
+            return(key,'inputs, parameters or code changed')
+        if max_age is not None and time.time()-entry['finished'] >= max_age:
+            return(key,'last run is more than '+str(max_age)+' seconds old')
+        for output, digest in entry['outputs'].items():
+            if self.input_hash(output) != digest:
+                return(key,output+' is missing or was changed')
+        return(key,None)
+
+    def finished_at(self, name):
+        return(datetime.fromtimestamp(self.stages[name]['finished']).strftime('%Y-%m-%d %H:%M:%S'))
+
+    #### Stages reading any of outputs, and the stages downstream of those
+    def downstream(self, outputs, found=None):
+        found = [] if found is None else found
+        changed = set(outputs)
+        for name, spec in self.specs.items():
+            if name not in found and changed.intersection(spec['inputs']):
+                found.append(name)
+                self.downstream(spec['outputs'],found)
+        return(found)
+
+    #### params are needed when the stage reads one of its own outputs
+    def record(self, name, key, params=None):
+        spec = self.specs[name]
+        if set(spec['inputs']).intersection(spec['outputs']):
+            key = self.stage_hash(name,params)
+        outputs = {x:self.input_hash(x) for x in spec['outputs']}
+        previous = self.stages.get(name,{}).get('outputs',{})
+        changed = [x for x in outputs if previous.get(x) != outputs[x]]
+        self.stages[name] = {'hash':key,'finished':time.time(),'outputs':outputs}
+        for stale in self.downstream(changed):
+            if stale != name and self.stages.pop(stale,None) is not None:
+                print('dropped ',stale,' from the stage manifest: its inputs changed')
+        self.save()
+
+    #### Written to a temporary file first, so a run that is killed while
+    #### saving leaves the last manifest in place
+    def save(self):
+        files = {k:v for k,v in self.files.items() if os.path.isfile(os.path.join(self.roots[k.split('/',1)[0]],k.split('/',1)[1]))}
+        with open(self.path+'.tmp','w') as outwrite:
+            json.dump({'stages':self.stages,'files':files},outwrite,indent=2,sort_keys=True)
+        os.replace(self.path+'.tmp',self.path)
@@ -0,0 +1,198 @@
+import os
+import operator
+import shutil
+import lzma
+import pickle
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+###############################################################################
+## Storage layer for the intermediate tables in data/
+## Tables are written as typed, compressed Parquet files (name.parquet), so a
+## reader can load only the columns it needs (column projection) and skip row
+## groups that cannot match a filter (predicate pushdown)
+## Filters use the pyarrow form: a list of (column, op, value) tuples that must
+## all hold, eg- [('geneid','in',[1,2,3]),('year','>=',2010)]
+## Tables written by older runs as tab-separated text (name.tsv, with the index
+## in the first column) are still read, with the same projection and filters
+## applied after loading, until the table is written again (which removes the
+## TSV). Results that are committed for people to browse are
+## still exported as TSV with export_tsv
+## Large tables that are produced a piece at a time (eg- author_df) are kept as
+## append-only datasets: a directory data/name/ of part-NNNNN.parquet files,
+## written with DatasetWriter and read back by read_table as one table
+## Text columns that repeat a lot (eg- author names and affiliations) can be
+## read as pandas categoricals (categories=[...]): Parquet already stores them
+## as a dictionary of distinct values plus codes, and they are loaded that way
+## instead of as one Python string per row. Id columns stored as text (pmid,
+## geneid) can be read as integers (integers=[...]). The files themselves keep
+## the same schema, so parts written before and after still read as one table
+###############################################################################
+PARQUET_COMPRESSION = 'zstd'
+
+FILTER_OPS = {'==':operator.eq, '=':operator.eq, '!=':operator.ne,
+              '<':operator.lt, '<=':operator.le, '>':operator.gt, '>=':operator.ge}
+
+def table_path(datapath,name):
+    return(os.path.join(datapath,name+'.parquet'))
+
+def dataset_path(datapath,name):
+    return(os.path.join(datapath,name))
+
+def legacy_path(datapath,name):
+    return(os.path.join(datapath,name+'.tsv'))
+
+def table_exists(datapath,name):
+    return(os.path.isdir(dataset_path(datapath,name)) or os.path.exists(table_path(datapath,name))
+           or os.path.exists(legacy_path(datapath,name)))
+
+#### Columns that are entirely empty would be typed as null, which cannot be
+#### combined with the string columns in other parts of a dataset
+def to_arrow(df):
+    table = pa.Table.from_pandas(df,preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i,pa.field(field.name,pa.string()),pa.array([None]*len(table),type=pa.string()))
+    return(table)
+
+def write_parquet(df,path):
+    pq.write_table(to_arrow(df),path,compression=PARQUET_COMPRESSION)
+
+#### Remove every stored form of a table, including a TSV left by an older
+#### run, so a stale copy is never read back or committed alongside the new one
+def clear_table(datapath,name):
+    if os.path.isdir(dataset_path(datapath,name)):
+        shutil.rmtree(dataset_path(datapath,name))
+    for path in [table_path(datapath,name),legacy_path(datapath,name)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+def write_table(df,datapath,name):
+    clear_table(datapath,name)
+    write_parquet(df,table_path(datapath,name))
+
+#### Appends DataFrames to data/name/ as numbered parts. Unless append is True
+#### any earlier copy of the table is removed first
+class DatasetWriter(object):
+    def __init__(self, datapath, name, append=False):
+        if append == False:
+            clear_table(datapath,name)
+        self.path = dataset_path(datapath,name)
+        os.makedirs(self.path,exist_ok=True)
+        self.part = len(list_parts(self.path))
+        self.rows = 0
+
+    #### part can be given to number the file explicitly (eg- by checkpoint)
+    def write(self, df, part=None):
+        if len(df) == 0:
+            return
+        if part is not None:
+            self.part = part
+        write_parquet(df,os.path.join(self.path,'part-%05d.parquet' % self.part))
+        self.part += 1
+        self.rows += len(df)
+
+def list_parts(path):
+    return(sorted(x for x in os.listdir(path) if x.endswith('.parquet')))
+
+def part_path(datapath,name,part):
+    return(os.path.join(dataset_path(datapath,name),'part-%05d.parquet' % part))
+
+#### Numbers of the parts in data/name/, in order
+def part_numbers(datapath,name):
+    path = dataset_path(datapath,name)
+    if not os.path.isdir(path):
+        return([])
+    return([int(x.replace('part-','').replace('.parquet','')) for x in list_parts(path)])
+
+#### Highest part number in data/name/, or -1 if there are no parts
+def last_part(datapath,name):
+    return(max(part_numbers(datapath,name),default=-1))
+
+#### Copy part number part of frompath/name/ into datapath/name/ as topart
+def copy_part(frompath,datapath,name,part,topart):
+    os.makedirs(dataset_path(datapath,name),exist_ok=True)
+    shutil.copyfile(part_path(frompath,name,part),part_path(datapath,name,topart))
+
+#### Drop parts numbered above part, eg- ones written after the last checkpoint
+def remove_parts_after(datapath,name,part):
+    path = dataset_path(datapath,name)
+    if not os.path.isdir(path):
+        return
+    for eachpart in list_parts(path):
+        if int(eachpart.replace('part-','').replace('.parquet','')) > part:
+            os.remove(os.path.join(path,eachpart))
+
+#### Text ids to integers, converting each distinct value once. Ids read from
+#### Parquet are read as dictionaries first, so they are only decoded once too
+def to_int_ids(values):
+    if pd.api.types.is_integer_dtype(values):
+        return(values)
+    codes, uniques = pd.factorize(values)
+    if (codes < 0).any():
+        return(pd.to_numeric(values))
+    try:
+        ids = np.asarray(uniques,dtype=object).astype(np.int64)
+    except (TypeError,ValueError):
+        ids = pd.to_numeric(pd.Series(uniques,dtype=object)).to_numpy()
+    return(pd.Series(ids[codes],index=values.index,name=values.name))
+
+def encode_columns(df,categories=None,integers=None):
+    for column in categories or []:
+        if column in df.columns and not isinstance(df[column].dtype,pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    for column in integers or []:
+        if column in df.columns:
+            df[column] = to_int_ids(df[column])
+    return(df)
+
+#### Apply pyarrow style filters to a DataFrame that was not read from Parquet
+def apply_filters(df,filters):
+    if not filters:
+        return(df)
+    keep = pd.Series(True,index=df.index)
+    for column, op, value in filters:
+        if op == 'in':
+            keep &= df[column].isin(value)
+        elif op == 'not in':
+            keep &= ~df[column].isin(value)
+        else:
+            keep &= FILTER_OPS[op](df[column],value)
+    return(df.loc[keep])
+
+#### Columns of the file that can be read straight into categoricals
+def dictionary_columns(schema,categories,columns=None):
+    return([x for x in categories or [] if x in schema.names and (columns is None or x in columns)
+            and pa.types.is_string(schema.field(x).type)])
+
+def read_table(datapath,name,columns=None,filters=None,categories=None,integers=None):
+    if os.path.isdir(dataset_path(datapath,name)):
+        parts = [os.path.join(dataset_path(datapath,name),x) for x in list_parts(dataset_path(datapath,name))]
+        if len(parts) == 0:
+            return(pd.DataFrame(columns=columns))
+        read_dictionary = dictionary_columns(pq.read_schema(parts[0]),(categories or [])+(integers or []),columns)
+        df = pq.ParquetDataset(parts,filters=filters,read_dictionary=read_dictionary).read(columns=columns).to_pandas()
+    elif os.path.exists(table_path(datapath,name)):
+        read_dictionary = dictionary_columns(pq.read_schema(table_path(datapath,name)),(categories or [])+(integers or []),columns)
+        df = pd.read_parquet(table_path(datapath,name),engine='pyarrow',columns=columns,filters=filters,read_dictionary=read_dictionary)
+    else:
+        df = pd.read_csv(legacy_path(datapath,name),delimiter='\t',header=0,index_col=0)
+        df = apply_filters(df,filters)
+        if columns is not None:
+            df = df[columns]
+        df = df.reset_index(drop=True)
+    return(encode_columns(df,categories,integers))
+
+#### author_df used to be stored as an lzma-compressed pickle
+def read_legacy_pickle(datapath,name,columns=None,filters=None,categories=None,integers=None):
+    with lzma.open(os.path.join(datapath,name+'.xz')) as f:
+        df = pickle.loads(f.read())
+    df = apply_filters(df,filters)
+    if columns is not None:
+        df = df[columns]
+    return(encode_columns(df.reset_index(drop=True),categories,integers))
+
+def export_tsv(df,resultpath,name):
+    df.to_csv(os.path.join(resultpath,name+'.tsv'),sep='\t',header=True)
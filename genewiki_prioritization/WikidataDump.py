@@ -0,0 +1,156 @@
+import os
+import shutil
+import subprocess
+import bz2
+import gzip
+import json
+import urllib.parse
+import collections
+import multiprocessing
+import pandas as pd
+
+###############################################################################
+## Offline alternative to the Wikidata SPARQL queries in FetchGeneInfo
+## Streams a Wikidata JSON dump (latest-all.json.bz2/.gz, or a filtered subset
+## in the same one-entity-per-line format) and builds the same gene table as
+## get_wd_gene_table, so split_wd_gene_table gives the usual four tables
+## Genes are items with P31 (instance of) Q7187 and P703 (found in taxon)
+## Q15978631, one row per P351 (Entrez gene ID) and P688 (encodes) pair, as in
+## the query. Only truthy statements are used, like wdt: in SPARQL
+## The dump is read in one pass. Proteins are collected as items with P702
+## (encoded by) that have an English Wikipedia sitelink, since a gene can come
+## before or after its protein in the dump; that keeps memory to the gene rows
+## and those proteins rather than every sitelink in Wikidata
+## This differs from the query in one case: the query links any P688 target
+## with an English article, while a protein here also needs its own P702
+## claim. A protein with an article but no P702 back to its gene ends up in
+## proteins_no_wiki rather than proteins_en_wiki (tests/test_wikidata_dump.py)
+## Decompression runs in a separate process (lbzip2/pbzip2 for .bz2, pigz for
+## .gz) when one is installed, otherwise with Python's bz2/gzip. Lines that
+## cannot be a gene or a protein are dropped with a byte search before any
+## JSON is parsed, and the rest are parsed in batches by a process pool, with
+## no more than a few batches per worker waiting at any time
+###############################################################################
+HUMAN_GENE = 'Q7187'
+HUMAN = 'Q15978631'
+ENWIKI_URL = 'https://en.wikipedia.org/wiki/'
+ENWIKI_SAFE = ';@$!*(),/~:' ## characters MediaWiki leaves unescaped in page URLs
+DUMP_LINES_PER_BATCH = 500
+DUMP_WORKERS = max(1,(os.cpu_count() or 2)-1)
+DECOMPRESSORS = {'.bz2':[['lbzip2','-dc'],['pbzip2','-dc']],
+                 '.gz':[['pigz','-dc']]}
+
+def get_decompressor(path):
+    for command in DECOMPRESSORS.get(os.path.splitext(path)[1],[]):
+        if shutil.which(command[0]) is not None:
+            return(command)
+    return(None)
+
+def iter_dump_lines(path):
+    command = get_decompressor(path)
+    if command is not None:
+        process = subprocess.Popen(command+[path],stdout=subprocess.PIPE,bufsize=1024*1024)
+        try:
+            for line in process.stdout:
+                yield(line)
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+        return
+    if path.endswith('.bz2'):
+        dump = bz2.open(path,'rb')
+    elif path.endswith('.gz'):
+        dump = gzip.open(path,'rb')
+    else:
+        dump = open(path,'rb')
+    with dump:
+        for line in dump:
+            yield(line)
+
+#### Only genes and proteins with an English Wikipedia article are parsed
+def is_candidate(line):
+    return((b'"'+HUMAN_GENE.encode()+b'"' in line) or (b'"P702"' in line and b'"enwiki"' in line))
+
+def iter_candidate_batches(lines,lines_per_batch=DUMP_LINES_PER_BATCH):
+    batch = []
+    for line in lines:
+        if is_candidate(line):
+            batch.append(line)
+            if len(batch) >= lines_per_batch:
+                yield(batch)
+                batch = []
+    if len(batch) > 0:
+        yield(batch)
+
+#### Values of the truthy statements for a property: the preferred ones if
+#### there are any, otherwise the normal ones
+def truthy_values(entity,prop):
+    claims = entity.get('claims',{}).get(prop,[])
+    ranked = [x for x in claims if x.get('rank') == 'preferred'] or [x for x in claims if x.get('rank','normal') == 'normal']
+    values = []
+    for eachclaim in ranked:
+        datavalue = eachclaim.get('mainsnak',{}).get('datavalue')
+        if datavalue is None:
+            continue
+        value = datavalue['value']
+        values.append(value['id'] if isinstance(value,dict) else value)
+    return(values)
+
+def get_enwiki_link(entity):
+    sitelink = entity.get('sitelinks',{}).get('enwiki')
+    if sitelink is None:
+        return(None)
+    return(ENWIKI_URL+urllib.parse.quote(sitelink['title'].replace(' ','_'),safe=ENWIKI_SAFE))
+
+#### Parse a batch of dump lines into gene rows and protein links
+#### gene rows are (QID, label, geneID, proteinID, genelink, hassitelink)
+#### proteins is a list of (QID, enwiki link)
+def parse_dump_lines(lines):
+    genes = []
+    proteins = []
+    for line in lines:
+        line = line.strip().rstrip(b',')
+        if len(line) < 2:
+            continue
+        entity = json.loads(line)
+        QID = entity['id']
+        if HUMAN_GENE in truthy_values(entity,'P31') and HUMAN in truthy_values(entity,'P703'):
+            label = entity.get('labels',{}).get('en',{}).get('value',QID)
+            genelink = get_enwiki_link(entity)
+            hassitelink = len(entity.get('sitelinks',{})) > 0
+            for geneID in truthy_values(entity,'P351'):
+                for proteinID in truthy_values(entity,'P688'):
+                    genes.append((QID,label,geneID,proteinID,genelink,hassitelink))
+        if 'P702' in entity.get('claims',{}):
+            link = get_enwiki_link(entity)
+            if link is not None:
+                proteins.append((QID,link))
+    return(genes,proteins)
+
+def iter_parsed_batches(path,workers=DUMP_WORKERS,lines_per_batch=DUMP_LINES_PER_BATCH):
+    batches = iter_candidate_batches(iter_dump_lines(path),lines_per_batch)
+    if workers <= 1:
+        for batch in batches:
+            yield(parse_dump_lines(batch))
+        return
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.apply_async(parse_dump_lines,(batch,)))
+            if len(pending) >= workers*4:
+                yield(pending.popleft().get())
+        while len(pending) > 0:
+            yield(pending.popleft().get())
+
+#### Gene table with the columns split_wd_gene_table expects
+def read_gene_table(path,workers=DUMP_WORKERS,lines_per_batch=DUMP_LINES_PER_BATCH):
+    genes = []
+    protein_links = {}
+    for batch_genes, batch_proteins in iter_parsed_batches(path,workers,lines_per_batch):
+        genes.extend(batch_genes)
+        protein_links.update(batch_proteins)
+    print('wikidata dump: ',len(genes),' gene rows, ',len(protein_links),' proteins with an English Wikipedia article')
+    datadf = pd.DataFrame(genes,columns=['QID','label','geneID','proteinID','genelink','hassitelink'])
+    datadf['proteinlink'] = datadf['proteinID'].map(protein_links)
+    return(datadf)
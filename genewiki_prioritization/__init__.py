@@ -0,0 +1,17 @@
+import os
+
+###############################################################################
+## Gene Wiki Review prioritization pipeline
+## FetchGeneInfo: genes/proteins from Wikidata, their Wikipedia articles and
+##   article sizes -> results/priority_by_size.tsv
+## IdentifyAuthors: publications and authors for the priority genes (Entrez)
+## PrioritizeGenes: author table per gene -> results/potential_authors.tsv
+## Importing the package or its modules does no work and opens no connections:
+## the HTTP sessions, the MediaWiki site and Bio.Entrez are set up on first
+## use, and the environment (USER_AGENT, USEREMAIL) is only read then
+## The stages are run from the command line, see cli.py:
+##   python -m genewiki_prioritization <stage>
+###############################################################################
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(REPO_PATH,'data/')
+RESULT_PATH = os.path.join(REPO_PATH,'results/')
@@ -0,0 +1,5 @@
+from .cli import main
+
+#### guarded so that worker processes started with spawn (eg- on Windows) do not run it again
+if __name__ == '__main__':
+    main()
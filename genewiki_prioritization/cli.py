@@ -0,0 +1,251 @@
+import os
+import sys
+import argparse
+from . import DATA_PATH, RESULT_PATH
+from .RunReport import stage, count, write_report
+from .StageManifest import StageManifest
+
+###############################################################################
+## Command line entry point, one subcommand per stage:
+##   wikidata          gene/protein tables from Wikidata (query service or dump)
+##   filter-no-wikis   genes with no gene or protein article
+##   filter-wikis      article sizes -> priority_by_size
+##   fetch-gene-info   the three above, in order
+##   authors           publications and authors for the priority genes, either
+##                     in one run, one shard (--shard i/N) or every shard in
+##                     local processes (--shards N)
+##   merge-shards      combine the shards of an author run once all are done
+##   retry-failures    resume the author run and retry what failed
+##   author-table      potential_authors from the author tables
+##   rank-genes        genes_by_wiki_length, genes_by_score and genes_by_pubcount
+##   sweep-rankings    top genes by score over a grid of thresholds and weights
+##   gene-lookup       the indexed lookup store over the results (GeneLookup)
+## and two commands that only read the lookup store (not stages, so they
+## write no run report):
+##   lookup            one gene by ID, label, QID or title, or --top N of a ranking
+##   serve-lookup      the same over HTTP
+## Each stage writes its run report to results/run_report_<stage>.json
+## The pipeline modules are only imported by the stage that needs them
+## STAGES lists what each stage reads and writes (see StageManifest) and the
+## options that change its results. A stage whose inputs, options and code
+## are the same as at its last run is skipped; --force <stage> runs it anyway
+## (--force all for every stage). Stages that call remote services are only
+## skipped within REMOTE_MAX_AGE of their last run, and the author stages
+## always run (the author journal already resumes a finished run for free)
+###############################################################################
+REMOTE_MAX_AGE = 24*60*60
+WIKIDATA_TABLES = ['data/genes_no_wiki','data/proteins_no_wiki','data/genes_en_wiki','data/proteins_en_wiki']
+AUTHOR_TABLES = ['data/PublicationDetailsDF','data/author_df']
+RANKED_TABLES = ['results/genes_by_wiki_length.tsv','results/genes_by_score.tsv','results/genes_by_pubcount.tsv']
+
+#### Wikidata and pageview responses are cached under the data directory in use
+def load_fetch_gene_info(args):
+    from . import FetchGeneInfo
+    FetchGeneInfo.use_http_cache(args.data if args.http_cache else None)
+    return(FetchGeneInfo)
+
+def run_wikidata(args):
+    FetchGeneInfo = load_fetch_gene_info(args)
+    if args.wikidata_dump is not None:
+        FetchGeneInfo.get_wd_info_from_dump(args.data,args.wikidata_dump)
+    else:
+        FetchGeneInfo.get_wd_info(args.data)
+
+def run_filter_no_wikis(args):
+    FetchGeneInfo = load_fetch_gene_info(args)
+    FetchGeneInfo.filter_no_wikis(args.data,args.results)
+
+def run_filter_wikis(args):
+    FetchGeneInfo = load_fetch_gene_info(args)
+    FetchGeneInfo.filter_wikis(args.data,args.results,pause=args.mw_pause)
+
+def run_authors(args):
+    from . import IdentifyAuthors
+    genelist = IdentifyAuthors.load_priority_genes(args.results)
+    if args.shard is not None:
+        return(IdentifyAuthors.run_author_shard(genelist,args.data,args.shard[0],args.shard[1],max_runtime=args.max_runtime,
+                                         delta=args.delta,entrez_rate=IdentifyAuthors.shard_entrez_rate(args.shard[1],args.entrez_rate)))
+    elif args.shards is not None:
+        return(IdentifyAuthors.run_author_shards(genelist,args.data,args.shards,args.workers,max_runtime=args.max_runtime,
+                                          delta=args.delta,entrez_rate=args.entrez_rate))
+    return(IdentifyAuthors.get_authors(genelist,args.data,max_runtime=args.max_runtime,delta=args.delta))
+
+def run_merge_shards(args):
+    from . import IdentifyAuthors
+    IdentifyAuthors.merge_author_shards(args.data,args.shards)
+
+def run_retry_failures(args):
+    from . import IdentifyAuthors
+    return(IdentifyAuthors.deal_with_failures(args.data,max_runtime=args.max_runtime))
+
+def run_author_table(args):
+    from . import PrioritizeGenes
+    PrioritizeGenes.generate_author_table(args.data,args.results)
+
+def run_rank_genes(args):
+    from . import PrioritizeGenes
+    PrioritizeGenes.merge_and_filter_results(args.data,args.results,args.min_pubcount,args.min_pagelength,k=args.top)
+
+def run_sweep_rankings(args):
+    from . import PrioritizeGenes
+    from .TableStorage import export_tsv
+    gene_summary = PrioritizeGenes.get_gene_summary(args.data,args.results)
+    swept = PrioritizeGenes.sweep_rankings(gene_summary,args.min_pubcount,args.min_pagelength,args.weights,args.score,k=args.top)
+    export_tsv(swept,args.results,'ranking_sweep')
+
+def run_gene_lookup(args):
+    from . import GeneLookup
+    GeneLookup.build_gene_lookup(args.data,args.results,args.min_pubcount,args.min_pagelength)
+
+def run_lookup(args):
+    import json
+    from . import GeneLookup
+    lookup = GeneLookup.GeneLookup(GeneLookup.gene_lookup_path(args.results))
+    if args.key is not None:
+        found = lookup.gene(args.key,args.authors)
+    else:
+        found = lookup.top(args.by,args.top or 20)
+    try:
+        print(json.dumps(found,indent=2))
+        sys.stdout.flush()
+    except BrokenPipeError:
+        #### the reader (eg- head) stopped early; point stdout at devnull so
+        #### the flush at exit does not fail again
+        os.dup2(os.open(os.devnull,os.O_WRONLY),sys.stdout.fileno())
+
+def run_serve_lookup(args):
+    from . import GeneLookup
+    GeneLookup.serve_gene_lookup(GeneLookup.gene_lookup_path(args.results),args.host,args.port)
+
+
+#### run returns False if the stage stopped before finishing (eg- at
+#### max_runtime), and then it is not recorded in the manifest
+STAGES = {'wikidata':{'run':run_wikidata,'inputs':[],'outputs':WIKIDATA_TABLES,
+                      'params':['wikidata_dump'],'max_age':REMOTE_MAX_AGE},
+          'filter_no_wikis':{'run':run_filter_no_wikis,'inputs':['data/genes_no_wiki','data/proteins_no_wiki'],
+                             'outputs':['results/genes_with_no_gene_protein_wiki.tsv'],'params':[]},
+          'filter_wikis':{'run':run_filter_wikis,'inputs':['data/genes_en_wiki','data/proteins_en_wiki','data/gene_wiki_vol_info'],
+                          'outputs':['data/gene_protein_wikilinks','data/gene_wiki_vol_info','results/priority_by_size.tsv'],
+                          'params':[],'max_age':REMOTE_MAX_AGE},
+          'authors':{'run':run_authors,'inputs':['results/priority_by_size.tsv'],'outputs':AUTHOR_TABLES,
+                     'params':['delta','shard','shards'],'max_age':0},
+          'merge_shards':{'run':run_merge_shards,'inputs':[],'outputs':AUTHOR_TABLES,'params':['shards'],'max_age':0},
+          'retry_failures':{'run':run_retry_failures,'inputs':[],'outputs':AUTHOR_TABLES,'params':[],'max_age':0},
+          'author_table':{'run':run_author_table,'inputs':AUTHOR_TABLES,'outputs':['results/potential_authors.tsv'],'params':[]},
+          'rank_genes':{'run':run_rank_genes,'inputs':['results/priority_by_size.tsv','data/PublicationDetailsDF'],
+                        'outputs':RANKED_TABLES,'params':['min_pubcount','min_pagelength','top']},
+          'sweep_rankings':{'run':run_sweep_rankings,'inputs':['results/priority_by_size.tsv','data/PublicationDetailsDF'],
+                            'outputs':['results/ranking_sweep.tsv'],'params':['min_pubcount','min_pagelength','weights','score','top']},
+          'gene_lookup':{'run':run_gene_lookup,'inputs':['results/priority_by_size.tsv','data/PublicationDetailsDF','results/potential_authors.tsv',
+                                                         'data/genes_en_wiki','data/proteins_en_wiki','data/genes_no_wiki']+RANKED_TABLES,
+                         'outputs':['results/gene_lookup.sqlite'],'params':['min_pubcount','min_pagelength']}}
+QUERIES = {'lookup':run_lookup,'serve_lookup':run_serve_lookup}
+GROUPS = {'fetch_gene_info':['wikidata','filter_no_wikis','filter_wikis']}
+
+def run_stage(name,args,manifest):
+    spec = STAGES[name]
+    params = {x:getattr(args,x) for x in spec['params']}
+    key, reason = manifest.check(name,params,name in args.force or 'all' in args.force)
+    if reason is None:
+        print('skipping ',name,': inputs unchanged since ',manifest.finished_at(name))
+        count('manifest','skipped')
+        return
+    print('running ',name,': ',reason)
+    count('manifest','ran')
+    if spec['run'](args) is not False:
+        manifest.record(name,key,params)
+
+
+def stage_name(value):
+    return(value.replace('-','_'))
+
+#### i/N, eg- 0/4 for the first of four shards
+def shard_type(value):
+    try:
+        shard, shards = [int(x) for x in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected i/N, eg- 0/4')
+    if shards < 1 or not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError('shard must be from 0 to N-1')
+    return((shard,shards))
+
+#### column=weight,column=weight, eg- page_length=10000,pubcount=2800
+def weights_type(value):
+    try:
+        return({column:float(weight) for column,weight in (x.split('=') for x in value.split(','))})
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected column=weight,column=weight')
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='genewiki_prioritization',description='Prioritize genes for Gene Wiki Review invitation')
+    parser.add_argument('--data',default=DATA_PATH,help='directory of the data tables')
+    parser.add_argument('--results',default=RESULT_PATH,help='directory of the results and run reports')
+    parser.add_argument('--force',type=stage_name,action='append',default=[],metavar='STAGE',choices=list(STAGES)+['all'],
+                        help='run STAGE even if its inputs are unchanged (repeat for more stages, or all)')
+    parser.add_argument('--no-http-cache',dest='http_cache',action='store_false',help='do not read or store HTTP responses in data/cache/http.sqlite')
+    stages = parser.add_subparsers(dest='stage',metavar='stage')
+    stages.required = True
+
+    wikidata = argparse.ArgumentParser(add_help=False)
+    wikidata.add_argument('--wikidata-dump',default=None,help='read the gene tables from a Wikidata JSON dump instead of the query service')
+    mediawiki = argparse.ArgumentParser(add_help=False)
+    mediawiki.add_argument('--mw-pause',type=float,default=0,help='seconds to wait between MediaWiki API batches (mwclient already backs off on maxlag)')
+    runtime = argparse.ArgumentParser(add_help=False)
+    runtime.add_argument('--max-runtime',type=float,default=None,help='seconds to run before checkpointing and stopping')
+
+    stages.add_parser('wikidata',parents=[wikidata],help='gene/protein tables from Wikidata')
+    stages.add_parser('filter-no-wikis',help='genes with no gene or protein Wikipedia article')
+    stages.add_parser('filter-wikis',parents=[mediawiki],help='sizes of the gene/protein Wikipedia articles')
+    stages.add_parser('fetch-gene-info',parents=[wikidata,mediawiki],help='wikidata, filter-no-wikis and filter-wikis')
+    authors = stages.add_parser('authors',parents=[runtime],help='publications and authors for the priority genes')
+    authors.add_argument('--delta',action='store_true',help='only fetch publications that are not in the stored tables yet')
+    sharding = authors.add_mutually_exclusive_group()
+    sharding.add_argument('--shard',type=shard_type,default=None,help='run shard i of N only (i from 0), eg- 0/4')
+    sharding.add_argument('--shards',type=int,default=None,help='run N shards in local processes and merge them')
+    authors.add_argument('--workers',type=int,default=None,help='processes for --shards (one per shard by default)')
+    authors.add_argument('--entrez-rate',type=float,default=None,help='Entrez requests per second shared by the shards (3, or 10 with NCBI_API_KEY); a --shard i/N job uses 1/N of it')
+    merge = stages.add_parser('merge-shards',help='combine the shards of an author run')
+    merge.add_argument('--shards',type=int,required=True,help='number of shards the run was split into')
+    stages.add_parser('retry-failures',parents=[runtime],help='resume the author run and retry what failed')
+    stages.add_parser('author-table',help='potential authors per gene')
+    rank = stages.add_parser('rank-genes',help='top genes by wiki length, score and publication count')
+    rank.add_argument('--min-pubcount',type=int,default=30)
+    rank.add_argument('--min-pagelength',type=int,default=200)
+    rank.add_argument('--top',type=int,default=500,help='genes kept in each table')
+    sweep = stages.add_parser('sweep-rankings',help='top genes by score for every combination of thresholds and weights')
+    sweep.add_argument('--min-pubcount',type=int,nargs='+',default=[30])
+    sweep.add_argument('--min-pagelength',type=int,nargs='+',default=[200])
+    sweep.add_argument('--weights',type=weights_type,nargs='+',default=None,help='weights of the score terms, eg- page_length=10000,pubcount=2800')
+    sweep.add_argument('--score',default='priority_score')
+    sweep.add_argument('--top',type=int,default=500,help='genes kept per variant')
+    lookup_store = stages.add_parser('gene-lookup',help='indexed lookup store over the results, for lookup and serve-lookup')
+    lookup_store.add_argument('--min-pubcount',type=int,default=30)
+    lookup_store.add_argument('--min-pagelength',type=int,default=200)
+    lookup = stages.add_parser('lookup',help='a gene by ID, label, QID or title, or the top genes of a ranking')
+    lookup.add_argument('key',nargs='?',default=None,help='gene ID, label, QID or Wikipedia title')
+    lookup.add_argument('--authors',type=int,default=10,help='potential authors to list')
+    lookup.add_argument('--top',type=int,default=None,help='list the top N genes of the --by ranking instead')
+    lookup.add_argument('--by',default='score',choices=['score','wiki_length','pubcount'],help='ranking for --top')
+    serve = stages.add_parser('serve-lookup',help='answer lookups over HTTP: /gene/<key>, /top/<ranking>?n=20')
+    serve.add_argument('--host',default='127.0.0.1')
+    serve.add_argument('--port',type=int,default=8000)
+    return(parser)
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    name = stage_name(args.stage)
+    if name in QUERIES:
+        QUERIES[name](args)
+        return
+    manifest = StageManifest(args.data,args.results,STAGES)
+    try:
+        with stage(name):
+            if name in GROUPS:
+                for eachstage in GROUPS[name]:
+                    with stage(eachstage):
+                        run_stage(eachstage,args,manifest)
+            else:
+                run_stage(name,args,manifest)
+    finally:
+        print('run report: ',write_report(args.results,name))
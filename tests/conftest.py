@@ -0,0 +1,31 @@
+###############################################################################
+## The tests run offline against the stand-in services and synthetic data in
+## benchmarks/ (standins.py, synthetic.py), so that directory is importable
+## data is the synthetic data the stand-ins serve, built again for each test
+## since some tests change it
+## Usage: python -m pytest -q (from the repository root)
+###############################################################################
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0,REPO_DIR)
+sys.path.insert(0,os.path.join(REPO_DIR,'benchmarks'))
+STAND_IN_SCALE = 0.01
+
+
+#### Keep the HTTP response cache out of data/ while testing
+@pytest.fixture(autouse=True,scope='session')
+def no_http_cache():
+    from genewiki_prioritization import FetchGeneInfo
+    FetchGeneInfo.use_http_cache(None)
+    yield
+
+
+@pytest.fixture
+def data():
+    import synthetic
+    return(synthetic.StandInData(STAND_IN_SCALE))
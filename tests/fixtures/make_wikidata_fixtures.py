@@ -0,0 +1,98 @@
+###############################################################################
+## Writes the Wikidata fixtures used by tests/test_wikidata_dump.py:
+##   wikidata_genes.json.bz2     a few entities in the dump's one-entity-per-line
+##                               format
+##   wikidata_genes_sparql.json  what the gene query (FetchGeneInfo.WD_GENE_QUERY)
+##                               returns for the same entities
+## The entities cover a deprecated P31, a gene with no English article, a gene
+## with no English label, P688 proteins with and without English articles, a
+## preferred gene ID, a protein missing from the dump, and a protein with an
+## English article but no P702 back to its gene (see WikidataDump)
+## Usage: python tests/fixtures/make_wikidata_fixtures.py
+###############################################################################
+import bz2
+import json
+import os
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+ENTITY = 'http://www.wikidata.org/entity/'
+ENWIKI = 'https://en.wikipedia.org/wiki/'
+BOOLEAN = 'http://www.w3.org/2001/XMLSchema#boolean'
+VARIABLES = ['item','itemLabel','geneID','proteinwdid','genelink','proteinlink','hassitelink']
+
+
+def claim(prop,value,rank='normal'):
+    if prop == 'P351':
+        datavalue = {'value':value,'type':'string'}
+        datatype = 'external-id'
+    else:
+        datavalue = {'value':{'entity-type':'item','numeric-id':int(value[1:]),'id':value},'type':'wikibase-entityid'}
+        datatype = 'wikibase-item'
+    return({'mainsnak':{'snaktype':'value','property':prop,'datavalue':datavalue,'datatype':datatype},
+            'type':'statement','rank':rank})
+
+def entity(QID,labels,claims,sitelinks):
+    grouped = {}
+    for eachclaim in claims:
+        grouped.setdefault(eachclaim['mainsnak']['property'],[]).append(eachclaim)
+    return({'type':'item','id':QID,'labels':{k:{'language':k,'value':v} for k,v in labels.items()},
+            'claims':grouped,'sitelinks':{k:{'site':k,'title':v,'badges':[]} for k,v in sitelinks.items()}})
+
+#### geneIDs is a list of (Entrez gene ID, rank)
+def gene(QID,label,geneIDs,proteins,sitelinks,p31='normal',taxon='Q15978631'):
+    labels = {'en':label} if label is not None else {'de':'Gen ohne englischen Namen'}
+    claims = [claim('P31','Q7187',p31),claim('P703',taxon)]
+    claims += [claim('P351',x,rank) for x,rank in geneIDs]
+    claims += [claim('P688',x) for x in proteins]
+    return(entity(QID,labels,claims,sitelinks))
+
+def protein(QID,label,geneQID,sitelinks,encoded_by=True):
+    claims = [claim('P31','Q8054')]+([claim('P702',geneQID)] if encoded_by else [])
+    return(entity(QID,{'en':label},claims,sitelinks))
+
+ENTITIES = [
+    gene('Q1001','GENEA',[('1001','normal')],['Q2001'],{'enwiki':'Gene A','dewiki':'Gen A'}),
+    protein('Q2001','Protein A','Q1001',{'enwiki':'Protein A (human)'}),
+    gene('Q1002',None,[('1002','normal')],['Q2002'],{'dewiki':'Gen B'}),
+    protein('Q2002','Protein B','Q1002',{'dewiki':'Protein B'}),
+    gene('Q1003','GENEC',[('1003','normal')],['Q2003'],{'enwiki':'Gene C'},p31='deprecated'),
+    protein('Q2003','Protein C','Q1003',{'enwiki':'Protein C'}),
+    gene('Q1004','GENED',[('1004','normal')],['Q2004','Q2005'],{}),
+    protein('Q2004','Protein D','Q1004',{'enwiki':'Protein D'}),
+    protein('Q2005','Protein D2','Q1004',{}),
+    gene('Q1005','GENEE',[('1005','preferred'),('99005','normal')],['Q2006'],{'enwiki':"Gene E's"}),
+    gene('Q1007','GENEG',[('1007','normal')],['Q2007'],{'enwiki':'Gene G'}),
+    protein('Q2007','Protein G','Q1007',{'enwiki':'Protein G'},encoded_by=False),
+    gene('Q1008','Mgeneh',[('1008','normal')],['Q2008'],{'enwiki':'Gene H (mouse)'},taxon='Q83310'),
+    gene('Q1009','GENEI',[('1009','normal')],[],{'enwiki':'Gene I'}),
+    entity('Q5',{'en':'human'},[],{'enwiki':'Human'}),
+]
+
+#### The label service falls back to the QID (without a language) when there is no English label
+def binding(QID,label,geneID,proteinID,genelink,proteinlink,hassitelink):
+    row = {'item':{'type':'uri','value':ENTITY+QID},
+           'itemLabel':{'xml:lang':'en','type':'literal','value':label} if label is not None else {'type':'literal','value':QID},
+           'geneID':{'type':'literal','value':geneID},
+           'proteinwdid':{'type':'uri','value':ENTITY+proteinID},
+           'hassitelink':{'datatype':BOOLEAN,'type':'literal','value':'true' if hassitelink else 'false'}}
+    if genelink is not None:
+        row['genelink'] = {'type':'uri','value':ENWIKI+genelink}
+    if proteinlink is not None:
+        row['proteinlink'] = {'type':'uri','value':ENWIKI+proteinlink}
+    return(row)
+
+BINDINGS = [binding('Q1001','GENEA','1001','Q2001','Gene_A','Protein_A_(human)',True),
+            binding('Q1002',None,'1002','Q2002',None,None,True),
+            binding('Q1004','GENED','1004','Q2004',None,'Protein_D',False),
+            binding('Q1004','GENED','1004','Q2005',None,None,False),
+            binding('Q1005','GENEE','1005','Q2006','Gene_E%27s',None,True),
+            binding('Q1007','GENEG','1007','Q2007','Gene_G','Protein_G',True)]
+
+
+if __name__ == '__main__':
+    lines = [json.dumps(x,separators=(',',':')) for x in ENTITIES]
+    with bz2.open(os.path.join(FIXTURES,'wikidata_genes.json.bz2'),'wt') as outwrite:
+        outwrite.write('[\n'+',\n'.join(lines)+'\n]\n')
+    with open(os.path.join(FIXTURES,'wikidata_genes_sparql.json'),'w') as outwrite:
+        json.dump({'head':{'vars':VARIABLES},'results':{'bindings':BINDINGS}},outwrite,indent=1)
+        outwrite.write('\n')
@@ -0,0 +1,109 @@
+###############################################################################
+## The journaled author run (IdentifyAuthors.run_author_journal) against the
+## stand-in Entrez: a run killed part way resumes under the same label and ends
+## with the same tables as an uninterrupted run, a second run of a finished
+## label does nothing, and a delta run fetches only the new gene/PMID pairs
+###############################################################################
+import os
+
+import pytest
+
+from genewiki_prioritization import IdentifyAuthors
+from genewiki_prioritization.TableStorage import read_table, part_numbers
+import standins
+
+GENES_PER_CHECKPOINT = 10
+
+
+#### Dies (like a cancelled CI job) on the crash_at'th elink call
+class CrashingEntrez(standins.StandInEntrez):
+    def __init__(self, data, crash_at):
+        super().__init__(data)
+        self.crash_at = crash_at
+
+    def elink(self, *args, **kwargs):
+        if self.counts['elink']+1 == self.crash_at:
+            self.counts['elink'] += 1
+            raise KeyboardInterrupt('job cancelled')
+        return(super().elink(*args,**kwargs))
+
+
+#### Small chunks and checkpoints, so a few dozen genes make several checkpoints
+@pytest.fixture(autouse=True)
+def small_checkpoints(monkeypatch):
+    run_gene_units = IdentifyAuthors.run_gene_units
+    monkeypatch.setattr(IdentifyAuthors,'GENES_PER_CHUNK',GENES_PER_CHECKPOINT)
+    monkeypatch.setattr(IdentifyAuthors,'ENTREZ_PAUSE',0)
+    monkeypatch.setattr(IdentifyAuthors,'run_gene_units',
+                        lambda *args,**kwargs: run_gene_units(*args,genes_per_checkpoint=GENES_PER_CHECKPOINT,**kwargs))
+
+def use_entrez(monkeypatch,entrez):
+    monkeypatch.setattr(IdentifyAuthors,'Entrez',entrez)
+    return(entrez)
+
+def gene_pmid_pairs(datapath):
+    pubs = read_table(datapath,'PublicationDetailsDF',columns=['geneid','pmid'])
+    return(sorted(zip(pubs['geneid'].astype(str),pubs['pmid'].astype(str))))
+
+def author_rows(datapath):
+    authors = read_table(datapath,'author_df',columns=['AU','pmid'])
+    return(sorted(zip(authors['AU'].astype(str),authors['pmid'].astype(str))))
+
+def expected_pairs(data,genes):
+    return(sorted((str(x),y) for x in genes for y in data.gene_pmids[str(x)] if len(data.gene_pmids[str(x)]) > 30))
+
+
+def test_resumes_after_crash(data,tmp_path,monkeypatch):
+    genes = data.genes
+    crashed = str(tmp_path/'crashed')
+    clean = str(tmp_path/'clean')
+    os.makedirs(crashed)
+    os.makedirs(clean)
+    use_entrez(monkeypatch,CrashingEntrez(data,crash_at=3))
+    with pytest.raises(KeyboardInterrupt):
+        IdentifyAuthors.run_author_journal(genes,crashed,run_label='test')
+    conn = IdentifyAuthors.open_author_journal(crashed)
+    done = conn.execute("SELECT COUNT(*) FROM gene_units WHERE status != 'pending'").fetchone()[0]
+    conn.close()
+    assert done == 2*GENES_PER_CHECKPOINT
+    entrez = use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(genes,crashed,run_label='test') == True
+    assert entrez.counts['elink'] == -(-(len(genes)-done)//GENES_PER_CHECKPOINT)
+    use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(genes,clean,run_label='test') == True
+    assert gene_pmid_pairs(crashed) == gene_pmid_pairs(clean) == expected_pairs(data,genes)
+    assert author_rows(crashed) == author_rows(clean)
+    with open(os.path.join(crashed,'genefailures.txt')) as inread:
+        assert inread.read().split() == [str(x) for x in genes if len(data.gene_pmids[str(x)]) <= 30]
+
+def test_second_run_does_nothing(data,tmp_path,monkeypatch):
+    datapath = str(tmp_path)
+    use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(data.genes,datapath,run_label='test') == True
+    parts = part_numbers(datapath,'PublicationDetailsDF')
+    pairs = gene_pmid_pairs(datapath)
+    entrez = use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(data.genes,datapath,run_label='test') == True
+    assert entrez.counts == {'elink':0,'epost':0,'efetch':0}
+    assert part_numbers(datapath,'PublicationDetailsDF') == parts
+    assert gene_pmid_pairs(datapath) == pairs
+
+def test_delta_adds_only_new_pairs(data,tmp_path,monkeypatch):
+    datapath = str(tmp_path)
+    use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(data.genes,datapath,run_label='first') == True
+    before = gene_pmid_pairs(datapath)
+    authors_before = author_rows(datapath)
+    linked = [x for x in data.genes if len(data.gene_pmids[str(x)]) > 30][:3]
+    new_pmids = {}
+    for i, geneid in enumerate(linked):
+        new_pmids[str(geneid)] = ['99%06d' % (10*i+j) for j in range(4)]
+        data.gene_pmids[str(geneid)] = data.gene_pmids[str(geneid)]+new_pmids[str(geneid)]
+    entrez = use_entrez(monkeypatch,standins.StandInEntrez(data))
+    assert IdentifyAuthors.run_author_journal(data.genes,datapath,run_label='second',delta=True) == True
+    added = sorted((x,y) for x,PMIDList in new_pmids.items() for y in PMIDList)
+    assert gene_pmid_pairs(datapath) == sorted(before+added)
+    assert entrez.counts['efetch'] == 1
+    after = author_rows(datapath)
+    assert len(after) > len(authors_before)
+    assert set(x[1] for x in set(after)-set(authors_before)) <= set(y for x,y in added)
@@ -0,0 +1,73 @@
+###############################################################################
+## Sharded author runs against the stand-in Entrez: shards link only the genes
+## the main gene->PMID index does not have, leave that index alone while they
+## run, and merge_author_shards adds their new links to it, skipping shards
+## that never opened an index of their own
+###############################################################################
+import os
+import sqlite3
+
+import pytest
+
+from genewiki_prioritization import IdentifyAuthors
+from genewiki_prioritization.TableStorage import read_table
+import standins
+
+
+#### Keeps the gene IDs it was asked to link
+class LinkRecordingEntrez(standins.StandInEntrez):
+    def __init__(self, data):
+        super().__init__(data)
+        self.linked = []
+
+    def elink(self, dbfrom, db, id, **kwargs):
+        self.linked.extend(id if isinstance(id,list) else str(id).split(','))
+        return(super().elink(dbfrom,db,id,**kwargs))
+
+
+@pytest.fixture
+def entrez(data,monkeypatch):
+    entrez = LinkRecordingEntrez(data)
+    monkeypatch.setattr(IdentifyAuthors,'Entrez',entrez)
+    monkeypatch.setattr(IdentifyAuthors,'ENTREZ_PAUSE',0)
+    return(entrez)
+
+def indexed_genes(datapath):
+    conn = sqlite3.connect(os.path.join(datapath,IdentifyAuthors.GENE_PMID_INDEX))
+    try:
+        return(sorted(x[0] for x in conn.execute("SELECT geneid FROM gene_fetch").fetchall()))
+    finally:
+        conn.close()
+
+
+def test_shards_use_main_index(data,entrez,tmp_path):
+    datapath = str(tmp_path)
+    known = data.genes[:30]
+    new = data.genes[30:]
+    IdentifyAuthors.get_gene_pmids(known,datapath)
+    index_before = os.path.getmtime(os.path.join(datapath,IdentifyAuthors.GENE_PMID_INDEX))
+    del entrez.linked[:]
+    for shard in range(2):
+        assert IdentifyAuthors.run_author_shard(data.genes,datapath,shard,2,run_label='test') == True
+    assert sorted(entrez.linked) == sorted(str(x) for x in new)
+    assert os.path.getmtime(os.path.join(datapath,IdentifyAuthors.GENE_PMID_INDEX)) == index_before
+    assert indexed_genes(datapath) == sorted(str(x) for x in known)
+    IdentifyAuthors.merge_author_shards(datapath,2)
+    assert indexed_genes(datapath) == sorted(str(x) for x in data.genes)
+    pubs = read_table(datapath,'PublicationDetailsDF',columns=['geneid','pmid'])
+    expected = sorted((str(x),y) for x in data.genes for y in data.gene_pmids[str(x)] if len(data.gene_pmids[str(x)]) > 30)
+    assert sorted(zip(pubs['geneid'].astype(str),pubs['pmid'].astype(str))) == expected
+
+def test_shard_entrez_rate():
+    assert IdentifyAuthors.shard_entrez_rate(4,8) == 2
+    assert IdentifyAuthors.shard_entrez_rate(1,3) == 3
+
+def test_merge_with_shard_without_genes(data,entrez,tmp_path):
+    datapath = str(tmp_path)
+    genes = data.genes[:1]
+    for shard in range(2):
+        assert IdentifyAuthors.run_author_shard(genes,datapath,shard,2,run_label='test') == True
+    empty = [x for x in range(2) if len(IdentifyAuthors.shard_genes(genes,x,2)) == 0][0]
+    assert not os.path.exists(os.path.join(IdentifyAuthors.shard_datapath(datapath,empty,2),IdentifyAuthors.GENE_PMID_INDEX))
+    IdentifyAuthors.merge_author_shards(datapath,2)
+    assert indexed_genes(datapath) == [str(genes[0])]
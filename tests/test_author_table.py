@@ -0,0 +1,57 @@
+###############################################################################
+## PrioritizeGenes.build_author_table against the old per-gene loop (kept as
+## the baseline in benchmarks/bench_author_table.py), including pmids read as
+## numbers from the TSV on one side and as text from author_df on the other
+###############################################################################
+import os
+
+import pandas as pd
+import pytest
+
+from genewiki_prioritization import PrioritizeGenes
+from genewiki_prioritization.TableStorage import write_table, export_tsv
+from bench_author_table import synthetic_tables, author_table_by_gene_loop
+
+
+@pytest.fixture(scope='module')
+def tables():
+    return(synthetic_tables(40,3000,pmids_per_gene=60))
+
+#### ties on counts may come out in a different order, so compare canonically sorted rows
+def canonical(author_by_gene):
+    table = author_by_gene[['geneid','AU','counts','FullName','email']].astype(str)
+    return(table.sort_values(list(table.columns)).reset_index(drop=True))
+
+#### Same rows, and within a gene the same non-increasing counts. A missing
+#### email reads back from the TSV as NaN rather than None
+def assert_same_authors(expected,actual):
+    pd.testing.assert_frame_equal(canonical(expected.fillna({'email':''})),canonical(actual.fillna({'email':''})))
+    assert actual['geneid'].drop_duplicates().tolist() == expected['geneid'].drop_duplicates().tolist()
+    assert (actual.groupby('geneid',sort=False)['counts'].diff().fillna(0) <= 0).all()
+
+def test_matches_gene_loop(tables):
+    gene_pmid, clean_authors = tables
+    assert_same_authors(author_table_by_gene_loop(gene_pmid,clean_authors),PrioritizeGenes.build_author_table(gene_pmid,clean_authors))
+
+def test_numeric_and_text_pmids(tables,tmp_path):
+    gene_pmid, clean_authors = tables
+    expected = author_table_by_gene_loop(gene_pmid,clean_authors)
+    export_tsv(gene_pmid,str(tmp_path),'gene_pmid')
+    from_tsv = pd.read_csv(os.path.join(str(tmp_path),'gene_pmid.tsv'),delimiter='\t',index_col=0,header=0)
+    assert pd.api.types.is_integer_dtype(from_tsv['pmid'])
+    text_authors = clean_authors.assign(pmid=clean_authors['pmid'].astype(str))
+    assert_same_authors(expected,PrioritizeGenes.build_author_table(from_tsv,text_authors))
+    text_authors = text_authors.astype({'AU':'category','FullName':'category'})
+    assert_same_authors(expected,PrioritizeGenes.build_author_table(from_tsv,text_authors))
+
+#### PublicationDetailsDF left as TSV by an older run, author_df in Parquet with text pmids
+def test_generate_author_table(tables,tmp_path):
+    gene_pmid, clean_authors = tables
+    datapath = str(tmp_path)
+    export_tsv(gene_pmid.assign(pubdate='2020 Jan'),datapath,'PublicationDetailsDF')
+    write_table(clean_authors.assign(pmid=clean_authors['pmid'].astype(str)),datapath,'author_df')
+    PrioritizeGenes.generate_author_table(datapath,datapath)
+    exported = pd.read_csv(os.path.join(datapath,'potential_authors.tsv'),delimiter='\t',index_col=0,header=0)
+    author_sum = clean_authors['AU'].value_counts()
+    expected = author_table_by_gene_loop(gene_pmid,clean_authors.loc[clean_authors['AU'].isin(author_sum.index[author_sum>1])])
+    assert_same_authors(expected,exported)
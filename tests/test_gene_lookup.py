@@ -0,0 +1,88 @@
+###############################################################################
+## GeneLookup on a store built from synthetic results: point lookups by gene
+## ID, label, QID and title, top N in the order of genes_by_score, the HTTP
+## handler's 200/400/404 answers, and the lookup command piped into head
+###############################################################################
+import json
+import os
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from genewiki_prioritization import GeneLookup
+from bench_gene_lookup import synthetic_results
+
+N_GENES = 300
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    datapath = str(tmp_path_factory.mktemp('data'))
+    resultpath = str(tmp_path_factory.mktemp('results'))
+    wdgenes = synthetic_results(datapath,resultpath,N_GENES,authors_per_gene=5)
+    GeneLookup.build_gene_lookup(datapath,resultpath)
+    return(resultpath,wdgenes)
+
+@pytest.fixture(scope='module')
+def lookup(results):
+    return(GeneLookup.GeneLookup(GeneLookup.gene_lookup_path(results[0])))
+
+@pytest.fixture(scope='module')
+def service(lookup):
+    server = GeneLookup.http.server.ThreadingHTTPServer(('127.0.0.1',0),GeneLookup.GeneLookupHandler)
+    server.lookup = lookup
+    threading.Thread(target=server.serve_forever,daemon=True).start()
+    yield('http://127.0.0.1:%d/' % server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+def get_status(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return(response.status,json.loads(response.read()))
+    except urllib.error.HTTPError as e:
+        return(e.code,json.loads(e.read()))
+
+
+def test_point_lookups(results,lookup):
+    row = results[1].iloc[7]
+    title = row['wikilink'].rsplit('/',1)[1]
+    for key in [row['geneID'],int(row['geneID']),row['label'],row['label'].lower(),row['QID'],title,title.replace('_',' ').upper()]:
+        found = lookup.gene(key,authors=3)
+        assert [x['geneid'] for x in found] == [int(row['geneID'])]
+        assert found[0]['qid'] == row['QID'] and found[0]['label'] == row['label']
+        assert [x['title'] for x in found[0]['articles']] == [title]
+        assert len(found[0]['authors']) == 3
+    assert lookup.gene('no such gene') == []
+
+def test_top_follows_genes_by_score(results,lookup):
+    by_score = pd.read_csv(os.path.join(results[0],'genes_by_score.tsv'),sep='\t',index_col=0)
+    top = lookup.top('score',20)
+    assert [x['rank_score'] for x in top] == list(range(1,21))
+    assert [x['title'] for x in top] == by_score['title'].head(20).tolist()
+    assert [x['title'] for x in lookup.top('genes_by_score',5)] == by_score['title'].head(5).tolist()
+
+def test_handler_statuses(results,service):
+    geneid = results[1]['geneID'].iloc[0]
+    status, body = get_status(service+'gene/'+geneid)
+    assert status == 200 and body[0]['geneid'] == int(geneid)
+    status, body = get_status(service+'top/score?n=3')
+    assert status == 200 and len(body) == 3
+    assert get_status(service+'top/nonsense')[0] == 400
+    assert get_status(service+'top/score?n=many')[0] == 400
+    assert get_status(service+'gene/no%20such%20gene')[0] == 404
+    assert get_status(service+'elsewhere')[0] == 404
+
+def test_lookup_piped_into_head(results):
+    command = [sys.executable,'-m','genewiki_prioritization','--results',results[0],'lookup','--top',str(N_GENES)]
+    lookup = subprocess.Popen(command,stdout=subprocess.PIPE,stderr=subprocess.PIPE,cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    lookup.stdout.readline()
+    lookup.stdout.close()
+    stderr = lookup.stderr.read().decode('utf-8')
+    lookup.wait()
+    assert 'BrokenPipeError' not in stderr and 'Traceback' not in stderr
@@ -0,0 +1,60 @@
+###############################################################################
+## HTTPCache.ResponseCache on the shared session: streamed SPARQL responses
+## are stored as they are read and answered from the cache in chunks, a
+## stream closed part way is not stored, and the headers that are not kept
+## are dropped whatever their case
+###############################################################################
+import os
+import zlib
+
+import pandas as pd
+import pytest
+import requests
+
+from genewiki_prioritization import FetchGeneInfo
+from genewiki_prioritization.HTTPCache import ResponseCache, CachedBody
+import standins
+
+
+@pytest.fixture
+def server(data):
+    with standins.StandInServer(data,etags=True,chunked=True) as server:
+        yield(server)
+
+@pytest.fixture
+def cache(tmp_path):
+    FetchGeneInfo.use_http_cache(str(tmp_path))
+    yield(FetchGeneInfo.get_http_cache())
+    FetchGeneInfo.use_http_cache(None)
+
+
+def test_streamed_responses_are_stored(server,cache):
+    first = FetchGeneInfo.get_wd_gene_table(url=server.url+'/sparql')
+    assert cache.misses == len(FetchGeneInfo.WD_PAGES)
+    assert cache.size() > 0
+    server.counts['body_bytes'] = 0
+    second = FetchGeneInfo.get_wd_gene_table(url=server.url+'/sparql')
+    assert cache.revalidated == len(FetchGeneInfo.WD_PAGES)
+    assert server.counts['body_bytes'] == 0
+    pd.testing.assert_frame_equal(first,second)
+
+def test_stream_closed_part_way_is_not_stored(server,cache):
+    response = FetchGeneInfo.get_session().get(server.url+'/sparql',params={'format':'json','query':FetchGeneInfo.get_wd_gene_query('1')},stream=True)
+    next(response.iter_content(chunk_size=1024))
+    response.close()
+    assert cache.misses == 1
+    assert cache.size() == 0
+
+def test_cached_body_is_read_in_chunks():
+    body = os.urandom(1000)*50
+    chunks = list(CachedBody(zlib.compress(body)).stream(4096))
+    assert max(len(x) for x in chunks) <= 4096
+    assert b''.join(chunks) == body
+
+def test_unstored_headers_in_any_case(tmp_path):
+    cache = ResponseCache(str(tmp_path/'http.sqlite'))
+    cache.put('key','http://example.org/',200,{'content-length':'5','ETag':'"1"','transfer-encoding':'chunked'},zlib.compress(b'hello'))
+    entry = cache.get('key')
+    assert dict(entry['headers']) == {'ETag':'"1"'}
+    assert cache.build_response(requests.Request('GET','http://example.org/').prepare(),entry,'hit').content == b'hello'
+    cache.close()
@@ -0,0 +1,73 @@
+###############################################################################
+## IdentifyAuthors.MedlineCache: records come back as stored and PMIDs with
+## the same text share one record, cache hits do not go to efetch, and past
+## max_bytes the least recently used PMIDs (and their records) are dropped
+###############################################################################
+import itertools
+import os
+
+import pytest
+
+from genewiki_prioritization import IdentifyAuthors
+import standins
+
+
+#### Random text, so every record compresses to about the same size
+def medline_text(PMID):
+    return('PMID- %s\nTI  - %s\n' % (PMID,os.urandom(500).hex()))
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(IdentifyAuthors.time,'time',lambda: float(next(ticks)))
+
+@pytest.fixture
+def entrez(data,monkeypatch):
+    entrez = standins.StandInEntrez(data)
+    monkeypatch.setattr(IdentifyAuthors,'Entrez',entrez)
+    monkeypatch.setattr(IdentifyAuthors,'ENTREZ_PAUSE',0)
+    return(entrez)
+
+def cached_pmids(cache):
+    return(sorted(x[0] for x in cache.conn.execute("SELECT pmid FROM pmid_index").fetchall()))
+
+
+def test_put_and_get(tmp_path):
+    cache = IdentifyAuthors.open_medline_cache(str(tmp_path))
+    texts = {'1':medline_text('1'),'2':medline_text('2')}
+    cache.put_many(dict(texts,**{'3':texts['1']}))
+    assert cache.get_many(['1','2','3','4']) == dict(texts,**{'3':texts['1']})
+    assert (cache.hits, cache.misses) == (3,1)
+    assert cache.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 2
+    cache.close()
+
+def test_hits_skip_efetch(data,entrez,tmp_path):
+    PMIDList = sorted(set(x for pmids in data.gene_pmids.values() for x in pmids))[:50]
+    cache = IdentifyAuthors.open_medline_cache(str(tmp_path))
+    first, fails = IdentifyAuthors.fetch_medline_records(PMIDList,cache)
+    efetches = entrez.counts['efetch']
+    assert efetches > 0 and fails == []
+    second, fails = IdentifyAuthors.fetch_medline_records(PMIDList,cache)
+    assert entrez.counts['efetch'] == efetches
+    assert second == first
+    IdentifyAuthors.fetch_medline_records(PMIDList+['99999999'],cache)
+    assert entrez.counts['efetch'] == efetches+1
+    cache.close()
+
+def test_evicts_least_recently_used(tmp_path,clock):
+    cache = IdentifyAuthors.open_medline_cache(str(tmp_path))
+    cache.put_many({'1':medline_text('1')})
+    #### room for three records
+    cache.max_bytes = int(3.5*cache.size())
+    for PMID in ['2','3']:
+        cache.put_many({PMID:medline_text(PMID)})
+    assert cached_pmids(cache) == ['1','2','3']
+    #### reading 1 makes 2 the least recently used
+    cache.get_many(['1'])
+    cache.put_many({'4':medline_text('4')})
+    assert cached_pmids(cache) == ['1','3','4']
+    cache.put_many({'5':medline_text('5'),'6':medline_text('6')})
+    assert cached_pmids(cache) == ['4','5','6']
+    assert cache.size() <= cache.max_bytes
+    assert cache.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 3
+    cache.close()
@@ -0,0 +1,70 @@
+###############################################################################
+## Pageview fetching against a rate limited stand-in REST API: the shared
+## token bucket, Retry-After parsing, and 429 backoff in iter_monthly_pvs
+###############################################################################
+import email.utils
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+from genewiki_prioritization import FetchGeneInfo
+import standins
+
+PV_PARAMETERS = {'start':'20210101','end':'20211231'}
+USERAGENT = {'User-Agent':'test'}
+
+
+def pv_url(server):
+    return(server.url+'/api/rest_v1/metrics/pageviews/per-article/')
+
+
+def test_token_bucket_rate():
+    bucket = FetchGeneInfo.TokenBucket(20,capacity=1)
+    start = time.monotonic()
+    for i in range(11):
+        bucket.acquire()
+    assert time.monotonic()-start >= 0.45
+
+def test_token_bucket_pause():
+    bucket = FetchGeneInfo.TokenBucket(1000)
+    bucket.pause(0.3)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic()-start >= 0.25
+
+def test_parse_retry_after():
+    assert FetchGeneInfo.parse_retry_after('3') == 3
+    assert FetchGeneInfo.parse_retry_after('-2') == 0
+    assert FetchGeneInfo.parse_retry_after(None,default=4) == 4
+    assert FetchGeneInfo.parse_retry_after('soon',default=4) == 4
+    retry_at = email.utils.formatdate(time.time()+30,usegmt=True)
+    assert 25 <= FetchGeneInfo.parse_retry_after(retry_at) <= 30
+    assert FetchGeneInfo.parse_retry_after(email.utils.formatdate(0,usegmt=True)) == 0
+
+def test_backs_off_on_429(data):
+    titles = data.titles[:60]
+    no_missing = pd.DataFrame({'Gene Wiki Page':['https://en.wikipedia.org/wiki/'+x for x in titles]})
+    with standins.StandInServer(data,rate=25) as server:
+        start = time.monotonic()
+        pginfo, pgfails = FetchGeneInfo.get_monthly_pvs(PV_PARAMETERS,USERAGENT,no_missing,api_url=pv_url(server),rate=100)
+        seconds = time.monotonic()-start
+        assert server.limit.limited > 0
+    assert pgfails == []
+    assert set(pginfo['title']) == set(titles)
+    assert seconds >= 1
+    for title in titles:
+        rows = pginfo.loc[pginfo['title']==title]
+        if data.pageviews(title) is None:
+            assert rows['views'].tolist() == [-1]
+        else:
+            assert rows['views'].tolist() == [x['views'] for x in data.pageviews(title)]
+
+def test_gives_up_after_max_tries(data):
+    with standins.StandInServer(data,rate=0) as server:
+        url = FetchGeneInfo.get_pv_url(PV_PARAMETERS,data.titles[0],pv_url(server))
+        bucket = FetchGeneInfo.TokenBucket(100)
+        with pytest.raises(requests.exceptions.RetryError):
+            FetchGeneInfo.fetch_title_pvs(FetchGeneInfo.get_pv_session(),url,data.titles[0],USERAGENT,bucket,max_tries=2)
+        assert server.counts['pageviews'] == 2
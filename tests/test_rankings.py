@@ -0,0 +1,30 @@
+###############################################################################
+## PrioritizeGenes.rank_genes: each table keeps the columns it had before the
+## top-k selection (no priority_score in genes_by_wiki_length) and the rows of
+## the old steps done with stable sorts, ties in summary order
+###############################################################################
+import pandas as pd
+
+from genewiki_prioritization import PrioritizeGenes
+from bench_rankings import synthetic_gene_summary, rank_by_stable_sorts
+
+
+def test_columns_per_ranking():
+    gene_summary = synthetic_gene_summary(300)
+    ranked = PrioritizeGenes.rank_genes(gene_summary,k=50)
+    assert ranked['genes_by_wiki_length'].columns.tolist() == gene_summary.columns.tolist()
+    for name in ['genes_by_score','genes_by_pubcount']:
+        assert ranked[name].columns.tolist() == gene_summary.columns.tolist()+['priority_score']
+
+def test_matches_stable_sorts():
+    gene_summary = synthetic_gene_summary(3000,seed=1)
+    stable = rank_by_stable_sorts(gene_summary)
+    ranked = PrioritizeGenes.rank_genes(gene_summary)
+    for name in PrioritizeGenes.RANKINGS:
+        pd.testing.assert_frame_equal(stable[name],ranked[name])
+
+def test_scored_summary_keeps_its_columns():
+    gene_summary = PrioritizeGenes.score_genes(synthetic_gene_summary(300))
+    ranked = PrioritizeGenes.rank_genes(gene_summary,k=50)
+    assert 'priority_score' not in ranked['genes_by_wiki_length'].columns
+    assert ranked['genes_by_score'].columns.tolist() == gene_summary.columns.tolist()
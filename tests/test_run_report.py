@@ -0,0 +1,38 @@
+###############################################################################
+## RunReport.record_response: the bytes recorded for an API are the body bytes
+## actually read, for responses with a Content-Length, chunked responses, and
+## streamed ones read a chunk at a time
+###############################################################################
+import pytest
+
+from genewiki_prioritization import FetchGeneInfo
+from genewiki_prioritization.RunReport import REPORT
+import standins
+
+
+def api_bytes(api):
+    return(REPORT.apis.get(api,{}).get('bytes',0))
+
+@pytest.mark.parametrize('chunked',[False,True])
+def test_counts_body_bytes(data,chunked):
+    with standins.StandInServer(data,chunked=chunked) as server:
+        before = api_bytes('127.0.0.1')
+        response = FetchGeneInfo.get_session().get(server.url+'/sparql',params={'query':'genes'})
+        assert ('Content-Length' in response.headers) != chunked
+        assert api_bytes('127.0.0.1')-before == len(response.content) == server.counts['body_bytes']
+
+@pytest.mark.parametrize('chunked',[False,True])
+def test_counts_streamed_sparql(data,chunked):
+    with standins.StandInServer(data,chunked=chunked) as server:
+        before = api_bytes('127.0.0.1')
+        table = FetchGeneInfo.get_wd_gene_table(pages=None,url=server.url+'/sparql')
+        assert len(table) == len(data.gene_rows)
+        assert api_bytes('127.0.0.1')-before == server.counts['body_bytes']
+
+def test_counts_what_was_read_of_a_closed_stream(data):
+    with standins.StandInServer(data,chunked=True) as server:
+        before = api_bytes('127.0.0.1')
+        response = FetchGeneInfo.get_session().get(server.url+'/sparql',params={'query':'genes'},stream=True)
+        first = next(response.iter_content(1000))
+        response.close()
+        assert api_bytes('127.0.0.1')-before == len(first)
@@ -0,0 +1,91 @@
+###############################################################################
+## StageManifest: stages are skipped while their inputs, parameters and
+## outputs are unchanged, run when forced, past max_age or when an input or
+## output changed, and a stage whose outputs changed drops the stages
+## downstream of it. A stage reading its own output (filter_wikis and the
+## page volume table) is skipped after its own write but not after another one
+###############################################################################
+import os
+
+import pandas as pd
+import pytest
+
+from genewiki_prioritization import cli
+from genewiki_prioritization.StageManifest import StageManifest
+from genewiki_prioritization.TableStorage import write_table
+
+SPECS = {'fetch':{'inputs':['data/source'],'outputs':['data/fetched']},
+         'rank':{'inputs':['data/fetched'],'outputs':['results/ranked.tsv']},
+         'report':{'inputs':['results/ranked.tsv'],'outputs':['results/report.tsv']},
+         'remote':{'inputs':[],'outputs':['data/remote'],'max_age':0},
+         'refresh':{'inputs':['data/source','data/stored'],'outputs':['data/stored']}}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    datapath = str(tmp_path/'data')
+    resultpath = str(tmp_path/'results')
+    os.makedirs(datapath)
+    os.makedirs(resultpath)
+    write_table(pd.DataFrame({'geneid':[1,2,3]}),datapath,'source')
+    return(datapath,resultpath)
+
+#### Writes the stage's outputs (value changes their content) and records it
+def run(manifest,paths,name,value=0,params=None):
+    key, reason = manifest.check(name,params or {})
+    for output in SPECS[name]['outputs']:
+        root, rest = output.split('/',1)
+        if root == 'data':
+            write_table(pd.DataFrame({'value':[value]}),paths[0],rest)
+        else:
+            pd.DataFrame({'value':[value]}).to_csv(os.path.join(paths[1],rest),sep='\t')
+    manifest.record(name,key,params or {})
+    return(reason)
+
+
+def test_skips_unchanged_stage(paths):
+    manifest = StageManifest(paths[0],paths[1],SPECS)
+    assert run(manifest,paths,'fetch') == 'no earlier run'
+    assert manifest.check('fetch',{})[1] is None
+    assert StageManifest(paths[0],paths[1],SPECS).check('fetch',{})[1] is None
+    assert manifest.check('fetch',{'top':10})[1] == 'inputs, parameters or code changed'
+
+def test_forced_and_remote_stages_run(paths):
+    manifest = StageManifest(paths[0],paths[1],SPECS)
+    run(manifest,paths,'fetch')
+    run(manifest,paths,'remote')
+    assert manifest.check('fetch',{},force=True)[1] == 'forced'
+    assert manifest.check('remote',{})[1] == 'last run is more than 0 seconds old'
+
+def test_changed_input_or_output_runs_again(paths):
+    manifest = StageManifest(paths[0],paths[1],SPECS)
+    run(manifest,paths,'fetch')
+    run(manifest,paths,'rank')
+    write_table(pd.DataFrame({'geneid':[1,2]}),paths[0],'source')
+    assert manifest.check('fetch',{})[1] == 'inputs, parameters or code changed'
+    os.remove(os.path.join(paths[1],'ranked.tsv'))
+    assert manifest.check('rank',{})[1] == 'results/ranked.tsv is missing or was changed'
+
+def test_changed_outputs_drop_downstream_stages(paths):
+    manifest = StageManifest(paths[0],paths[1],SPECS)
+    for name in ['fetch','rank','report']:
+        run(manifest,paths,name)
+    #### same outputs as before: nothing downstream is dropped
+    run(manifest,paths,'fetch',value=0,params={'rerun':1})
+    assert set(manifest.stages) == {'fetch','rank','report'}
+    run(manifest,paths,'fetch',value=1)
+    assert set(manifest.stages) == {'fetch'}
+    assert manifest.check('rank',{})[1] == 'no earlier run'
+
+def test_stage_reading_its_own_output(paths):
+    manifest = StageManifest(paths[0],paths[1],SPECS)
+    assert run(manifest,paths,'refresh',value=1) == 'no earlier run'
+    assert manifest.check('refresh',{})[1] is None
+    write_table(pd.DataFrame({'value':[2]}),paths[0],'stored')
+    assert manifest.check('refresh',{})[1] == 'inputs, parameters or code changed'
+
+def test_filter_wikis_reads_the_volume_table(paths):
+    spec = cli.STAGES['filter_wikis']
+    assert 'data/gene_wiki_vol_info' in spec['inputs']
+    manifest = StageManifest(paths[0],paths[1],cli.STAGES)
+    assert 'filter_wikis' in manifest.downstream(['data/gene_wiki_vol_info'])
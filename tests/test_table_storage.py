@@ -0,0 +1,37 @@
+###############################################################################
+## TableStorage: tables left as TSV by older runs are still read, and are
+## replaced (not shadowed) once the table is written as Parquet
+###############################################################################
+import os
+
+import pandas as pd
+
+from genewiki_prioritization.TableStorage import (read_table, write_table, clear_table, table_exists,
+                                                  table_path, legacy_path, export_tsv, DatasetWriter)
+
+
+def test_reads_legacy_tsv(tmp_path):
+    datapath = str(tmp_path)
+    export_tsv(pd.DataFrame({'geneid':[1,2,3],'pmid':['10','11','12']}),datapath,'gene_pmid')
+    assert table_exists(datapath,'gene_pmid')
+    df = read_table(datapath,'gene_pmid',columns=['pmid'],filters=[('geneid','>=',2)],integers=['pmid'])
+    assert df['pmid'].tolist() == [11,12]
+
+def test_write_replaces_legacy_tsv(tmp_path):
+    datapath = str(tmp_path)
+    export_tsv(pd.DataFrame({'geneid':[1,2]}),datapath,'gene_pmid')
+    write_table(pd.DataFrame({'geneid':[3]}),datapath,'gene_pmid')
+    assert not os.path.exists(legacy_path(datapath,'gene_pmid'))
+    assert read_table(datapath,'gene_pmid')['geneid'].tolist() == [3]
+
+def test_clear_table_removes_every_form(tmp_path):
+    datapath = str(tmp_path)
+    export_tsv(pd.DataFrame({'geneid':[1]}),datapath,'author_df')
+    write_table(pd.DataFrame({'geneid':[2]}),datapath,'author_df')
+    export_tsv(pd.DataFrame({'geneid':[1]}),datapath,'author_df')
+    DatasetWriter(datapath,'author_df').write(pd.DataFrame({'geneid':[4]}))
+    assert not os.path.exists(legacy_path(datapath,'author_df'))
+    assert not os.path.exists(table_path(datapath,'author_df'))
+    assert read_table(datapath,'author_df')['geneid'].tolist() == [4]
+    clear_table(datapath,'author_df')
+    assert not table_exists(datapath,'author_df')
@@ -0,0 +1,118 @@
+###############################################################################
+## FetchGeneInfo.get_wiki_volume_info against the stand-in MediaWiki API:
+## batching, normalized/redirected titles mapped back to the input titles,
+## missing pages apart from failed batches, continuation, and stored info
+## kept for titles that failed (merge_wiki_volume_info), also from a table
+## stored in the old layout, and the refresh in filter_wikis not waiting
+## between batches
+###############################################################################
+import math
+
+import mwclient as mw
+import pandas as pd
+import pytest
+
+from genewiki_prioritization import FetchGeneInfo
+from genewiki_prioritization.TableStorage import read_table, write_table
+import standins
+
+
+@pytest.fixture
+def server(data):
+    with standins.StandInServer(data) as server:
+        yield(server)
+
+def stand_in_site(server):
+    return(mw.Site(server.url.replace('http://',''),path='/w/',scheme='http',do_init=False,clients_useragent='test'))
+
+#### Raises for any batch holding one of the failing titles
+class FailingSite(object):
+    def __init__(self, site, failing):
+        self.site = site
+        self.failing = set(failing)
+
+    def api(self, action, **kwargs):
+        if self.failing.intersection(kwargs['titles'].split('|')):
+            raise mw.errors.APIError('internal_api_error','stand-in failure',{})
+        return(self.site.api(action,**kwargs))
+
+
+def test_batches_and_maps_titles_back(data,server):
+    pageinfo, pagemissing, pagefails = FetchGeneInfo.get_wiki_volume_info(stand_in_site(server),data.titles,batchsize=20,pause=0)
+    assert server.counts['mediawiki'] == math.ceil(len(data.titles)/20)
+    assert pagefails == []
+    assert sorted(pagemissing) == sorted(x for x in data.titles if x.startswith('Missing_gene_'))
+    found = {x['title']:x for x in pageinfo}
+    assert set(found) == set(data.titles)-set(pagemissing)
+    for title, info in found.items():
+        page = data.pages[info['page_title']]
+        assert info['page_length'] == page['length']
+        assert info['lastrevid'] == str(page['lastrevid'])
+        if title.startswith('Gene_alias_'):
+            assert info['page_title'] == data.redirects[title.replace('_',' ')]
+        else:
+            assert info['page_title'] == title.replace('_',' ')
+
+def test_failed_batches_are_not_missing(data,server):
+    titles = [x for x in data.titles if not x.startswith('Missing_gene_')][:30]
+    site = FailingSite(stand_in_site(server),[titles[12]])
+    pageinfo, pagemissing, pagefails = FetchGeneInfo.get_wiki_volume_info(site,titles,batchsize=10,pause=0)
+    assert pagefails == titles[10:20]
+    assert pagemissing == []
+    assert [x['title'] for x in pageinfo] == titles[:10]+titles[20:]
+
+def test_stored_info_is_kept_for_failed_titles(data,server):
+    titles = [x for x in data.titles if not x.startswith('Missing_gene_')][:30]
+    first, missing, fails = FetchGeneInfo.get_wiki_volume_info(stand_in_site(server),titles,batchsize=10,pause=0)
+    stored = pd.DataFrame(first,columns=FetchGeneInfo.WIKI_VOL_COLUMNS)
+    stored['checked_at'] = '2022-01-01T00:00:00Z'
+    site = FailingSite(stand_in_site(server),[titles[0]])
+    pageinfo, pagemissing, pagefails = FetchGeneInfo.get_wiki_volume_info(site,titles,batchsize=10,pause=0)
+    merged, changed = FetchGeneInfo.merge_wiki_volume_info(stored,pageinfo,pagefails,titles)
+    assert merged['title'].tolist() == titles
+    assert changed == []
+    assert (merged.loc[merged['title'].isin(pagefails),'checked_at'] == '2022-01-01T00:00:00Z').all()
+
+def test_follows_continuation():
+    class ContinuingSite(object):
+        def __init__(self):
+            self.calls = []
+
+        def api(self, action, **kwargs):
+            self.calls.append(dict(kwargs))
+            if kwargs.get('incontinue') is None:
+                return({'continue':{'incontinue':'B','continue':'||'},
+                        'query':{'normalized':[{'from':'a','to':'A'}],'pages':{'1':{'title':'A','length':10}}}})
+            return({'query':{'pages':{'2':{'title':'B','length':20}}}})
+
+    site = ContinuingSite()
+    resolved = FetchGeneInfo.query_page_info(site,['a','B'])
+    assert len(site.calls) == 2
+    assert resolved['a']['length'] == 10 and resolved['B']['length'] == 20
+
+def test_refresh_does_not_wait_between_batches(data,server,tmp_path,monkeypatch):
+    datapath = str(tmp_path)
+    titles = data.titles[:120]
+    links = pd.DataFrame({'geneID':[str(100+i) for i in range(len(titles))],'proteinID':'Q1',
+                          'wikilink':['https://en.wikipedia.org/wiki/'+x for x in titles]})
+    write_table(links,datapath,'genes_en_wiki')
+    write_table(links.iloc[:0],datapath,'proteins_en_wiki')
+    waits = []
+    monkeypatch.setattr(FetchGeneInfo.time,'sleep',waits.append)
+    FetchGeneInfo.filter_wikis(datapath,datapath,site=stand_in_site(server))
+    assert server.counts['mediawiki'] == math.ceil(len(titles)/FetchGeneInfo.MW_MAX_TITLES)
+    assert sum(waits) == 0
+    assert read_table(datapath,'gene_wiki_vol_info')['title'].tolist() == [x for x in titles if not x.startswith('Missing_gene_')]
+
+def test_merge_with_legacy_stored_table(tmp_path):
+    datapath = str(tmp_path)
+    legacy = pd.DataFrame({'title':['Gene_A','Gene_B'],'page_length':[100,200],
+                           'last_touched':['2022-03-11T23:32:49Z','2022-03-19T09:58:23Z'],'lastrevid':[11,12]})
+    write_table(legacy,datapath,'gene_wiki_vol_info')
+    stored = FetchGeneInfo.load_wiki_volume_info(datapath)
+    pageinfo = [{'title':'Gene_A','page_title':'Gene A','page_length':150,'last_touched':'2022-04-01T00:00:00Z','lastrevid':'13'}]
+    merged, changed = FetchGeneInfo.merge_wiki_volume_info(stored,pageinfo,['Gene_B'],['Gene_A','Gene_B'])
+    assert changed == ['Gene_A']
+    assert merged['title'].tolist() == ['Gene_A','Gene_B']
+    assert merged['page_title'].tolist() == ['Gene A','Gene_B']
+    assert merged.loc[1,'checked_at'] == '2022-03-19T09:58:23Z'
@@ -0,0 +1,56 @@
+###############################################################################
+## WikidataDump.read_gene_table against the SPARQL gene query for the same
+## entities (tests/fixtures, written by make_wikidata_fixtures.py): the four
+## tables from split_wd_gene_table must match, apart from the documented
+## difference for proteins with no P702 (encoded by) claim
+###############################################################################
+import os
+
+import pandas as pd
+import pytest
+
+from genewiki_prioritization import FetchGeneInfo, WikidataDump
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),'fixtures')
+DUMP = os.path.join(FIXTURES,'wikidata_genes.json.bz2')
+SPARQL_RESULTS = os.path.join(FIXTURES,'wikidata_genes_sparql.json')
+
+
+def canonical(table):
+    table = table.astype(str)
+    return(table.sort_values(list(table.columns)).reset_index(drop=True))
+
+#### The query service's response, streamed in small chunks like get_sparql_table does
+@pytest.fixture(scope='module')
+def sparql_tables():
+    with open(SPARQL_RESULTS) as inread:
+        bindings = FetchGeneInfo.iter_sparql_bindings(iter(lambda: inread.read(100),''))
+        datadf = FetchGeneInfo.sparql_bindings_to_df(bindings,FetchGeneInfo.WD_GENE_VARIABLES)
+    return(FetchGeneInfo.split_wd_gene_table(FetchGeneInfo.clean_wd_gene_table(datadf)))
+
+@pytest.fixture(scope='module',params=[1,2])
+def dump_tables(request):
+    return(FetchGeneInfo.split_wd_gene_table(WikidataDump.read_gene_table(DUMP,workers=request.param,lines_per_batch=3)))
+
+
+def test_dump_matches_sparql(sparql_tables,dump_tables):
+    assert set(dump_tables) == set(sparql_tables)
+    for name in ['genes_no_wiki','genes_en_wiki']:
+        pd.testing.assert_frame_equal(canonical(dump_tables[name]),canonical(sparql_tables[name]))
+    #### Q2007 has an English article but no P702, so only the query finds its link
+    no_p702 = lambda table: table.loc[table['proteinID'] != 'Q2007']
+    for name in ['proteins_no_wiki','proteins_en_wiki']:
+        pd.testing.assert_frame_equal(canonical(no_p702(dump_tables[name])),canonical(no_p702(sparql_tables[name])))
+    assert 'Q2007' in sparql_tables['proteins_en_wiki']['proteinID'].tolist()
+    assert 'Q2007' in dump_tables['proteins_no_wiki']['proteinID'].tolist()
+
+def test_fixture_cases(dump_tables):
+    genes = pd.concat((dump_tables['genes_no_wiki'],dump_tables['genes_en_wiki']),ignore_index=True)
+    #### deprecated P31, mouse gene and gene without P688 are left out
+    assert set(genes['QID']) == {'Q1001','Q1002','Q1005','Q1007'}
+    assert dump_tables['genes_no_wiki']['label'].tolist() == ['Q1002']
+    assert dump_tables['genes_en_wiki'].loc[dump_tables['genes_en_wiki']['QID']=='Q1005','geneID'].tolist() == ['1005']
+    assert sorted(dump_tables['proteins_en_wiki']['wikilink']) == ['https://en.wikipedia.org/wiki/Protein_A_(human)',
+                                                                 'https://en.wikipedia.org/wiki/Protein_D']
+    #### Q1004 has no sitelinks, so it is in neither no_wiki table
+    assert 'Q1004' not in dump_tables['proteins_no_wiki']['QID'].tolist()